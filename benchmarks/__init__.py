@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for uosc.
+
+Run all micro and loopback benchmarks and write the results to a JSON file:
+
+    python -m benchmarks -o results.json
+
+With the MicroPython unix port, run from the root directory of the repository:
+
+    MICROPYPATH="$(pwd):$(pwd)/examples:.frozen" micropython -m benchmarks -o results.json
+
+Compare the results against an earlier run and flag regressions, i.e.
+throughput decreases of more than the threshold percentage:
+
+    python -m benchmarks --compare baseline.json results.json --threshold 10
+
+The ``prefork_scaling`` and ``transports`` modules are separate benchmarks for
+CPython only and can be run with ``python -m benchmarks.<name>``.
+
+"""
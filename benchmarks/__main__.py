@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Command line interface for the benchmarks. See ``benchmarks/__init__.py``."""
+
+import json
+import sys
+
+from benchmarks import compare
+from benchmarks.util import metadata
+
+
+def main(args=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog='benchmarks')
+    ap.add_argument('-o', '--output', help="Write results as JSON to this file")
+    ap.add_argument('-b', '--baseline',
+                    help="Compare results with those in this JSON file")
+    ap.add_argument('-c', '--compare', nargs=2,
+                    help="Only compare two result files (baseline and current)")
+    ap.add_argument('-t', '--threshold', type=float, default=compare.DEFAULT_THRESHOLD,
+                    help="Flag throughput decreases by more than this many percent "
+                         "as regressions (default: %s)" % compare.DEFAULT_THRESHOLD)
+    ap.add_argument('-n', '--number', type=int, default=2000,
+                    help="Iterations per microbenchmark (default: 2000)")
+    ap.add_argument('-m', '--messages', type=int, default=10000,
+                    help="Messages per loopback throughput run (default: 10000)")
+    ap.add_argument('-p', '--port', type=int, default=9400,
+                    help="First UDP port used for loopback runs (default: 9400)")
+    ap.add_argument('--micro-only', action="store_true",
+                    help="Skip the loopback benchmarks")
+    ap.add_argument('--loopback-only', action="store_true",
+                    help="Skip the microbenchmarks")
+
+    args = ap.parse_args(args)
+
+    if args.compare:
+        baseline, current = [compare.load(fn) for fn in args.compare]
+        return 1 if compare.report(compare.compare(baseline, current, args.threshold)) else 0
+
+    results = {}
+
+    if not args.loopback_only:
+        from benchmarks import micro
+        results.update(micro.run(args.number))
+
+    if not args.micro_only:
+        from benchmarks import loopback
+        results.update(loopback.run(args.messages, port=args.port))
+
+    current = {'meta': metadata(), 'results': results}
+
+    for name in sorted(results):
+        res = results[name]
+        print("%-40s %10.2f us/op %12.1f ops/s" % (name, res['us_per_op'], res['ops_per_sec']))
+
+        if 'latency_p50_us' in res:
+            print("%-40s p50 %i us, p99 %i us, max %i us, %i lost" % (
+                '', res['latency_p50_us'], res['latency_p99_us'], res['latency_max_us'],
+                res['lost']))
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(current, fp)
+
+    if args.baseline:
+        print()
+        rows = compare.compare(compare.load(args.baseline), current, args.threshold)
+        return 1 if compare.report(rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Compare two benchmark result files and flag regressions."""
+
+import json
+
+
+DEFAULT_THRESHOLD = 10.0
+
+
+def load(filename):
+    with open(filename) as fp:
+        return json.load(fp)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Compare the results of two benchmark runs.
+
+    Returns a list of ``(name, old_ops, new_ops, change_percent, regression)``
+    tuples for all benchmarks present in both runs, sorted by name. A
+    benchmark is a regression if its throughput in operations per second
+    dropped by more than ``threshold`` percent.
+
+    """
+    old = baseline['results']
+    new = current['results']
+    rows = []
+
+    for name in sorted(old):
+        if name not in new:
+            continue
+
+        old_ops = old[name]['ops_per_sec']
+        new_ops = new[name]['ops_per_sec']
+        change = (new_ops - old_ops) * 100.0 / old_ops if old_ops else 0.0
+        rows.append((name, old_ops, new_ops, change, change < -threshold))
+
+    return rows
+
+
+def report(rows):
+    """Print comparison as a table. Returns number of regressions."""
+    width = max([len(row[0]) for row in rows] + [9])
+    print("%-*s %14s %14s %9s" % (width, "benchmark", "baseline/s", "current/s", "change"))
+    regressions = 0
+
+    for name, old_ops, new_ops, change, regression in rows:
+        print("%-*s %14.1f %14.1f %+8.1f%%%s" % (width, name, old_ops, new_ops, change,
+                                                 "  REGRESSION" if regression else ""))
+        regressions += regression
+
+    return regressions
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""End-to-end throughput and latency over UDP on the loopback interface.
+
+Runs ``uosc.tools.minimal_server.run_server`` in a thread and the
+``uosc.tools.async_server`` server in an asyncio event loop and sends
+messages to them with ``uosc.client.Client``.
+
+Throughput is measured by sending messages in windows of ``window`` messages
+and waiting for each window to be received before sending the next one, so
+that the kernel does not drop datagrams. Latency is measured by sending one
+message at a time, containing the send timestamp, and waiting until the
+server has dispatched it.
+
+"""
+
+try:
+    import _thread
+except ImportError:
+    import thread as _thread
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+import time
+
+from uosc.client import Client, create_message
+from uosc.server import handle_osc
+from uosc.tools import async_server
+from uosc.tools.minimal_server import run_server
+
+from benchmarks.util import percentile, result, ticks_diff, ticks_us
+
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = 9400
+# give up waiting for outstanding messages after this many µs
+TIMEOUT_US = 1000000
+
+
+class Recorder:
+    """OSC dispatcher counting messages and recording latencies."""
+
+    def __init__(self):
+        self.count = 0
+        self.latencies = []
+
+    def __call__(self, timetag, msg):
+        self.count += 1
+        args = msg[2]
+
+        if args and msg[0] == '/bench/latency':
+            self.latencies.append(ticks_diff(ticks_us(), args[0]))
+
+
+def throughput_message():
+    return create_message('/bench/fader', 42, 0.5, 'spamm')
+
+
+def latency_message():
+    return create_message('/bench/latency', ('h', ticks_us()))
+
+
+def _wait(recorder, count):
+    start = ticks_us()
+
+    while recorder.count < count and ticks_diff(ticks_us(), start) < TIMEOUT_US:
+        time.sleep(0)
+
+    return recorder.count >= count
+
+
+def _report(recorder, count, elapsed):
+    lost = count - recorder.count
+    res = result(elapsed / max(recorder.count, 1), messages=recorder.count, lost=lost)
+
+    if recorder.latencies:
+        lat = recorder.latencies
+        res.update(latency_mean_us=sum(lat) / len(lat), latency_p50_us=percentile(lat, 50),
+                   latency_p99_us=percentile(lat, 99), latency_max_us=max(lat))
+
+    return res
+
+
+def run_throughput_blocking(client, recorder, count, window):
+    data = throughput_message()
+    start = ticks_us()
+    sent = 0
+
+    while sent < count:
+        for _ in range(min(window, count - sent)):
+            client.send(data)
+            sent += 1
+
+        if not _wait(recorder, sent):
+            break
+
+    return _report(recorder, count, ticks_diff(ticks_us(), start))
+
+
+def run_latency_blocking(client, recorder, count):
+    start = ticks_us()
+
+    for i in range(count):
+        client.send(latency_message())
+
+        if not _wait(recorder, i + 1):
+            break
+
+    return _report(recorder, count, ticks_diff(ticks_us(), start))
+
+
+def bench_minimal_server(port, count, window):
+    recorder = Recorder()
+
+    def handler(data, caddr):
+        handle_osc(data, caddr, dispatch=recorder)
+
+    # The server thread runs until the process exits
+    _thread.start_new_thread(run_server, (HOST, port, handler))
+    time.sleep(0.2)
+    client = Client(HOST, port)
+    results = {}
+
+    try:
+        results['throughput'] = run_throughput_blocking(client, recorder, count, window)
+        recorder.count = 0
+        results['latency'] = run_latency_blocking(client, recorder, count // 10 or 1)
+    finally:
+        client.close()
+
+    return results
+
+
+async def _await_count(recorder, count):
+    start = ticks_us()
+
+    while recorder.count < count and ticks_diff(ticks_us(), start) < TIMEOUT_US:
+        await asyncio.sleep(0)
+
+    return recorder.count >= count
+
+
+async def _async_bench(port, count, window):
+    recorder = Recorder()
+
+    if async_server.HAVE_DATAGRAM_PROTOCOL:
+        server = async_server.DatagramServer()
+        handler = async_server.handle_request
+    else:
+        server = async_server.UDPServer(poll_timeout=0)
+
+        async def handler(sock, data, caddr, **params):
+            handle_osc(data, caddr, **params)
+
+    task = asyncio.create_task(server.serve(HOST, port, handler, dispatch=recorder))
+    await asyncio.sleep(0.2)
+    client = Client(HOST, port)
+    results = {}
+
+    try:
+        data = throughput_message()
+        start = ticks_us()
+        sent = 0
+
+        while sent < count:
+            for _ in range(min(window, count - sent)):
+                client.send(data)
+                sent += 1
+
+            if not await _await_count(recorder, sent):
+                break
+
+        results['throughput'] = _report(recorder, count, ticks_diff(ticks_us(), start))
+        recorder.count = 0
+        nlat = count // 10 or 1
+        start = ticks_us()
+
+        for i in range(nlat):
+            client.send(latency_message())
+
+            if not await _await_count(recorder, i + 1):
+                break
+
+        results['latency'] = _report(recorder, nlat, ticks_diff(ticks_us(), start))
+    finally:
+        client.close()
+        task.cancel()
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    return results
+
+
+def bench_async_server(port, count, window):
+    return asyncio.run(_async_bench(port, count, window))
+
+
+def run(count=10000, window=32, port=DEFAULT_PORT):
+    """Run all loopback benchmarks. Returns dict mapping benchmark names to results."""
+    results = {}
+
+    for name, func, offset in (('minimal_server', bench_minimal_server, 0),
+                               ('async_server', bench_async_server, 1)):
+        for kind, res in func(port + offset, count, window).items():
+            results['loopback.%s.%s' % (name, kind)] = res
+
+    return results
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmarks for encoding, decoding and dispatching OSC messages."""
+
+try:
+    from array import array
+except ImportError:
+    from uarray import array
+
+from uosc.client import Bundle, create_message, pack_bundle
+from uosc.server import handle_osc, parse_bundle, parse_message
+
+from benchmarks.util import bench, result
+
+
+TIMETAG = 3657147741.655295
+# representative messages: (name, address, args)
+MESSAGES = [
+    ('int', '/i', (42,)),
+    ('fader', '/mixer/1/fader', (3, 0.75)),
+    ('mixed', '/mixed', (1000, -1.5, 'hello', b'\x00\x01\x02\x03\x04\x05')),
+    ('string', '/text', ('x' * 100,)),
+    ('floats32', '/sensor/frame', tuple(float(i) for i in range(32))),
+    ('timetag', '/tt', (('t', TIMETAG), True, None)),
+    ('array512', '/sensor/array', (array('f', range(512)),)),
+]
+
+
+def make_bundles():
+    flat = Bundle(TIMETAG)
+
+    for name, addr, args in MESSAGES:
+        if not name.startswith('array'):
+            flat.add((addr,) + args)
+
+    nested = Bundle(TIMETAG, ('/outer', 1), Bundle(TIMETAG, ('/inner', 2.0), flat))
+    return [('flat', flat), ('nested', nested)]
+
+
+def nop(timetag, msg):
+    pass
+
+
+def run(number=2000, repeat=3):
+    """Run all microbenchmarks. Returns dict mapping benchmark names to results."""
+    results = {}
+
+    for name, addr, args in MESSAGES:
+        data = create_message(addr, *args)
+
+        if name.startswith('array'):
+            results['parse_message.%s_arrays' % name] = result(
+                bench(lambda: parse_message(data, arrays=True), number, repeat), size=len(data))
+
+        results['create_message.' + name] = result(
+            bench(lambda: create_message(addr, *args), number, repeat), size=len(data))
+        results['parse_message.' + name] = result(
+            bench(lambda: parse_message(data), number, repeat), size=len(data))
+        results['handle_osc.' + name] = result(
+            bench(lambda: handle_osc(data, None, dispatch=nop), number, repeat), size=len(data))
+        results['handle_osc.%s_lazy' % name] = result(
+            bench(lambda: handle_osc(data, None, dispatch=nop, lazy=True), number, repeat),
+            size=len(data))
+
+    for name, bundle in make_bundles():
+        data = pack_bundle(bundle)
+        results['pack_bundle.' + name] = result(
+            bench(lambda: pack_bundle(bundle), number, repeat), size=len(data))
+        results['parse_bundle.' + name] = result(
+            bench(lambda: list(parse_bundle(data)), number, repeat), size=len(data))
+        results['handle_osc.bundle_' + name] = result(
+            bench(lambda: handle_osc(data, None, dispatch=nop), number, repeat), size=len(data))
+
+    return results
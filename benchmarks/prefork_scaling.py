@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Measure how throughput of the pre-fork OSC server scales with worker count.
+
+Runs ``uosc.tools.prefork_server.PreforkServer`` on loopback with 1, 2, 4, ...
+worker processes, floods it from several sender processes and reports the
+number of messages per second the workers decoded and dispatched.
+
+Run from the root directory of the repository:
+
+    PYTHONPATH="$(pwd)" python -m benchmarks.prefork_scaling -w 8 -d 5
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+
+from uosc.client import create_message
+from uosc.tools.prefork_server import PreforkServer
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def flood(port, duration, nsockets=16):
+    # use several sockets, since the kernel distributes datagrams to workers
+    # by hashing source and destination address and port
+    msg = create_message('/bench/fader', 42, 0.5, 'spamm')
+    socks = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(nsockets)]
+    dest = ('127.0.0.1', port)
+    end = time.time() + duration
+
+    while time.time() < end:
+        for sock in socks:
+            for _ in range(64):
+                try:
+                    sock.sendto(msg, dest)
+                except OSError:
+                    pass
+
+
+def run(workers, senders, duration):
+    port = free_port()
+
+    with PreforkServer('127.0.0.1', port, workers=workers) as server:
+        time.sleep(0.5)
+        procs = [multiprocessing.Process(target=flood, args=(port, duration))
+                 for _ in range(senders)]
+        before = server.stats()['messages']
+        start = time.time()
+
+        for proc in procs:
+            proc.start()
+
+        for proc in procs:
+            proc.join()
+
+        # let workers drain their socket buffers
+        time.sleep(0.2)
+        elapsed = time.time() - start
+        return (server.stats()['messages'] - before) / elapsed
+
+
+def main(args=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('-w', '--max-workers', type=int, default=os.cpu_count() or 1,
+                    help="Maximum number of worker processes (default: number of CPUs)")
+    ap.add_argument('-s', '--senders', type=int, default=2,
+                    help="Number of sender processes (default: 2)")
+    ap.add_argument('-d', '--duration', type=float, default=3.0,
+                    help="Duration of each run in seconds (default: 3)")
+    args = ap.parse_args(args)
+
+    counts = []
+    workers = 1
+    while workers < args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(args.max_workers)
+
+    print("%8s %14s %8s" % ("workers", "messages/s", "speedup"))
+    base = None
+
+    for workers in counts:
+        rate = run(workers, args.senders, args.duration)
+        base = base or rate
+        print("%8i %14.0f %7.2fx" % (workers, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Compare OSC message throughput over UDP and TCP on loopback.
+
+Sends the same messages over UDP, TCP with length-prefix framing and TCP
+with SLIP framing, each with the blocking and with the asyncio client and
+server, and reports messages per second received and decoded by the server.
+UDP datagrams dropped by the kernel are not counted.
+
+Run from the root directory of the repository:
+
+    PYTHONPATH="$(pwd)" python -m benchmarks.transports -n 50000
+
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+from uosc.asyncclient import AsyncClient
+from uosc.client import Client, create_message
+from uosc.tcp import (FRAMING_LENGTH, FRAMING_SLIP, AsyncTCPClient, TCPClient, run_tcp_server,
+                      serve_tcp)
+from uosc.tools.async_server import DatagramServer, handle_request
+from uosc.tools.minimal_server import run_server
+from uosc.server import handle_osc
+
+
+MESSAGE = create_message('/bench/fader', 42, 0.5, 'spamm')
+
+
+def free_port(type_=socket.SOCK_DGRAM):
+    with socket.socket(socket.AF_INET, type_) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+        self.last = None
+
+    def __call__(self, timetag, msg):
+        self.count += 1
+        self.last = time.time()
+
+
+def wait_for(counter, count, timeout=2.0):
+    # wait until all messages have arrived or none arrived for timeout seconds
+    last = -1
+    while counter.count < count and counter.count != last:
+        last = counter.count
+        end = time.time() + timeout
+        while counter.count == last and counter.count < count and time.time() < end:
+            time.sleep(0.001)
+
+
+def bench_blocking(transport, count):
+    counter = Counter()
+
+    if transport == 'udp':
+        port = free_port()
+        target = run_server
+        kwargs = dict(handler=lambda data, src: handle_osc(data, src, dispatch=counter))
+        client = Client('127.0.0.1', port)
+    else:
+        port = free_port(socket.SOCK_STREAM)
+        target = run_tcp_server
+        kwargs = dict(framing=transport, dispatch=counter)
+
+    thread = threading.Thread(target=target, args=('127.0.0.1', port), kwargs=kwargs,
+                              daemon=True)
+    thread.start()
+    time.sleep(0.1)
+
+    if transport != 'udp':
+        client = TCPClient('127.0.0.1', port, framing=transport)
+
+    start = time.time()
+
+    with client:
+        for _ in range(count):
+            client.send(MESSAGE)
+
+        wait_for(counter, count)
+
+    return counter.count / (counter.last - start), counter.count
+
+
+async def bench_asyncio(transport, count):
+    counter = Counter()
+
+    if transport == 'udp':
+        port = free_port()
+        server = asyncio.ensure_future(DatagramServer().serve(
+            '127.0.0.1', port, handle_request, dispatch=counter))
+        client = AsyncClient('127.0.0.1', port)
+    else:
+        port = free_port(socket.SOCK_STREAM)
+        server = asyncio.ensure_future(serve_tcp(
+            '127.0.0.1', port, framing=transport, dispatch=counter))
+        client = AsyncTCPClient('127.0.0.1', port, framing=transport)
+
+    await asyncio.sleep(0.1)
+    start = time.time()
+
+    async with client:
+        for _ in range(count):
+            await client.send(MESSAGE)
+            # let the server run, asyncio reads one datagram per loop iteration
+            await asyncio.sleep(0)
+
+        last = -1
+        while counter.count < count and counter.count != last:
+            last = counter.count
+            await asyncio.sleep(0.1)
+
+    server.cancel()
+    await asyncio.gather(server, return_exceptions=True)
+    return counter.count / (counter.last - start), counter.count
+
+
+def main(args=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('-n', '--count', type=int, default=20000,
+                    help="Number of messages per run (default: 20000)")
+    args = ap.parse_args(args)
+
+    print("%-8s %-8s %12s %10s" % ("mode", "transport", "messages/s", "received"))
+
+    for transport in ('udp', FRAMING_LENGTH, FRAMING_SLIP):
+        rate, received = bench_blocking(transport, args.count)
+        print("%-8s %-8s %12.0f %10i" % ("blocking", transport, rate, received))
+
+    for transport in ('udp', FRAMING_LENGTH, FRAMING_SLIP):
+        rate, received = asyncio.run(bench_asyncio(transport, args.count))
+        print("%-8s %-8s %12.0f %10i" % ("asyncio", transport, rate, received))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Timing and result helpers for the benchmarks, which work on CPython and MicroPython."""
+
+import sys
+
+try:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+except ImportError:
+    from time import ticks_diff, ticks_us
+
+
+def bench(func, number, repeat=3):
+    """Call func number times, repeat times. Returns the fastest time per call in µs."""
+    best = None
+
+    for _ in range(repeat):
+        start = ticks_us()
+
+        for _ in range(number):
+            func()
+
+        elapsed = ticks_diff(ticks_us(), start)
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best / number
+
+
+def result(us_per_op, **extra):
+    res = {
+        'us_per_op': us_per_op,
+        'ops_per_sec': 1000000.0 / us_per_op if us_per_op else 0.0,
+    }
+    res.update(extra)
+    return res
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def metadata():
+    impl = sys.implementation
+    return {
+        'implementation': impl.name,
+        'version': '.'.join(str(v) for v in impl.version[:3]),
+        'platform': sys.platform,
+    }
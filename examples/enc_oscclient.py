@@ -4,9 +4,12 @@ from time import sleep_ms
 # https://github.com/SpotlightKid/micropython-stm-lib/tree/master/encoder
 from encoder import Encoder
 from uosc.client import Client
+from uosc.coalesce import CoalescingSender
 
 
-UPDATE_DELAY = const(50)
+UPDATE_DELAY = const(5)
+# Max. number of OSC messages per second for each of encoder and switch
+MAX_RATE = const(20)
 OSC_SERVER = '192.168.42.1'
 OSC_PORT = const(12101)
 OSC_TOPIC = '/midi'
@@ -19,7 +22,8 @@ PIN_SW = const(2)
 
 def main():
     enc = Encoder(pin_clk=PIN_CLK, pin_dt=PIN_DT, clicks=4, accel=5, max_val=127)
-    osc = Client(OSC_SERVER, OSC_PORT)
+    # Only the latest encoder value is sent, when the rate limit allows it
+    osc = CoalescingSender(Client(OSC_SERVER, OSC_PORT), address_rate=MAX_RATE)
     sw = Pin(PIN_SW, Pin.IN, None)
 
     oldval = 0
@@ -27,15 +31,18 @@ def main():
     try:
         while True:
             if enc.value != oldval:
-                osc.send(OSC_TOPIC, ('m', (0, 0xB0, MIDI_CC_ENC, enc.value)))
+                osc.send(OSC_TOPIC, ('m', (0, 0xB0, MIDI_CC_ENC, enc.value)), key=MIDI_CC_ENC)
                 oldval = enc.value
 
             enc.cur_accel = max(0, enc.cur_accel - enc.accel)
 
             if sw() != oldsw:
-                osc.send(OSC_TOPIC, ('m', (0, 0xB0, MIDI_CC_SW, 0 if sw() else 127)))
+                osc.send(OSC_TOPIC, ('m', (0, 0xB0, MIDI_CC_SW, 0 if sw() else 127)),
+                         key=MIDI_CC_SW)
                 oldsw = sw()
 
+            osc.poll()
+
             sleep_ms(UPDATE_DELAY)
     except Exception as exc:
         enc.close()
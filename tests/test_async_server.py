@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.tools.async_server module."""
+
+import asyncio
+import socket
+import unittest
+
+from uosc.client import create_message
+from uosc.server import BufferPool
+from uosc.tools.async_server import DatagramServer, UDPServer, handle_request
+
+
+class TestDatagramServer(unittest.TestCase):
+    def run_server(self, cb, count=3, **params):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        async def main():
+            server = DatagramServer()
+            task = asyncio.ensure_future(server.serve('127.0.0.1', port, cb, **params))
+            await asyncio.sleep(0.01)
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                for i in range(count):
+                    client.sendto(create_message('/test', i), ('127.0.0.1', port))
+
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return server
+
+        server = asyncio.run(main())
+        self.assertIsNone(server.transport)
+
+    def test_sync_handler(self):
+        received = []
+
+        def dispatch(timetag, msg):
+            received.append(msg[2][0])
+
+        self.run_server(handle_request, dispatch=dispatch)
+        self.assertEqual(received, [0, 1, 2])
+
+    def test_sync_handler_exception(self):
+        calls = []
+
+        def cb(sock, data, caddr):
+            calls.append(data)
+            raise RuntimeError("handler failed")
+
+        self.run_server(cb)
+        self.assertEqual(len(calls), 3)
+
+    def test_coroutine_handler(self):
+        received = []
+
+        async def cb(sock, data, caddr):
+            await asyncio.sleep(0)
+            received.append(data)
+
+        self.run_server(cb, count=2)
+        self.assertEqual(received, [create_message('/test', 0), create_message('/test', 1)])
+
+
+class TestUDPServer(unittest.TestCase):
+    def test_pool_detach(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        pool = BufferPool(count=2)
+        kept = []
+        handled = []
+
+        async def cb(sock, data, caddr):
+            if bytes(data) == create_message('/test', 0):
+                kept.append((pool.detach(), data))
+
+            await asyncio.sleep(0)
+            handled.append(bytes(data))
+
+        async def main():
+            server = UDPServer(poll_timeout=1, pool=pool)
+            task = asyncio.ensure_future(server.serve('127.0.0.1', port, cb))
+            await asyncio.sleep(0.01)
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                for i in range(4):
+                    client.sendto(create_message('/test', i), ('127.0.0.1', port))
+                    await asyncio.sleep(0.01)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(main())
+        self.assertEqual(handled, [create_message('/test', i) for i in range(4)])
+        self.assertEqual(len(kept), 1)
+        buf, data = kept[0]
+        # the detached buffer was not reused for later datagrams
+        self.assertEqual(bytes(data), create_message('/test', 0))
+        self.assertFalse(any(free is buf for free in pool._free))
+        self.assertIsNone(pool.current)
+
+
+if __name__ == '__main__':
+    unittest.main()
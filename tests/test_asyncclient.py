@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.asyncclient module."""
+
+import asyncio
+import socket
+import unittest
+
+from uosc.asyncclient import AsyncClient
+from uosc.client import Bundle, create_message, pack_bundle
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(1.0)
+        self.port = self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+
+    def run_client(self, coro_func, **kw):
+        async def main():
+            async with AsyncClient('127.0.0.1', self.port, **kw) as client:
+                return await coro_func(client)
+
+        return asyncio.run(main())
+
+    def test_send(self):
+        bundle = Bundle(3657147741.655295, ('/test2', 3.141))
+
+        async def send(client):
+            await client.send('/test1', 42)
+            await client.send(bundle)
+
+        self.run_client(send)
+        self.assertEqual(self.sock.recv(1500), create_message('/test1', 42))
+        self.assertEqual(self.sock.recv(1500), pack_bundle(bundle))
+
+    def test_send_nowait(self):
+        async def send(client):
+            client.send_nowait('/test1', 42)
+
+        self.run_client(send)
+        self.assertEqual(self.sock.recv(1500), create_message('/test1', 42))
+
+    def test_send_nowait_not_connected(self):
+        async def send(client):
+            client.send_nowait('/test1', 42, dest=('127.0.0.1', self.port + 1))
+
+        self.assertRaises(RuntimeError, self.run_client, send)
+
+    def test_one_transport_per_destination(self):
+        async def send(client):
+            await asyncio.gather(*[client.send('/test1', i) for i in range(5)])
+            return len(client._protocols)
+
+        self.assertEqual(self.run_client(send), 1)
+
+    def test_backpressure(self):
+        async def send(client):
+            proto = await client.connect()
+            proto.pause_writing()
+            self.assertRaises(BlockingIOError, client.send_nowait, '/test1', 1)
+            task = asyncio.ensure_future(client.send('/test1', 2))
+            await asyncio.sleep(0.01)
+            self.assertFalse(task.done())
+            proto.resume_writing()
+            await task
+
+        self.run_client(send)
+        self.assertEqual(self.sock.recv(1500), create_message('/test1', 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
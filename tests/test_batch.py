@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.batch module."""
+
+import unittest
+
+from array import array
+
+from uosc.batch import decode_batch, iter_messages, numpy
+from uosc.client import Bundle, create_message, pack_bundle
+from uosc.common import TimetagNow
+from uosc.server import parse_message
+
+
+MESSAGES = [
+    create_message('/fader', 1, 0.5),
+    create_message('/text', 'hello', b'\x01\x02'),
+    create_message('/fader', 2, 0.25),
+    create_message('/mix', ('c', 'x'), ('m', (0, 0xB0, 7, 0)), ('t', 3657147741.5), ('h', -2),
+                   ('d', 0.1), True, None),
+    create_message('/fader', 3, 0.125),
+    create_message('/nil'),
+    create_message('/text', 'world', b''),
+    create_message('/list', [1, 2.0], 'x'),
+    create_message('/fader', 'not', 'an', 'int'),
+]
+
+
+class BatchTests:
+    use_numpy = False
+
+    def decode(self, *args):
+        return decode_batch(*args, use_numpy=self.use_numpy)
+
+    def check_matches_parse_message(self, groups, messages):
+        decoded = {}
+
+        for group in groups:
+            for i, args in zip(group.index, group.rows()):
+                decoded[i] = (group.address, group.typetags, args)
+
+        self.assertEqual([decoded[i] for i in range(len(messages))],
+                         [parse_message(msg) for msg in messages])
+
+    def test_groups(self):
+        groups = self.decode(MESSAGES)
+        self.assertEqual([(g.address, g.typetags, len(g)) for g in groups], [
+            ('/fader', 'if', 3), ('/text', 'sb', 2), ('/mix', 'cmthdTN', 1), ('/nil', '', 1),
+            ('/list', '[if]s', 1), ('/fader', 'sss', 1)])
+        faders = groups[0]
+        self.assertEqual(faders.index, [0, 2, 4])
+        self.assertEqual(list(faders.columns[0]), [1, 2, 3])
+        self.assertEqual(list(faders.columns[1]), [0.5, 0.25, 0.125])
+        self.assertEqual(groups[1].columns, [['hello', 'world'], [b'\x01\x02', b'']])
+
+    def test_matches_parse_message(self):
+        self.check_matches_parse_message(self.decode(MESSAGES), MESSAGES)
+
+    def test_buffer_and_offsets(self):
+        offsets = []
+        pos = 0
+
+        for msg in MESSAGES:
+            offsets.append(pos)
+            pos += len(msg)
+
+        groups = self.decode(b''.join(MESSAGES), offsets)
+        self.check_matches_parse_message(groups, MESSAGES)
+
+    def test_bundles(self):
+        bundle = pack_bundle(Bundle(3657147741.0, MESSAGES[0], Bundle(TimetagNow, MESSAGES[2])))
+        groups = self.decode([bundle, MESSAGES[4]])
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0].index, [0, 1, 2])
+        self.assertEqual(groups[0].timetags[0], 3657147741.0)
+        self.assertEqual(groups[0].timetags[2], -1)
+        self.assertEqual(groups[0].rows(), [(1, 0.5), (2, 0.25), (3, 0.125)])
+
+    def test_truncated(self):
+        self.assertRaises(ValueError, self.decode, [MESSAGES[0][:-4]])
+
+
+class TestBatchFallback(BatchTests, unittest.TestCase):
+    def test_numeric_columns(self):
+        groups = self.decode(MESSAGES[:1] + [create_message('/f', 1.5), create_message('/f', 2.5)])
+        self.assertIsInstance(groups[0].columns[0], array)
+        self.assertEqual(groups[1].columns[0], array('f', [1.5, 2.5]))
+
+
+@unittest.skipIf(numpy is None, "NumPy not installed")
+class TestBatchNumpy(BatchTests, unittest.TestCase):
+    use_numpy = True
+
+    def test_structured_array(self):
+        group = self.decode(MESSAGES)[0]
+        self.assertEqual(group.data.dtype.names, ('a0', 'a1'))
+        self.assertEqual(group.data['a0'].tolist(), [1, 2, 3])
+
+
+class TestIterMessages(unittest.TestCase):
+    def test_iter_messages(self):
+        items = list(iter_messages([MESSAGES[0], pack_bundle(Bundle(TimetagNow, MESSAGES[5]))]))
+        self.assertEqual([(end - start, timetag) for _, start, end, timetag in items],
+                         [(len(MESSAGES[0]), -1), (len(MESSAGES[5]), items[1][3])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.capture module and the replay tool."""
+
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from uosc.capture import INDEX_ENTRY, INDEX_SUFFIX, RECORD, CaptureReader, CaptureWriter
+from uosc.client import create_message
+from uosc.tools.replay import replay
+
+
+class TestCapture(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'test.cap')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, count=3, start=0):
+        with CaptureWriter(self.path) as writer:
+            for i in range(start, start + count):
+                writer.write(create_message('/foo', i), ('127.0.0.1', 9000 + i), 100.0 + i)
+
+    def test_roundtrip(self):
+        with CaptureWriter(self.path) as writer:
+            writer.write(b'/foo\0\0\0\0,\0\0\0', ('192.168.0.1', 1234), 1.5)
+            writer.write(b'/bar\0\0\0\0,\0\0\0', ('::1', 5678, 0, 0), 2.5)
+            writer.write(b'/baz\0\0\0\0,\0\0\0', None, 3.5)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 3)
+            items = [(ts, src, bytes(data)) for ts, src, data in reader]
+
+        self.assertEqual(items, [
+            (1.5, ('192.168.0.1', 1234), b'/foo\0\0\0\0,\0\0\0'),
+            (2.5, ('::1', 5678), b'/bar\0\0\0\0,\0\0\0'),
+            (3.5, ('0.0.0.0', 0), b'/baz\0\0\0\0,\0\0\0'),
+        ])
+
+    def test_wrap(self):
+        received = []
+
+        with CaptureWriter(self.path) as writer:
+            handler = writer.wrap(lambda data, caddr: received.append(data))
+            handler(b'/foo\0\0\0\0', ('127.0.0.1', 9000))
+
+        self.assertEqual(received, [b'/foo\0\0\0\0'])
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(bytes(reader.data(0)), b'/foo\0\0\0\0')
+
+    def test_append(self):
+        self.write(2)
+        self.write(2, 2)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual([reader.timestamp(i) for i in range(len(reader))],
+                             [100.0, 101.0, 102.0, 103.0])
+            self.assertEqual(reader[3][1], ('127.0.0.1', 9003))
+
+    def test_rebuild_missing_index(self):
+        self.write(3)
+        os.remove(self.path + INDEX_SUFFIX)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(reader[2][0], 102.0)
+
+        self.assertFalse(os.path.exists(self.path + INDEX_SUFFIX))
+        CaptureWriter(self.path).close()
+        self.assertEqual(os.path.getsize(self.path + INDEX_SUFFIX), 3 * INDEX_ENTRY.size)
+
+    def test_rebuild_truncated_index(self):
+        self.write(3)
+
+        with open(self.path + INDEX_SUFFIX, 'r+b') as fp:
+            fp.truncate(INDEX_ENTRY.size + 5)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual([ts for ts, _, _ in reader], [100.0, 101.0, 102.0])
+
+        self.assertEqual(os.path.getsize(self.path + INDEX_SUFFIX), INDEX_ENTRY.size + 5)
+        self.write(1, 3)
+
+        with open(self.path + INDEX_SUFFIX, 'rb') as fp:
+            index = fp.read()
+
+        self.assertEqual([ts for _, ts in INDEX_ENTRY.iter_unpack(index)],
+                         [100.0, 101.0, 102.0, 103.0])
+
+    def test_incomplete_record(self):
+        self.write(2)
+
+        with open(self.path, 'r+b') as fp:
+            fp.truncate(os.path.getsize(self.path) - 4)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 1)
+
+        self.write(1, 5)
+
+        # the writer must index the appended record at its actual offset
+        with open(self.path + INDEX_SUFFIX, 'rb') as fp:
+            index = fp.read()
+
+        size = os.path.getsize(self.path)
+        record = len(create_message('/foo', 5)) + RECORD.size
+        self.assertEqual(INDEX_ENTRY.unpack_from(index, INDEX_ENTRY.size)[0], size - record)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual([ts for ts, _, _ in reader], [100.0, 105.0])
+
+    def test_not_a_capture(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'garbage!')
+
+        self.assertRaises(ValueError, CaptureReader, self.path)
+        self.assertRaises(ValueError, CaptureWriter, self.path)
+
+    def test_find_time(self):
+        self.write(5)
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(reader.find_time(0), 0)
+            self.assertEqual(reader.find_time(102.0), 2)
+            self.assertEqual(reader.find_time(102.5), 3)
+            self.assertEqual(reader.find_time(200), 5)
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'test.cap')
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(2.0)
+        self.dest = self.sock.getsockname()
+
+        with CaptureWriter(self.path) as writer:
+            for i in range(10):
+                writer.write(create_message('/foo', i), ('127.0.0.1', 9000), 1000.0 + i * 0.01)
+
+    def tearDown(self):
+        self.sock.close()
+        shutil.rmtree(self.tmpdir)
+
+    def receive(self, count):
+        return [self.sock.recv(1024) for _ in range(count)]
+
+    def test_replay_fast(self):
+        with CaptureReader(self.path) as reader:
+            stats = replay(reader, self.dest, speed=0)
+
+        self.assertEqual(self.receive(10), [create_message('/foo', i) for i in range(10)])
+        self.assertEqual(stats['messages'], 10)
+        self.assertEqual(stats['bytes'], 10 * len(create_message('/foo', 0)))
+        self.assertEqual(stats['error_max'], 0.0)
+
+    def test_replay_timing(self):
+        with CaptureReader(self.path) as reader:
+            stats = replay(reader, self.dest, speed=2.0, start=2, count=5)
+
+        self.assertEqual(self.receive(5), [create_message('/foo', i) for i in range(2, 7)])
+        self.assertEqual(stats['messages'], 5)
+        # 4 intervals of 10 ms at double speed
+        self.assertGreaterEqual(stats['elapsed'], 0.02)
+        self.assertGreaterEqual(stats['error_p50'], 0.0)
+
+    def test_replay_empty_range(self):
+        with CaptureReader(self.path) as reader:
+            stats = replay(reader, self.dest, start=10)
+
+        self.assertEqual(stats['messages'], 0)
+        self.assertEqual(stats['rate'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
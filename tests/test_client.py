@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 """Unit tests for the uosc.client module."""
 
+import socket
 import sys
 import time
 import unittest
 
-from uosc.client import Bundle, create_message, pack_bundle
+from array import array
+from struct import pack
+
+import uosc.client
+from uosc.client import (Bundle, BundleWriter, Client, MessageTemplate, close_sockets,
+                         create_message, get_socket, pack_addr, pack_bundle, resolve,
+                         resolve_cache, send, socket_pool, split_bundle)
 from uosc.common import Impulse, TimetagNow, NTP_DELTA
+from uosc.server import parse_bundle
 
 try:
     from struct import error as StructError
@@ -164,6 +172,128 @@ class TestCreateMessage(unittest.TestCase):
         self.assertMessage(b'/inf\0\0\0\0,I\0\0', '/inf', Impulse)
 
 
+class TestArrays(unittest.TestCase):
+    def test_list(self):
+        msg = create_message('/list', 1, [2, 'x', [3.0]], True)
+        self.assertEqual(msg, b'/list\0\0\0,i[is[f]]T\0\0\0\0\0\x01'
+                              b'\0\0\0\x02x\0\0\0@@\0\0')
+
+    def test_empty_list(self):
+        self.assertEqual(create_message('/e', []), b'/e\0\0,[]\0')
+
+    def test_float_array(self):
+        values = [0.5, -1.0, 2.25]
+        msg = create_message('/a', array('f', values))
+        self.assertEqual(msg, b'/a\0\0,[fff]\0\0' + pack('>3f', *values))
+        self.assertEqual(msg, create_message('/a', [('f', v) for v in values]))
+
+    def test_double_array(self):
+        msg = create_message('/a', array('d', [0.1, 0.2]))
+        self.assertEqual(msg, b'/a\0\0,[dd]\0\0\0' + pack('>2d', 0.1, 0.2))
+
+    def test_int_arrays(self):
+        small = create_message('/a', array('B', [1, 255]))
+        self.assertEqual(small, b'/a\0\0,[ii]\0\0\0' + pack('>2i', 1, 255))
+        big = create_message('/a', array('q', [2 ** 40]))
+        self.assertEqual(big, b'/a\0\0,[h]\0\0\0\0' + pack('>q', 2 ** 40))
+
+    def test_memoryview(self):
+        values = array('i', [1, -1])
+        self.assertEqual(create_message('/a', memoryview(values)),
+                         create_message('/a', values))
+        # byte memoryviews are blobs
+        self.assertEqual(create_message('/b', memoryview(b'ab')), create_message('/b', b'ab'))
+
+    def test_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+
+        values = numpy.arange(6, dtype='float32').reshape((2, 3))
+        self.assertEqual(create_message('/a', values),
+                         create_message('/a', array('f', range(6))))
+        self.assertEqual(create_message('/a', numpy.array([1, 2], dtype='uint32')),
+                         create_message('/a', array('q', [1, 2])))
+
+    def test_numpy_scalars(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy not installed")
+
+        self.assertEqual(create_message('/a', numpy.float32(1.5), numpy.float64(2.5)),
+                         create_message('/a', ('f', 1.5), ('d', 2.5)))
+        self.assertEqual(create_message('/a', numpy.int32(-1), numpy.uint32(1), numpy.int64(2)),
+                         create_message('/a', ('i', -1), ('h', 1), ('h', 2)))
+        self.assertEqual(create_message('/a', numpy.bool_(True), numpy.array(3.0)),
+                         create_message('/a', True, ('d', 3.0)))
+
+
+class TestMessageTemplate(unittest.TestCase):
+    def assertSameAsMessage(self, tmpl, *args):
+        values = [arg for tag, arg in args if tag not in 'IFNT']
+        self.assertEqual(tmpl.pack(*values), create_message(tmpl.address, *args))
+
+    def test_template_noargs(self):
+        tmpl = MessageTemplate('/nil')
+        self.assertEqual(tmpl.pack(), b'/nil\0\0\0\0,\0\0\0')
+        self.assertEqual(tmpl.size, 12)
+
+    def test_template_typetags_with_comma(self):
+        self.assertEqual(MessageTemplate('/i', ',i').typetags, 'i')
+
+    def test_template_fixed(self):
+        tmpl = MessageTemplate('/fixed', 'ifdhcTmtN')
+        self.assertSameAsMessage(
+            tmpl, ('i', 42), ('f', 3.5), ('d', -1.25), ('h', 2 ** 40), ('c', 'x'),
+            ('T', True), ('m', (0, 0xB0, 7, 64)), ('t', 3657147741.655295), ('N', None))
+        self.assertEqual(tmpl.size, len(tmpl.pack(42, 3.5, -1.25, 1, 'x', b'\0\0\0\0', 1)))
+
+    def test_template_timetag_now(self):
+        tmpl = MessageTemplate('/tt', 't')
+        self.assertSameAsMessage(tmpl, ('t', TimetagNow))
+
+    def test_template_array(self):
+        tmpl = MessageTemplate('/frame', 'i[ffff]')
+        values = [1.0, 2.0, 3.0, 4.0]
+        self.assertEqual(tmpl.pack(1, values), create_message('/frame', 1, array('f', values)))
+        self.assertEqual(tmpl.pack(1, array('f', values)), tmpl.pack(1, values))
+        self.assertRaises(ValueError, tmpl.pack, 1, values[:3])
+
+    def test_template_invalid_array(self):
+        self.assertRaises(TypeError, MessageTemplate, '/a', '[fi]')
+        self.assertRaises(TypeError, MessageTemplate, '/a', '[f')
+        self.assertRaises(TypeError, MessageTemplate, '/a', '[]')
+
+    def test_template_variable(self):
+        tmpl = MessageTemplate('/var', 'isbfS')
+        self.assertIsNone(tmpl.size)
+        self.assertSameAsMessage(
+            tmpl, ('i', 1000), ('s', u'hello'), ('b', b'\x01\x02\x03'), ('f', 1.5),
+            ('S', 'SPAMM'))
+
+    def test_template_pack_into(self):
+        for tmpl, args in ((MessageTemplate('/i', 'ii'), (1, 2)),
+                           (MessageTemplate('/s', 'is'), (1, u'two'))):
+            data = tmpl.pack(*args)
+            buf = bytearray(4 + len(data))
+            end = tmpl.pack_into(buf, 4, *args)
+            self.assertEqual(end, len(buf))
+            self.assertEqual(bytes(buf[4:]), data)
+
+    def test_template_wrong_arg_count(self):
+        self.assertRaises((TypeError, StructError), MessageTemplate('/i', 'i').pack)
+        self.assertRaises(TypeError, MessageTemplate('/c', 'c').pack, 'x', 'y')
+        self.assertRaises(TypeError, MessageTemplate('/s', 'is').pack, 1)
+
+    def test_template_invalid_typetag(self):
+        self.assertRaises(TypeError, MessageTemplate, '/x', 'ix')
+
+    def test_template_address_nonascii(self):
+        self.assertRaises(AssertionError, MessageTemplate, '/böse', 'i')
+
+
 class TestBundle(unittest.TestCase):
     timetag = 3657147741.655295
     data1 = (b'#bundle\x00\xd9\xfb\xa5]\xa7\xc1h\x00\x00\x00\x00\x10'
@@ -210,6 +340,285 @@ class TestBundle(unittest.TestCase):
         bundle1.add(bundle2)
         self.assertEqual(pack_bundle(bundle1), self.data2)
 
+    def test_pack_into(self):
+        bundle = Bundle(self.timetag, ('/test1', 42), Bundle(self.timetag, ('/test2', 3.141)))
+        buf = bytearray(b'x' * (len(self.data2) + 8))
+        self.assertEqual(bundle.pack_into(buf, 4), len(self.data2) + 4)
+        self.assertEqual(bytes(buf), b'xxxx' + self.data2 + b'xxxx')
+        self.assertEqual(bundle.pack(), self.data2)
+
+    def test_pack_into_too_small(self):
+        bundle = Bundle(self.timetag, ('/test1', 42), ('/test2', 3.141), ('/test3', u'hello'))
+        buf = bytearray(len(self.data1) - 1)
+        self.assertRaises(ValueError, bundle.pack_into, buf)
+        self.assertEqual(buf, bytearray(len(self.data1) - 1))
+
+    def test_writer_size(self):
+        bundle = Bundle(self.timetag, ('/test1', 42), Bundle(self.timetag, ('/test2', 3.141)))
+        writer = BundleWriter(bundle)
+        self.assertEqual(writer.size, len(self.data2))
+        buf = bytearray(writer.size)
+        self.assertEqual(writer.pack_into(buf), writer.size)
+        self.assertEqual(bytes(buf), self.data2)
+
+    def test_pack_deeply_nested(self):
+        inner = Bundle(TimetagNow, ('/inner', 1), create_message('/blob', b'\x01' * 100))
+        bundle = inner
+
+        for i in range(10):
+            bundle = Bundle(self.timetag, bundle, ('/level', i))
+
+        parsed = list(parse_bundle(pack_bundle(bundle)))
+        self.assertEqual(len(parsed), 12)
+        self.assertEqual(parsed[0][1], ('/inner', 'i', (1,)))
+        self.assertEqual(parsed[1][1][2], (b'\x01' * 100,))
+        self.assertEqual(parsed[-1][1], ('/level', 'i', (9,)))
+
+    def test_template_in_bundle(self):
+        fader = MessageTemplate('/fader', 'if')
+        bundle = Bundle(self.timetag, (fader, 1, 0.5))
+        self.assertEqual(pack_bundle(bundle),
+                         pack_bundle(Bundle(self.timetag, ('/fader', 1, 0.5))))
+
+
+class TestSplitBundle(unittest.TestCase):
+    timetag = 3657147741.6552954
+
+    def messages(self, data):
+        return [(timetag, msg) for timetag, msg in parse_bundle(data)]
+
+    def test_small_bundle_unchanged(self):
+        bundle = Bundle(self.timetag, ('/test1', 42), Bundle(TimetagNow, ('/test2', 1.0)))
+        self.assertEqual(split_bundle(bundle), [pack_bundle(bundle)])
+
+    def test_split_flat(self):
+        # each message is 24 bytes + 4 bytes size prefix
+        bundle = Bundle(self.timetag, *[('/msg', 'x' * 10) for i in range(10)])
+        packets = split_bundle(bundle, 16 + 3 * 24 + 3 * 4)
+        self.assertEqual([len(p) for p in packets], [100, 100, 100, 44])
+        expected = self.messages(pack_bundle(bundle))
+        self.assertEqual(sum((self.messages(p) for p in packets), []), expected)
+
+    def test_split_nested_keeps_timetags(self):
+        later = self.timetag + 1.0
+        bundle = Bundle(self.timetag, ('/a', 1),
+                        Bundle(later, *[('/b', i) for i in range(20)]),
+                        ('/c', 2), Bundle(TimetagNow, ('/d', 3)))
+        packets = split_bundle(bundle, 128)
+        self.assertTrue(len(packets) > 1)
+        self.assertTrue(all(len(p) <= 128 for p in packets))
+        result = sum((self.messages(p) for p in packets), [])
+        self.assertEqual(result, self.messages(pack_bundle(bundle)))
+
+        for p in packets:
+            # outer timetag is kept for each packet
+            self.assertEqual(p[:16], pack_bundle(Bundle(self.timetag))[:16])
+
+    def test_as_few_packets_as_possible(self):
+        bundle = Bundle(self.timetag, *[('/msg', i) for i in range(100)])
+        packets = split_bundle(bundle, 200)
+        # 16 bytes header per packet and 20 bytes per element: 9 elements per packet
+        self.assertEqual([len(p) for p in packets], [196] * 11 + [16 + 20])
+
+    def test_oversized_message(self):
+        bundle = Bundle(self.timetag, ('/ok', 1), ('/blob', b'x' * 200))
+        self.assertRaises(ValueError, split_bundle, bundle, 128)
+
+    def test_oversized_with_nesting(self):
+        # fits at the top level, but not with the header of the nested bundle
+        msg = create_message('/blob', b'x' * 80)
+        self.assertEqual(len(split_bundle(Bundle(self.timetag, msg, msg), 16 + 4 + len(msg))), 2)
+        bundle = Bundle(self.timetag, Bundle(self.timetag, msg, msg))
+        self.assertRaises(ValueError, split_bundle, bundle, 16 + 4 + len(msg))
+
+    def test_client_split(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.settimeout(1.0)
+        bundle = Bundle(self.timetag, *[('/msg', 'x' * 10) for i in range(10)])
+
+        try:
+            with Client('127.0.0.1', sock.getsockname()[1], max_size=100, split=True) as client:
+                client.send(bundle)
+
+            packets = [sock.recv(1024) for _ in range(4)]
+        finally:
+            sock.close()
+
+        self.assertEqual(packets, split_bundle(bundle, 100))
+
+
+class TestResolve(unittest.TestCase):
+    def setUp(self):
+        resolve_cache.clear()
+        self.lookups = []
+        self._getaddrinfo = socket.getaddrinfo
+        self._ttl = uosc.client.RESOLVE_TTL
+        socket.getaddrinfo = self.getaddrinfo
+
+    def tearDown(self):
+        socket.getaddrinfo = self._getaddrinfo
+        uosc.client.RESOLVE_TTL = self._ttl
+        resolve_cache.clear()
+
+    def getaddrinfo(self, host, port, *args):
+        self.lookups.append(host)
+
+        if host == 'nonexistent':
+            raise socket.gaierror(-2, 'Name or service not known')
+
+        return self._getaddrinfo(host, port, *args)
+
+    def test_cached(self):
+        self.assertEqual(resolve(('127.0.0.1', 9001)), (socket.AF_INET, ('127.0.0.1', 9001)))
+        self.assertEqual(pack_addr(('127.0.0.1', 9001)), ('127.0.0.1', 9001))
+        self.assertEqual(self.lookups, ['127.0.0.1'])
+
+    def test_ttl(self):
+        uosc.client.RESOLVE_TTL = 0.0
+        resolve(('127.0.0.1', 9001))
+        resolve(('127.0.0.1', 9001))
+        self.assertEqual(len(self.lookups), 2)
+
+    def test_negative(self):
+        for i in range(3):
+            self.assertRaises(socket.gaierror, resolve, ('nonexistent', 9001))
+
+        self.assertEqual(self.lookups, ['nonexistent'])
+
+    def test_ipv6(self):
+        try:
+            family, addr = resolve(('::1', 9001))
+        except OSError:
+            self.skipTest("IPv6 not available")
+
+        self.assertEqual(family, socket.AF_INET6)
+        self.assertEqual(addr[:2], ('::1', 9001))
+
+    def test_ipv6_scope(self):
+        try:
+            family, addr = resolve(('::1', 9001, 0, 1))
+        except OSError:
+            self.skipTest("IPv6 not available")
+
+        self.assertEqual((family, addr), (socket.AF_INET6, ('::1', 9001, 0, 1)))
+
+    def test_invalid_addr(self):
+        self.assertRaises(NotImplementedError, resolve, ('127.0.0.1', 9001, 0))
+
+    def test_bytes(self):
+        self.assertEqual(pack_addr(b'\x02\x00'), b'\x02\x00')
+
+
+class TestSocketPool(unittest.TestCase):
+    def setUp(self):
+        close_sockets()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(1.0)
+        self.port = self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+        close_sockets()
+
+    def test_send_uses_pool(self):
+        send(('127.0.0.1', self.port), '/test1', 42)
+        send(self.port, '/test2', 'x')
+        self.assertEqual(len(socket_pool), 1)
+        data, addr1 = self.sock.recvfrom(1024)
+        self.assertEqual(data, create_message('/test1', 42))
+        data, addr2 = self.sock.recvfrom(1024)
+        self.assertEqual(data, create_message('/test2', 'x'))
+        self.assertEqual(addr1, addr2)
+
+    def test_client_shares_socket(self):
+        with Client('127.0.0.1', self.port, pooled=True) as client:
+            client.send('/test1', 42)
+            client.send('/test1', 43, dest=('127.0.0.1', self.port))
+
+        self.assertTrue(get_socket() is socket_pool[socket.AF_INET])
+        self.assertFalse(get_socket()._closed)
+        ports = set(self.sock.recvfrom(1024)[1][1] for _ in range(2))
+        self.assertEqual(ports, set([get_socket().getsockname()[1]]))
+
+    def test_client_own_socket(self):
+        with Client('127.0.0.1', self.port) as client:
+            client.send('/test1', 42)
+            sock = client.sock
+
+        self.assertEqual(self.sock.recv(1024), create_message('/test1', 42))
+        self.assertTrue(sock._closed)
+        self.assertEqual(len(socket_pool), 0)
+
+
+class TestBufferedClient(unittest.TestCase):
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(1.0)
+        self.port = self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+
+    def recv(self):
+        return self.sock.recv(65536)
+
+    def assertNothingReceived(self):
+        self.sock.settimeout(0.05)
+        self.assertRaises(socket.timeout, self.recv)
+        self.sock.settimeout(1.0)
+
+    def test_buffered_flush(self):
+        msg = create_message('/test1', 42)
+        with Client('127.0.0.1', self.port, buffered=True) as client:
+            client.send('/test1', 42)
+            client.send(msg)
+            self.assertNothingReceived()
+            client.flush()
+            data = self.recv()
+
+        self.assertEqual(data[:16], b'#bundle\0\0\0\0\0\0\0\0\x01')
+        self.assertEqual(data[16:], (b'\0\0\0\x10' + msg) * 2)
+
+    def test_buffered_single_message(self):
+        with Client('127.0.0.1', self.port, buffered=True) as client:
+            client.send('/test1', 42)
+
+        self.assertEqual(self.recv(), create_message('/test1', 42))
+
+    def test_buffered_max_size(self):
+        msg = create_message('/test1', 42)
+        with Client('127.0.0.1', self.port, buffered=True, max_size=56) as client:
+            for i in range(3):
+                client.send(msg)
+
+            self.assertEqual(len(self.recv()), 56)
+            self.assertNothingReceived()
+
+        self.assertEqual(self.recv(), msg)
+
+    def test_buffered_oversized_message(self):
+        msg = create_message('/test1', 'x' * 40)
+        with Client('127.0.0.1', self.port, buffered=True, max_size=48) as client:
+            client.send('/test1', 42)
+            client.send(msg)
+            self.assertEqual(self.recv(), create_message('/test1', 42))
+            self.assertEqual(self.recv(), msg)
+
+    def test_buffered_max_delay(self):
+        with Client('127.0.0.1', self.port, buffered=True, max_delay=0.2) as client:
+            client.send('/test1', 42)
+            client.poll()
+            # not sent before max_delay, nor after it without a call to poll
+            self.assertNothingReceived()
+            time.sleep(0.2)
+            self.assertNothingReceived()
+            client.poll()
+            self.assertEqual(self.recv(), create_message('/test1', 42))
+            self.assertNothingReceived()
+
 
 if __name__ == '__main__':
     unittest.main()
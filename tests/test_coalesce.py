@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.coalesce module."""
+
+import unittest
+
+from uosc.coalesce import CoalescingSender, TokenBucket
+
+
+class Clock:
+    def __init__(self, now=100000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def send(self, address, *args):
+        self.sent.append((address,) + args)
+
+    def close(self):
+        self.closed = True
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate_and_burst(self):
+        clock = Clock()
+        bucket = TokenBucket(10, burst=2, clock=clock)
+        self.assertTrue(bucket.consume())
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertAlmostEqual(bucket.delay(), 0.1)
+        clock.now += 50
+        self.assertAlmostEqual(bucket.delay(), 0.05)
+        clock.now += 1000
+        self.assertEqual(bucket.delay(), 0.0)
+        # does not accumulate more than burst tokens
+        self.assertTrue(bucket.consume())
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+
+
+class TestCoalescingSender(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.client = Recorder()
+
+    def sender(self, **kw):
+        return CoalescingSender(self.client, clock=self.clock, **kw)
+
+    def test_unlimited(self):
+        osc = self.sender()
+        osc.send('/a', 1)
+        osc.send('/a', 2)
+        self.assertEqual(self.client.sent, [('/a', 1), ('/a', 2)])
+        self.assertEqual(osc.poll(), None)
+
+    def test_address_rate_last_value_wins(self):
+        osc = self.sender(address_rate=10)
+
+        for i in range(100):
+            osc.send('/fader', i)
+            osc.send('/other', -i)
+
+        self.assertEqual(self.client.sent, [('/fader', 0), ('/other', 0)])
+        self.assertAlmostEqual(osc.poll(), 0.1)
+        self.clock.now += 101
+        osc.poll()
+        self.assertEqual(self.client.sent[2:], [('/fader', 99), ('/other', -99)])
+        self.assertEqual(osc.poll(), None)
+        self.assertEqual(osc.stats(), {'received': 200, 'coalesced': 196, 'sent': 4,
+                                       'pending': 0})
+
+    def test_max_keys(self):
+        osc = self.sender(address_rate=10, max_keys=2)
+
+        for i in range(100):
+            osc.send('/fader/%i' % i, i)
+
+        self.assertEqual(len(self.client.sent), 100)
+        self.assertEqual(len(osc._buckets), 2)
+        # the most recently used keys are still limited
+        osc.send('/fader/99', 100)
+        self.assertEqual(len(self.client.sent), 100)
+
+    def test_global_rate(self):
+        osc = self.sender(rate=10, burst=2)
+        osc.send('/a', 1)
+        osc.send('/b', 1)
+        osc.send('/c', 1)
+        osc.send('/a', 2)
+        self.assertEqual([m[0] for m in self.client.sent], ['/a', '/b'])
+        self.clock.now += 101
+        osc.poll()
+        self.assertEqual(self.client.sent[2:], [('/c', 1)])
+        self.clock.now += 101
+        osc.poll()
+        self.assertEqual(self.client.sent[3:], [('/a', 2)])
+
+    def test_key(self):
+        osc = self.sender(address_rate=1)
+        osc.send('/midi', 'enc', 1, key='enc')
+        osc.send('/midi', 'sw', 1, key='sw')
+        osc.send('/midi', 'enc', 2, key='enc')
+        osc.send('/midi', 'sw', 0, key='sw')
+        osc.close()
+        self.assertEqual(self.client.sent, [('/midi', 'enc', 1), ('/midi', 'sw', 1),
+                                            ('/midi', 'enc', 2), ('/midi', 'sw', 0)])
+        self.assertTrue(self.client.closed)
+
+    def test_flush_delivers_final_value(self):
+        osc = self.sender(rate=1)
+        osc.send('/a', 1)
+        osc.send('/a', 2)
+        osc.send('/a', 3)
+        osc.flush()
+        self.assertEqual(self.client.sent, [('/a', 1), ('/a', 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
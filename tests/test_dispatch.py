@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.dispatch module."""
+
+import unittest
+
+from uosc.dispatch import Dispatcher, compile_pattern
+from uosc.server import handle_osc
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, timetag, msg):
+        self.calls.append(msg[0])
+
+
+class TestCompilePattern(unittest.TestCase):
+    def assertMatches(self, pattern, *names):
+        regex = compile_pattern(pattern)
+        for name in names:
+            self.assertTrue(regex.match(name), "%r should match %r" % (pattern, name))
+
+    def assertNotMatches(self, pattern, *names):
+        regex = compile_pattern(pattern)
+        for name in names:
+            self.assertFalse(regex.match(name), "%r should not match %r" % (pattern, name))
+
+    def test_literal(self):
+        self.assertMatches('volume', 'volume')
+        self.assertNotMatches('volume', 'volume2', 'vol')
+        self.assertMatches('a.b', 'a.b')
+        self.assertNotMatches('a.b', 'axb')
+
+    def test_wildcards(self):
+        self.assertMatches('*', '', 'foo')
+        self.assertMatches('fader*', 'fader', 'fader12')
+        self.assertMatches('fader?', 'fader1')
+        self.assertNotMatches('fader?', 'fader', 'fader12')
+
+    def test_char_class(self):
+        self.assertMatches('[1-3]', '1', '3')
+        self.assertNotMatches('[1-3]', '4')
+        self.assertMatches('[!1-3]', '4')
+        self.assertNotMatches('[!1-3]', '2')
+
+    def test_alternatives(self):
+        self.assertMatches('{foo,bar}', 'foo', 'bar')
+        self.assertNotMatches('{foo,bar}', 'baz', 'foobar')
+
+    def test_unterminated(self):
+        self.assertRaises(ValueError, compile_pattern, '[1-3')
+        self.assertRaises(ValueError, compile_pattern, '{foo')
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.rec = Recorder()
+        self.dispatcher = Dispatcher()
+        for addr in ('/mixer/1/volume', '/mixer/2/volume', '/mixer/1/pan', '/transport/play'):
+            self.dispatcher.add(addr, self.rec)
+
+    def dispatch(self, addr):
+        self.dispatcher(-1, (addr, '', (), None))
+        return sorted(self.rec.calls)
+
+    def test_literal(self):
+        self.assertEqual(self.dispatch('/mixer/1/volume'), ['/mixer/1/volume'])
+
+    def test_no_match(self):
+        self.assertEqual(self.dispatch('/mixer/3/volume'), [])
+        self.assertEqual(self.dispatch('/mixer/1'), [])
+
+    def test_default(self):
+        default = Recorder()
+        self.dispatcher.default = default
+        self.dispatch('/unknown')
+        self.assertEqual(default.calls, ['/unknown'])
+
+    def test_pattern(self):
+        self.assertEqual(len(self.dispatcher.match('/mixer/*/volume')), 2)
+        self.assertEqual(len(self.dispatcher.match('/mixer/1/{pan,volume}')), 2)
+        self.assertEqual(len(self.dispatcher.match('/mixer/[!1]/*')), 1)
+        self.assertEqual(len(self.dispatcher.match('/*/*')), 1)
+
+    def test_match_cache(self):
+        self.dispatcher.match('/mixer/*/volume')
+        self.dispatcher.match('/mixer/*/volume')
+        stats = self.dispatcher.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_add_invalidates_cache(self):
+        self.assertEqual(len(self.dispatcher.match('/mixer/*/volume')), 2)
+        self.dispatcher.add('/mixer/3/volume', self.rec)
+        self.assertEqual(len(self.dispatcher.match('/mixer/*/volume')), 3)
+
+    def test_remove(self):
+        self.dispatcher.remove('/mixer/1/pan', self.rec)
+        self.assertEqual(len(self.dispatcher.match('/mixer/1/*')), 1)
+        self.dispatcher.remove('/transport/play')
+        self.assertFalse('transport' in self.dispatcher._root.children)
+        self.assertRaises(KeyError, self.dispatcher.remove, '/transport/play')
+
+    def test_handle_osc(self):
+        handle_osc(b'/mixer/*/volume\0,f\0\0?\0\0\0', None, dispatch=self.dispatcher)
+        self.assertEqual(sorted(self.rec.calls), ['/mixer/*/volume', '/mixer/*/volume'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.executor module."""
+
+import pickle
+import unittest
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from uosc.client import create_message
+from uosc.common import Impulse, TimetagNow
+from uosc.executor import ExecutorDispatch
+from uosc.server import handle_osc
+
+
+def check_sentinels(timetag, msg):
+    # runs in a worker process
+    if timetag is not TimetagNow or msg[2][0] is not Impulse:
+        raise ValueError("Sentinels not preserved.")
+
+
+def fail(timetag, msg):
+    raise RuntimeError("handler failed")
+
+
+class ManualExecutor:
+    """Executor, which runs submitted calls only when told to."""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, func, *args):
+        future = Future()
+        self.pending.append((future, func, args))
+        return future
+
+    def run(self, index=0):
+        future, func, args = self.pending.pop(index)
+
+        try:
+            future.set_result(func(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+
+
+class TestExecutorDispatch(unittest.TestCase):
+    def setUp(self):
+        self.handled = []
+        self.executor = ManualExecutor()
+
+    def handler(self, timetag, msg):
+        self.handled.append((msg[0], msg[2][0]))
+
+    def dispatch(self, **kw):
+        return ExecutorDispatch(self.handler, self.executor, **kw)
+
+    def msg(self, address, value):
+        return (address, 'i', (value,), None)
+
+    def test_per_key_order(self):
+        dispatch = self.dispatch(max_in_flight=4)
+
+        for i in range(3):
+            dispatch(-1, self.msg('/a', i))
+            dispatch(-1, self.msg('/b', i))
+
+        # only one message per key in flight
+        self.assertEqual(len(self.executor.pending), 2)
+        self.assertEqual(dispatch.stats()['queued'], 4)
+
+        # completing /b first does not affect the order of /a
+        self.executor.run(1)
+        self.executor.run(0)
+
+        while self.executor.pending:
+            self.executor.run(len(self.executor.pending) - 1)
+
+        self.assertEqual([v for a, v in self.handled if a == '/a'], [0, 1, 2])
+        self.assertEqual([v for a, v in self.handled if a == '/b'], [0, 1, 2])
+        self.assertTrue(dispatch.join(0))
+
+    def test_max_in_flight(self):
+        dispatch = self.dispatch(max_in_flight=2)
+
+        for i in range(5):
+            dispatch(-1, self.msg('/k%i' % i, i))
+
+        self.assertEqual(len(self.executor.pending), 2)
+        stats = dispatch.stats()
+        self.assertEqual((stats['in_flight'], stats['queued'], stats['keys']), (2, 3, 5))
+
+        self.executor.run()
+        self.assertEqual(len(self.executor.pending), 2)
+        self.assertEqual(dispatch.stats()['queued'], 2)
+
+        while self.executor.pending:
+            self.executor.run()
+
+        self.assertEqual([v for a, v in self.handled], [0, 1, 2, 3, 4])
+        stats = dispatch.stats()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['max_depth']), (5, 5, 3))
+
+    def test_max_queued(self):
+        dispatch = self.dispatch(max_in_flight=1, max_queued=2)
+        results = [dispatch(-1, self.msg('/a', i)) for i in range(3)]
+        results.append(dispatch(-1, self.msg('/b', 3)))
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(dispatch.stats()['dropped'], 1)
+
+        while self.executor.pending:
+            self.executor.run()
+
+        self.assertEqual(self.handled, [('/a', 0), ('/a', 1), ('/a', 2)])
+        self.assertEqual(dispatch.stats()['keys'], 0)
+
+    def test_custom_key(self):
+        dispatch = self.dispatch(key=lambda timetag, msg: msg[2][0] % 2)
+
+        for i in range(4):
+            dispatch(-1, self.msg('/a', i))
+
+        self.assertEqual(len(self.executor.pending), 2)
+
+    def test_errors(self):
+        dispatch = ExecutorDispatch(fail, self.executor)
+        dispatch(-1, self.msg('/a', 1))
+        dispatch(-1, self.msg('/a', 2))
+
+        while self.executor.pending:
+            self.executor.run()
+
+        self.assertEqual(dispatch.stats()['errors'], 2)
+
+    def test_handle_osc(self):
+        with ThreadPoolExecutor(2) as executor:
+            dispatch = ExecutorDispatch(self.handler, executor)
+
+            for i in range(20):
+                handle_osc(create_message('/a', i), None, dispatch=dispatch, lazy=i % 2)
+
+            self.assertTrue(dispatch.join(5.0))
+
+        self.assertEqual(self.handled, [('/a', i) for i in range(20)])
+
+
+class TestProcessPool(unittest.TestCase):
+    def test_sentinels_pickle(self):
+        self.assertTrue(pickle.loads(pickle.dumps(Impulse)) is Impulse)
+        self.assertTrue(pickle.loads(pickle.dumps(TimetagNow)) is TimetagNow)
+
+    def test_process_pool(self):
+        with ExecutorDispatch(check_sentinels, max_workers=2) as dispatch:
+            for i in range(4):
+                dispatch(TimetagNow, ('/a', 'I', (Impulse,), ('127.0.0.1', 9000)))
+
+        self.assertEqual(dispatch.stats()['completed'], 4)
+        self.assertEqual(dispatch.stats()['errors'], 0)
+
+    def test_process_pool_error(self):
+        with ProcessPoolExecutor(1) as executor:
+            dispatch = ExecutorDispatch(fail, executor)
+            dispatch(-1, ('/a', '', (), None))
+            self.assertTrue(dispatch.join(10.0))
+
+        self.assertEqual(dispatch.stats()['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
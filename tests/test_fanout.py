@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.fanout module."""
+
+import errno
+import socket
+import time
+import unittest
+
+from uosc.client import create_message
+from uosc.fanout import FanoutClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFanoutClient(unittest.TestCase):
+    def setUp(self):
+        self.socks = []
+
+        for i in range(3):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(('127.0.0.1', 0))
+            sock.settimeout(1.0)
+            self.socks.append(sock)
+
+        self.dests = [('127.0.0.1', sock.getsockname()[1]) for sock in self.socks]
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        for sock in self.socks:
+            sock.close()
+
+    def closed_port(self):
+        sock = self.socks.pop()
+        sock.close()
+        return self.dests.pop()
+
+    def send_until_refused(self, client, dest, count=10):
+        # the ICMP error caused by one send is reported by the next one
+        for i in range(count):
+            client.send('/foo', i)
+
+            if client.stats()[dest]['failures']:
+                return i
+
+            time.sleep(0.01)
+
+        self.skipTest("No ICMP port unreachable errors reported.")
+
+    def test_send_to_all(self):
+        with FanoutClient(*self.dests) as client:
+            self.assertEqual(client.send('/foo', 1, 'bar'), [])
+
+        for sock in self.socks:
+            self.assertEqual(sock.recv(1024), create_message('/foo', 1, 'bar'))
+
+    def test_add_remove(self):
+        with FanoutClient(self.dests[0]) as client:
+            client.add(*self.dests[1])
+            client.add(*self.dests[1])
+            self.assertEqual(client.destinations(), self.dests[:2])
+            client.remove(*self.dests[0])
+            client.remove(*self.dests[2])
+            client.send('/foo', 1)
+
+        self.assertEqual(self.socks[1].recv(1024), create_message('/foo', 1))
+        self.socks[0].settimeout(0.05)
+        self.assertRaises(socket.timeout, self.socks[0].recv, 1024)
+
+    def test_failures_and_quarantine(self):
+        dead = self.closed_port()
+
+        with FanoutClient(dead, *self.dests, max_failures=2, quarantine=5.0,
+                          clock=self.clock) as client:
+            self.send_until_refused(client, dead)
+            self.assertEqual(client.stats()[dead]['failures'], 1)
+            time.sleep(0.01)
+            self.assertEqual(client.send('/foo', 100), [dead])
+            stats = client.stats()[dead]
+            self.assertTrue(stats['quarantined'])
+            self.assertTrue(isinstance(stats['last_error'], OSError))
+
+            # quarantined destination is skipped
+            self.assertEqual(client.send('/foo', 101), [])
+            self.assertEqual(client.stats()[dead]['errors'], 2)
+
+            # and tried again after the quarantine
+            self.clock.now = 5000
+            client.send('/foo', 102)
+            time.sleep(0.01)
+            # retried successfully after the error
+            self.assertEqual(client.send('/foo', 103), [])
+            self.assertEqual(client.stats()[dead]['failures'], 1)
+            time.sleep(0.01)
+            self.assertEqual(client.send('/foo', 104), [dead])
+            self.assertTrue(client.stats()[dead]['quarantined'])
+
+            for dest in self.dests:
+                self.assertEqual(client.stats()[dest]['errors'], 0)
+
+        for sock in self.socks:
+            received = [sock.recv(1024) for _ in range(7)]
+            self.assertEqual(received[-5:], [create_message('/foo', i) for i in range(100, 105)])
+
+    def test_recovers(self):
+        dead = self.closed_port()
+
+        with FanoutClient(dead, max_failures=5) as client:
+            self.send_until_refused(client, dead)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(dead)
+            sock.settimeout(1.0)
+            self.socks.append(sock)
+            time.sleep(0.01)
+            client.send('/foo', 'again')
+            self.assertEqual(sock.recv(1024), create_message('/foo', 'again'))
+            client.send('/foo', 'ok')
+            self.assertEqual(client.stats()[dead]['failures'], 0)
+
+    def test_buffer_full(self):
+        class FullSocket:
+            def __init__(self, exc):
+                self.exc = exc
+
+            def send(self, data):
+                raise self.exc
+
+            def close(self):
+                pass
+
+        with FanoutClient(*self.dests, max_failures=1) as client:
+            client._dests[self.dests[0]].sock = FullSocket(OSError(errno.ENOBUFS, 'No buffer'))
+            client._dests[self.dests[1]].sock = FullSocket(BlockingIOError(errno.EAGAIN, 'Full'))
+
+            for i in range(3):
+                self.assertEqual(client.send('/foo', i), self.dests[:2])
+
+            for dest in self.dests[:2]:
+                stats = client.stats()[dest]
+                self.assertEqual((stats['dropped'], stats['errors'], stats['failures']), (3, 0, 0))
+                self.assertFalse(stats['quarantined'])
+
+    def test_encoded_once(self):
+        import uosc.fanout
+        calls = []
+        encode = uosc.fanout.encode
+
+        def counting_encode(*args):
+            calls.append(args)
+            return encode(*args)
+
+        uosc.fanout.encode = counting_encode
+
+        try:
+            with FanoutClient(*self.dests) as client:
+                client.send('/foo', 1)
+        finally:
+            uosc.fanout.encode = encode
+
+        self.assertEqual(len(calls), 1)
+
+        for sock in self.socks:
+            self.assertEqual(sock.recv(1024), create_message('/foo', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.tools.prefork_server module."""
+
+import os
+import signal
+import socket
+import time
+import unittest
+
+from uosc.client import create_message
+from uosc.tools.prefork_server import PreforkServer
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(cond, timeout=5.0):
+    end = time.time() + timeout
+    while not cond() and time.time() < end:
+        time.sleep(0.01)
+    return cond()
+
+
+@unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), "SO_REUSEPORT not supported")
+class TestPreforkServer(unittest.TestCase):
+    def setUp(self):
+        self.port = free_port()
+        self.server = PreforkServer('127.0.0.1', self.port, workers=2)
+        self.server.start()
+        time.sleep(0.2)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def send(self, count):
+        msg = create_message('/test', 42)
+        for i in range(count):
+            # new socket for each message, so datagrams are spread over workers
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(msg, ('127.0.0.1', self.port))
+
+    def test_merged_stats(self):
+        self.send(20)
+        self.assertTrue(wait_for(lambda: self.server.stats()['messages'] == 20))
+        stats = self.server.stats()
+        self.assertEqual(stats['datagrams'], 20)
+        self.assertEqual(stats['bytes'], 20 * 16)
+        self.assertEqual(sum(w['messages'] for w in stats['workers']), 20)
+
+    def test_restart_worker(self):
+        proc = self.server.procs[0]
+        os.kill(proc.pid, signal.SIGKILL)
+        proc.join()
+        self.assertEqual(self.server.check(), 1)
+        self.assertTrue(self.server.procs[0].is_alive())
+        self.assertEqual(self.server.stats()['restarts'], 1)
+        time.sleep(0.2)
+        self.send(10)
+        self.assertTrue(wait_for(lambda: self.server.stats()['messages'] == 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.scheduler module."""
+
+import asyncio
+import unittest
+
+from uosc.common import TimetagNow
+from uosc.scheduler import LATE_COUNT, LATE_DISPATCH, LATE_DROP, Scheduler, ntp_time
+
+
+class Clock:
+    def __init__(self, now=3900000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.dispatched = []
+
+    def dispatch(self, timetag, msg):
+        self.dispatched.append(msg[0])
+
+    def scheduler(self, **kw):
+        return Scheduler(self.dispatch, clock=self.clock, **kw)
+
+    def test_immediate(self):
+        sched = self.scheduler()
+        sched(-1, ('/nobundle',))
+        sched(TimetagNow, ('/now',))
+        sched(2.3e-10, ('/immediate',))
+        sched(self.clock.now, ('/ontime',))
+        self.assertEqual(self.dispatched, ['/nobundle', '/now', '/immediate', '/ontime'])
+        self.assertEqual(len(sched), 0)
+        self.assertEqual(sched.stats()['immediate'], 4)
+
+    def test_scheduled_in_order(self):
+        sched = self.scheduler()
+        now = self.clock.now
+        sched(now + 0.2, ('/second',))
+        sched(now + 0.1, ('/first',))
+        sched(now + 0.2, ('/third',))
+        self.assertEqual(self.dispatched, [])
+        self.assertAlmostEqual(sched.run_pending(), 0.1, places=5)
+        self.clock.now += 0.15
+        self.assertAlmostEqual(sched.run_pending(), 0.05, places=5)
+        self.assertEqual(self.dispatched, ['/first'])
+        self.clock.now += 0.1
+        self.assertEqual(sched.run_pending(), None)
+        self.assertEqual(self.dispatched, ['/first', '/second', '/third'])
+
+    def test_scheduling_error(self):
+        sched = self.scheduler()
+        sched(self.clock.now + 0.1, ('/foo',))
+        self.clock.now += 0.1005
+        sched.run_pending()
+        error = sched.stats()['error_us']
+        self.assertEqual(error['count'], 1)
+        self.assertAlmostEqual(error['mean'], 500, delta=1)
+        self.assertEqual(error['min'], error['max'])
+
+    def test_late_dispatch(self):
+        sched = self.scheduler(late_policy=LATE_DISPATCH)
+        sched(self.clock.now - 1, ('/late',))
+        self.assertEqual(self.dispatched, ['/late'])
+        self.assertEqual((sched.late, sched.dropped), (1, 0))
+
+    def test_late_drop_and_count(self):
+        for policy in (LATE_DROP, LATE_COUNT):
+            sched = self.scheduler(late_policy=policy)
+            sched(self.clock.now - 1, ('/late',))
+            self.assertEqual(self.dispatched, [])
+            self.assertEqual((sched.late, sched.dropped), (1, 1))
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, self.scheduler, late_policy='ignore')
+
+    def test_handler_exception(self):
+        def fail(timetag, msg):
+            raise RuntimeError("handler failed")
+
+        sched = Scheduler(fail, clock=self.clock)
+        sched(self.clock.now + 0.1, ('/foo',))
+        sched(self.clock.now + 0.1, ('/foo',))
+        self.clock.now += 0.2
+        sched.run_pending()
+        self.assertEqual(len(sched), 0)
+
+    def test_asyncio_driver(self):
+        async def main():
+            sched = Scheduler(self.dispatch)
+            task = asyncio.ensure_future(sched.run())
+            await asyncio.sleep(0)
+            sched(ntp_time() + 0.05, ('/later',))
+            sched(ntp_time() + 0.02, ('/sooner',))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            return sched.stats()
+
+        stats = asyncio.run(main())
+        self.assertEqual(self.dispatched, ['/sooner', '/later'])
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['error_us']['count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,18 @@
 """Unit tests for the uosc.server module."""
 
+import socket
 import time
 import unittest
 
+from array import array
 from struct import pack
 
-from uosc.common import Impulse, ISIZE, NTP_DELTA, TimetagNow
-from uosc.server import parse_bundle, parse_message
+from uosc.common import Impulse, ISIZE, LRUCache, NTP_DELTA, TimetagNow
+from uosc.client import Bundle, create_message, pack_bundle
+from uosc.server import (MAX_CACHED_TYPETAGS, MAX_INTERNED, MAX_INTERNED_LENGTH, BufferPool,
+                         LazyMessage, decode_bundle, decode_lazy, decode_message, decoder_cache,
+                         get_decoder, handle_osc, intern_table, parse_bundle, parse_message,
+                         split_oscstr)
 
 
 typegen = type((lambda: (yield))())
@@ -107,6 +113,260 @@ class TestParseMessage(unittest.TestCase):
         self.assertMessage(('/tt', 't', (TimetagNow,)), b'/tt\0,t\0\0\0\0\0\0\0\0\x00\x01')
 
 
+class TestDecodeMessage(unittest.TestCase):
+    data = (b'/big\0\0\0\0,iisbff\0\0\0\x03\xe8\xff\xff\xff\xffhello'
+            b'\0\0\0\0\0\0\x06\0\x01\x02\x03\x04\x05\0\0'
+            b'?\x9d\xf3\xb6@\xb5\xb2-')
+
+    def test_decode_message_same_as_parse(self):
+        self.assertEqual(decode_message(self.data, copy=True), parse_message(self.data))
+        self.assertEqual(decode_message(self.data), parse_message(self.data))
+
+    def test_decode_message_blob_view(self):
+        buf = bytearray(self.data)
+        blob = decode_message(buf)[2][3]
+        self.assertTrue(isinstance(blob, memoryview))
+        self.assertEqual(bytes(blob), b'\x00\x01\x02\x03\x04\x05')
+        buf[36] = 0xFF
+        self.assertEqual(blob[0], 0xFF)
+
+    def test_decode_message_blob_copy(self):
+        blob = decode_message(memoryview(self.data), copy=True)[2][3]
+        self.assertTrue(isinstance(blob, bytes))
+
+    def test_decode_message_offset(self):
+        msg = b'/i\0\0,i\0\0\0\0\0*'
+        buf = b'\0\0\0\x0c' + msg + b'/garbage'
+        self.assertEqual(decode_message(buf, 4, 4 + len(msg)), ('/i', 'i', (42,)))
+
+    def test_decode_message_string_past_end(self):
+        # the string arguments, address and typetags of the first message are
+        # unterminated, and must not be read from the following one
+        for msg in (b'/s\0\0,s\0\0abcd', b'/s\0\0,sss', b'/sss'):
+            buf = msg + b'/s\0\0,s\0\0foo\0'
+
+            for decode in (decode_message, decode_lazy):
+                self.assertRaises(ValueError, lambda: tuple(decode(buf, 0, len(msg))))
+
+        with self.assertRaises(ValueError):
+            split_oscstr(b'abcd\0\0\0\0', 0, 4)
+
+    def check_truncated_in_bundle(self, msg, **kw):
+        # the truncated first element must not be completed from the second
+        bundle = pack_bundle(Bundle(('/i', 12)))
+        data = b''.join((bundle[:16], pack('>I', len(msg)), msg,
+                         pack('>I', 12), create_message('/i', 12)))
+
+        for lazy in (False, True):
+            with self.assertRaises(ValueError):
+                list(tuple(el) for _, el in decode_bundle(data, lazy=lazy, **kw))
+
+    def test_decode_message_int_past_end(self):
+        self.check_truncated_in_bundle(b'/a\0\0,i\0\0')
+        self.check_truncated_in_bundle(b'/a\0\0,si\0\0\0\0s\0\0\0')
+
+    def test_decode_message_blob_past_end(self):
+        self.check_truncated_in_bundle(b'/a\0\0,b\0\0\0\0\0\x08abcd')
+        self.check_truncated_in_bundle(b'/a\0\0,b\0\0')
+
+    def test_decode_message_array_past_end(self):
+        self.check_truncated_in_bundle(b'/a\0\0,[ii]\0\0\0\0\0\0\x01', arrays=True)
+
+    def test_parse_message_memoryview(self):
+        self.assertEqual(parse_message(memoryview(b'/s\0\0,s\0\0foo\0')),
+                         ('/s', 's', ('foo',)))
+
+
+class TestDecoderCache(unittest.TestCase):
+    def setUp(self):
+        decoder_cache.clear()
+
+    def test_decoder_mixed_signature(self):
+        data = (b'/mix\0\0\0\0,iTsFcmb\0\0\0\0\0\0\0*foo\0\0\0\0x'
+                b'\0\xB0 \0\0\0\0\x02\x01\x02\0\0')
+        self.assertEqual(parse_message(data), (
+            '/mix', 'iTsFcmb', (42, True, 'foo', False, 'x', (0, 0xB0, 32, 0), b'\x01\x02')))
+
+    def test_decoder_cache_hits(self):
+        msg = b'/i\0\0,i\0\0\0\0\0*'
+        hits, misses = decoder_cache.hits, decoder_cache.misses
+        parse_message(msg)
+        parse_message(msg)
+        parse_message(msg)
+        self.assertEqual(decoder_cache.misses - misses, 1)
+        self.assertEqual(decoder_cache.hits - hits, 2)
+        self.assertTrue(get_decoder('i') is get_decoder('i'))
+
+    def test_decoder_cache_bounded(self):
+        for i in range(decoder_cache.maxsize * 2):
+            get_decoder('i' * (i + 1))
+
+        self.assertEqual(len(decoder_cache), decoder_cache.maxsize)
+        self.assertFalse('i' in decoder_cache)
+
+    def test_decoder_cache_long_typetags(self):
+        get_decoder('f' * (MAX_CACHED_TYPETAGS + 1))
+        self.assertEqual(len(decoder_cache), 0)
+
+    def test_decoder_invalid_typetag(self):
+        self.assertRaises(ValueError, get_decoder, 'ix')
+        self.assertEqual(len(decoder_cache), 0)
+
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache.get('a'), 1)
+        cache['c'] = 3
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 2, 'maxsize': 2})
+
+
+class TestArrays(unittest.TestCase):
+    def test_nested_lists(self):
+        msg = b'/list\0\0\0,i[is[f]]T\0\0\0\0\0\x01\0\0\0\x02x\0\0\0@@\0\0'
+        self.assertEqual(parse_message(msg), ('/list', 'i[is[f]]T', (1, [2, 'x', [3.0]], True)))
+
+    def test_empty(self):
+        self.assertEqual(parse_message(b'/e\0\0,[]\0'), ('/e', '[]', ([],)))
+
+    def test_numeric_arrays(self):
+        msg = b''.join((b'/a\0\0,[fff][h]s\0\0', pack('>3f', 0.5, -1.0, 2.25),
+                        pack('>q', 2 ** 40), b'x\0\0\0'))
+        self.assertEqual(parse_message(msg)[2], ([0.5, -1.0, 2.25], [2 ** 40], 'x'))
+        args = parse_message(msg, arrays=True)[2]
+        self.assertEqual(args[0], array('f', [0.5, -1.0, 2.25]))
+        self.assertEqual(args[1].tolist(), [2 ** 40])
+        self.assertEqual(args[2], 'x')
+
+    def test_mixed_array_as_list(self):
+        msg = b'/a\0\0,[if]\0\0\0' + pack('>if', 1, 0.5)
+        self.assertEqual(parse_message(msg, arrays=True)[2], ([1, 0.5],))
+
+    def test_array_in_bundle(self):
+        data = b''.join((b'#bundle\0', pack('>II', 0, 1), pack('>I', 20), b'/a\0\0,[ff]\0\0\0',
+                         pack('>2f', 1.0, 2.0)))
+        args = list(parse_bundle(data, arrays=True))[0][1][2]
+        self.assertEqual(args, (array('f', [1.0, 2.0]),))
+
+    def test_truncated_array(self):
+        msg = b'/a\0\0,[ff]\0\0\0' + pack('>f', 1.0)
+        self.assertRaises(ValueError, parse_message, msg, arrays=True)
+
+    def test_unbalanced(self):
+        self.assertRaises(ValueError, parse_message, b'/a\0\0,[i\0\0\0\0\0\0')
+
+
+class TestInterning(unittest.TestCase):
+    def setUp(self):
+        intern_table.clear()
+
+    def test_same_objects(self):
+        msg = b'/foo\0\0\0\0,if\0\0\0\0*\0\0\0\0'
+        first = parse_message(msg)
+        second = decode_message(memoryview(msg))
+        self.assertEqual(first[:2], ('/foo', 'if'))
+        self.assertTrue(first[0] is second[0])
+        self.assertTrue(first[1] is second[1])
+        self.assertEqual(len(intern_table), 2)
+        # keys are copies, not slices of the message
+        self.assertTrue(all(type(key) is bytes for key in intern_table))
+
+    def test_mutable_buffer(self):
+        msg = b'/foo\0\0\0\0,if\0\0\0\0*\0\0\0\0'
+        buf = bytearray(64)
+        buf[:len(msg)] = msg
+        # like a view of a BufferPool buffer
+        first = decode_message(memoryview(buf)[:len(msg)])
+        second = decode_message(bytearray(msg))
+        self.assertEqual(first[:2], ('/foo', 'if'))
+        self.assertTrue(first[0] is second[0])
+        self.assertTrue(first[1] is second[1])
+        self.assertEqual(len(intern_table), 2)
+        self.assertTrue(all(type(key) is bytes for key in intern_table))
+
+    def test_bounded(self):
+        for i in range(MAX_INTERNED + 10):
+            parse_message(('/%i\0\0\0\0,\0\0\0' % (1000 + i)).encode())
+
+        self.assertEqual(len(intern_table), MAX_INTERNED)
+
+    def test_long_address(self):
+        addr = '/' + 'x' * MAX_INTERNED_LENGTH
+        msg = (addr + '\0' * (4 - len(addr) % 4) + ',\0\0\0').encode()
+        self.assertEqual(parse_message(msg)[0], addr)
+        self.assertEqual(len(intern_table), 1)
+
+    def test_address_not_used_as_typetags(self):
+        handle_osc(b',i\0\0', None)
+        self.assertEqual(parse_message(b'/i\0\0,i\0\0\0\0\0*'), ('/i', 'i', (42,)))
+
+
+class TestLazyMessage(unittest.TestCase):
+    args = (42, 'spam', b'\x01\x02\x03', True, 1.5, ('m', (0, 0x90, 60, 100)), ('h', 2 ** 40))
+
+    def setUp(self):
+        self.data = create_message('/foo', *self.args)
+        self.expected = parse_message(self.data)
+
+    def test_args_decoded_on_access(self):
+        msg = decode_lazy(self.data)
+        self.assertTrue(isinstance(msg, LazyMessage))
+        self.assertEqual((msg.address, msg.typetags), self.expected[:2])
+        self.assertTrue(msg._args is None)
+        self.assertEqual(msg.args, self.expected[2])
+        self.assertTrue(msg.args is msg.args)
+
+    def test_single_arg(self):
+        msg = decode_lazy(self.data)
+
+        for i, expected in enumerate(self.expected[2]):
+            self.assertEqual(msg.arg(i), expected)
+
+        self.assertEqual(msg.arg(-1), 2 ** 40)
+        self.assertTrue(msg._args is None)
+        self.assertRaises(IndexError, msg.arg, 7)
+
+    def test_single_arg_in_array(self):
+        msg = decode_lazy(create_message('/foo', [1, 2], 'x'))
+        self.assertEqual(msg.arg(1), 'x')
+        self.assertEqual(msg.arg(0), [1, 2])
+
+    def test_unpack(self):
+        addr, tags, args, src = decode_lazy(self.data, src=('127.0.0.1', 9000))
+        self.assertEqual((addr, tags, args), self.expected)
+        self.assertEqual(src, ('127.0.0.1', 9000))
+
+    def test_invalid_address(self):
+        self.assertRaises(ValueError, decode_lazy, b'foo\0,\0\0\0')
+
+    def test_handle_osc_lazy(self):
+        received = []
+
+        def dispatch(timetag, msg):
+            if msg[0] == '/foo':
+                received.append((timetag, msg.args, msg.src))
+
+        bundle = pack_bundle(Bundle(('/bar', 1), ('/foo', 2), Bundle(('/foo', 'x'))))
+        handle_osc(self.data, ('127.0.0.1', 9000), dispatch=dispatch, lazy=True)
+        handle_osc(bundle, ('127.0.0.1', 9000), dispatch=dispatch, lazy=True)
+        self.assertEqual([item[1] for item in received], [self.expected[2], (2,), ('x',)])
+        self.assertEqual(received[0][0], -1)
+        self.assertEqual(received[0][2], ('127.0.0.1', 9000))
+
+    def test_handle_osc_lazy_bad_args(self):
+        errors = []
+
+        def dispatch(timetag, msg):
+            try:
+                msg.args
+            except Exception as exc:
+                errors.append(exc)
+
+        handle_osc(b'/foo\0\0\0\0,s\0\0abcd', None, dispatch=dispatch, lazy=True)
+        self.assertEqual(len(errors), 1)
+
+
 class TestParseBundle(unittest.TestCase):
     timetag = 3657147741.6552954
     data1 = (b'#bundle\x00\xd9\xfb\xa5]\xa7\xc1p\x00\x00\x00\x00\x10'
@@ -166,6 +426,69 @@ class TestParseBundle(unittest.TestCase):
         self.assertAlmostEqual(elements[1][1][2][0], 3.141, places=3)
         self.assertEqual(elements[2][1], ('/test3', 's', ('hello',)))
 
+    def test_decode_bundle_blob_view(self):
+        data = (b'#bundle\x00\xd9\xfb\xa5]\xa7\xc1p\x00\x00\x00\x00\x10'
+                b'/b\0\0,b\0\0\0\0\0\x04\xDE\xAD\xBE\xEF')
+        elements = list(decode_bundle(data))
+        self.assertEqual(len(elements), 1)
+        blob = elements[0][1][2][0]
+        self.assertTrue(isinstance(blob, memoryview))
+        self.assertEqual(bytes(blob), b'\xDE\xAD\xBE\xEF')
+        self.assertEqual(list(parse_bundle(data))[0][1][2][0], b'\xDE\xAD\xBE\xEF')
+
+    def test_decode_bundle_nested_same_as_parse(self):
+        self.assertEqual(list(decode_bundle(self.data2, copy=True)),
+                         list(parse_bundle(self.data2)))
+
+
+class TestBufferPool(unittest.TestCase):
+    msg = b'/b\0\0,b\0\0\0\0\0\x04\xDE\xAD\xBE\xEF'
+
+    def setUp(self):
+        self.rsock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rsock.bind(('127.0.0.1', 0))
+        self.rsock.settimeout(1.0)
+        self.ssock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addr = self.rsock.getsockname()
+
+    def tearDown(self):
+        self.rsock.close()
+        self.ssock.close()
+
+    def receive(self, pool, handler):
+        self.ssock.sendto(self.msg, self.addr)
+        pool.receive(self.rsock, handler)
+
+    def test_receive_reuses_buffer(self):
+        pool = BufferPool(count=1)
+        received = []
+
+        def handler(data, src):
+            received.append((bytes(data), pool.current))
+            handle_osc(data, src, dispatch=lambda t, msg: received.append(msg[2]))
+
+        self.receive(pool, handler)
+        self.receive(pool, handler)
+        self.assertEqual(received[0][0], self.msg)
+        self.assertEqual(received[1], (b'\xDE\xAD\xBE\xEF',))
+        self.assertTrue(received[0][1] is received[2][1])
+        self.assertEqual(pool.misses, 0)
+
+    def test_detach(self):
+        pool = BufferPool(count=1)
+        kept = []
+        self.receive(pool, lambda data, src: kept.append((pool.detach(), data)))
+        self.assertEqual(pool.get(), bytearray(pool.size))
+        self.assertEqual(pool.misses, 1)
+        buf, data = kept[0]
+        self.assertEqual(bytes(data), self.msg)
+        pool.put(buf)
+        self.receive(pool, lambda data, src: kept.append(pool.current))
+        self.assertTrue(kept[1] is buf)
+
+    def test_detach_outside_handler(self):
+        self.assertRaises(RuntimeError, BufferPool().detach)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.stats module."""
+
+import socket
+import unittest
+
+from uosc.client import Bundle, create_message, pack_bundle
+from uosc.server import handle_osc, parse_bundle
+from uosc.stats import HISTOGRAM_SIZE, OTHER_ADDRESSES, STATS_ADDRESS, ServerStats, _bucket
+
+
+class TestServerStats(unittest.TestCase):
+    def setUp(self):
+        self.stats = ServerStats()
+        self.received = []
+
+    def dispatch(self, timetag, msg):
+        if msg[0] == '/fail':
+            raise RuntimeError("handler failed")
+
+        self.received.append(msg[0])
+
+    def handle(self, data):
+        handle_osc(data, ('127.0.0.1', 9999), dispatch=self.dispatch, stats=self.stats)
+
+    def test_counters(self):
+        msg = create_message('/foo', 1)
+        bundle = pack_bundle(Bundle(('/foo', 2), ('/bar', 3.0)))
+        self.handle(msg)
+        self.handle(bundle)
+        snap = self.stats.snapshot()
+        self.assertEqual(snap['datagrams'], 2)
+        self.assertEqual(snap['bytes'], len(msg) + len(bundle))
+        self.assertEqual(snap['bundles'], 1)
+        self.assertEqual(snap['messages'], 3)
+        self.assertEqual(snap['addresses'], {'/foo': 2, '/bar': 1})
+        self.assertEqual(sum(snap['latency']), 3)
+        self.assertEqual(self.received, ['/foo', '/foo', '/bar'])
+
+    def test_parse_errors(self):
+        self.handle(b'spam\0\0\0\0')
+        self.handle(b'/foo\0\0\0\0,i\0\0\0\0')
+        self.handle(b'/foo')
+        errors = self.stats.parse_errors
+        self.assertEqual(errors['unknown_packet'], 1)
+        self.assertEqual(sum(errors.values()), 3)
+        self.assertEqual(self.stats.messages, 0)
+
+    def test_handler_errors(self):
+        self.handle(pack_bundle(Bundle(('/fail', 1), ('/ok', 2))))
+        self.assertEqual(self.stats.handler_errors, 1)
+        self.assertEqual(self.received, ['/ok'])
+
+    def test_max_addresses(self):
+        stats = ServerStats(max_addresses=2)
+
+        for addr in ('/a', '/b', '/c', '/d', '/a'):
+            stats.message(addr)
+
+        self.assertEqual(stats.addresses, {'/a': 2, '/b': 1, OTHER_ADDRESSES: 2})
+
+    def test_bucket(self):
+        self.assertEqual(_bucket(0), 0)
+        self.assertEqual(_bucket(1), 1)
+        self.assertEqual(_bucket(3), 2)
+        self.assertEqual(_bucket(1000), 10)
+        self.assertEqual(_bucket(2 ** 40), HISTOGRAM_SIZE - 1)
+
+    def test_to_bundle(self):
+        self.handle(create_message('/foo', 1))
+        self.handle(b'spam\0\0\0\0')
+        messages = dict((msg[0], msg[2]) for _, msg in parse_bundle(
+            pack_bundle(self.stats.to_bundle())))
+        counters = messages['/uosc/stats/counters']
+        self.assertEqual(dict(zip(counters[::2], counters[1::2]))['datagrams'], 2)
+        self.assertEqual(messages['/uosc/stats/parse_errors'], ('unknown_packet', 1))
+        self.assertEqual(messages['/uosc/stats/addresses'], ('/foo', 1))
+        self.assertEqual(sum(messages['/uosc/stats/latency']), 1)
+
+    def test_reply_error(self):
+        class BrokenSocket:
+            def sendto(self, data, dest):
+                raise OSError("network is down")
+
+        stats = ServerStats(address=STATS_ADDRESS, sock=BrokenSocket())
+        handle_osc(create_message('/uosc/stats'), ('127.0.0.1', 9999),
+                   dispatch=self.dispatch, stats=stats)
+        self.assertEqual(stats.reply_errors, 1)
+        self.assertEqual(stats.parse_errors, {})
+        self.assertEqual(self.received, [])
+
+    def test_no_reply_by_default(self):
+        self.handle(create_message('/uosc/stats'))
+        self.assertEqual(self.received, ['/uosc/stats'])
+
+    def test_reply(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.settimeout(2)
+
+        try:
+            handle_osc(create_message('/uosc/stats'), sock.getsockname(),
+                       dispatch=self.dispatch, stats=ServerStats(address=STATS_ADDRESS))
+            data, _ = sock.recvfrom(4096)
+        finally:
+            sock.close()
+
+        self.assertEqual(self.received, [])
+        addresses = [msg[0] for _, msg in parse_bundle(data)]
+        self.assertIn('/uosc/stats/counters', addresses)
+
+
+if __name__ == '__main__':
+    unittest.main()
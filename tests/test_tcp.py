@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.tcp module."""
+
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+from struct import pack
+
+from uosc.client import create_message
+from uosc.tcp import (FRAMING_LENGTH, FRAMING_SLIP, AsyncTCPClient, StreamDecoder, TCPClient,
+                      frame, run_tcp_server, serve_tcp, slip_encode)
+
+
+PACKETS = [
+    create_message('/test1', 42),
+    create_message('/esc', b'\xc0\xdb\xdc\xdd\xc0'),
+    create_message('/test2', 'x' * 200),
+]
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestStreamDecoder(unittest.TestCase):
+    def decode(self, framing, data, chunksize, **kw):
+        decoder = StreamDecoder(framing, **kw)
+        packets = []
+
+        for ofs in range(0, len(data), chunksize):
+            chunk = data[ofs:ofs + chunksize]
+            view = decoder.buffer()
+            n = min(len(view), len(chunk))
+            view[:n] = chunk[:n]
+            decoder.commit(n)
+            decoder.feed(chunk[n:])
+            packets.extend(bytes(p) for p in decoder.packets())
+
+        return packets
+
+    def test_slip_encode(self):
+        self.assertEqual(slip_encode(b'a\xc0b\xdbc'), b'\xc0a\xdb\xdcb\xdb\xddc\xc0')
+
+    def test_frame_invalid(self):
+        self.assertRaises(ValueError, frame, b'', 'cobs')
+        self.assertRaises(ValueError, StreamDecoder, 'cobs')
+
+    def test_chunked(self):
+        for framing in (FRAMING_LENGTH, FRAMING_SLIP):
+            data = b''.join(frame(p, framing) for p in PACKETS) * 3
+
+            for chunksize in (1, 3, 7, 64, 1000):
+                self.assertEqual(self.decode(framing, data, chunksize, size=32), PACKETS * 3,
+                                 "framing=%s, chunksize=%i" % (framing, chunksize))
+
+    def test_slip_empty_frames(self):
+        data = b'\xc0\xc0' + slip_encode(PACKETS[0]) + b'\xc0'
+        self.assertEqual(self.decode(FRAMING_SLIP, data, 5), PACKETS[:1])
+
+    def test_slip_no_leading_end(self):
+        data = PACKETS[0] + b'\xc0'
+        self.assertEqual(self.decode(FRAMING_SLIP, data, 5), PACKETS[:1])
+
+    def test_reuses_buffer(self):
+        decoder = StreamDecoder(FRAMING_LENGTH, size=64)
+        buf = decoder._buf
+
+        for i in range(100):
+            decoder.feed(frame(PACKETS[0], FRAMING_LENGTH))
+            self.assertEqual([bytes(p) for p in decoder.packets()], PACKETS[:1])
+
+        self.assertTrue(decoder._buf is buf)
+
+    def test_max_size(self):
+        for framing in (FRAMING_LENGTH, FRAMING_SLIP):
+            data = frame(PACKETS[2], framing)
+            self.assertRaises(ValueError, self.decode, framing, data, 16, size=16, max_size=64)
+
+
+class TestTCPClientServer(unittest.TestCase):
+    def test_blocking(self):
+        for framing in (FRAMING_LENGTH, FRAMING_SLIP):
+            port = free_port()
+            received = []
+            thread = threading.Thread(
+                target=run_tcp_server, args=('127.0.0.1', port), daemon=True,
+                kwargs=dict(framing=framing,
+                            dispatch=lambda timetag, msg: received.append(msg[:3])))
+            thread.start()
+            time.sleep(0.1)
+
+            with TCPClient('127.0.0.1', port, framing=framing) as client:
+                client.send('/test1', 42)
+                client.send(PACKETS[1])
+                client.send('/test2', 'x' * 2000)
+
+            end = time.time() + 2
+            while len(received) < 3 and time.time() < end:
+                time.sleep(0.01)
+
+            self.assertEqual(received[0], ('/test1', 'i', (42,)))
+            self.assertEqual(received[1][2], (b'\xc0\xdb\xdc\xdd\xc0',))
+            self.assertEqual(received[2][2], ('x' * 2000,))
+
+    def test_blocking_bad_client(self):
+        port = free_port()
+        received = []
+        thread = threading.Thread(
+            target=run_tcp_server, args=('127.0.0.1', port), daemon=True,
+            kwargs=dict(framing=FRAMING_LENGTH,
+                        dispatch=lambda timetag, msg: received.append(msg[:3])))
+        thread.start()
+        time.sleep(0.1)
+
+        with TCPClient('127.0.0.1', port, framing=FRAMING_LENGTH) as good:
+            good.send('/test1', 1)
+
+            # length prefix exceeding the maximum packet size
+            with socket.create_connection(('127.0.0.1', port)) as bad:
+                bad.sendall(pack('>I', 10 ** 6))
+                bad.settimeout(2)
+                self.assertEqual(bad.recv(16), b'')
+
+            good.send('/test1', 2)
+
+            with TCPClient('127.0.0.1', port, framing=FRAMING_LENGTH) as other:
+                other.send('/test1', 3)
+
+            end = time.time() + 2
+            while len(received) < 3 and time.time() < end:
+                time.sleep(0.01)
+
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(sorted(msg[2][0] for msg in received), [1, 2, 3])
+
+    def test_blocking_handler_error(self):
+        port = free_port()
+        received = []
+
+        def handler(packet, caddr):
+            if not received:
+                received.append(None)
+                raise RuntimeError("handler failed")
+
+            received.append(bytes(packet))
+
+        thread = threading.Thread(target=run_tcp_server, args=('127.0.0.1', port, handler),
+                                  daemon=True)
+        thread.start()
+        time.sleep(0.1)
+
+        with TCPClient('127.0.0.1', port) as client:
+            client.send(PACKETS[0])
+            client.send(PACKETS[2])
+
+            end = time.time() + 2
+            while len(received) < 2 and time.time() < end:
+                time.sleep(0.01)
+
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(received, [None, PACKETS[2]])
+
+    def test_asyncio(self):
+        port = free_port()
+        received = []
+
+        async def main():
+            task = asyncio.ensure_future(serve_tcp(
+                '127.0.0.1', port, framing=FRAMING_LENGTH,
+                dispatch=lambda timetag, msg: received.append(msg[:3])))
+            await asyncio.sleep(0.05)
+
+            async with AsyncTCPClient('127.0.0.1', port, framing=FRAMING_LENGTH) as client:
+                for i in range(10):
+                    await client.send('/test', i)
+
+            for i in range(100):
+                if len(received) == 10:
+                    break
+                await asyncio.sleep(0.01)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(main())
+        self.assertEqual([msg[2][0] for msg in received], list(range(10)))
+
+    def test_asyncio_bad_client(self):
+        port = free_port()
+        received = []
+        feed = StreamDecoder.feed
+
+        async def main():
+            task = asyncio.ensure_future(serve_tcp(
+                '127.0.0.1', port, framing=FRAMING_LENGTH,
+                dispatch=lambda timetag, msg: received.append(msg[:3])))
+            await asyncio.sleep(0.05)
+
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(pack('>I', 10 ** 6))
+            self.assertEqual(await asyncio.wait_for(reader.read(16), 2), b'')
+            writer.close()
+
+            async with AsyncTCPClient('127.0.0.1', port, framing=FRAMING_LENGTH) as client:
+                await client.send('/test', 1)
+
+            for i in range(100):
+                if received:
+                    break
+                await asyncio.sleep(0.01)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        def no_feed(self, data):
+            raise AssertionError("data was copied into the decoder")
+
+        # data is received directly into the decoder's buffer
+        StreamDecoder.feed = no_feed
+
+        try:
+            asyncio.run(main())
+        finally:
+            StreamDecoder.feed = feed
+
+        self.assertEqual(received, [('/test', 'i', (1,))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the uosc.threadedclient module."""
+
+import socket
+import unittest
+
+from uosc.server import parse_bundle, parse_message
+from uosc.threadedclient import (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST,
+                                 ThreadedClient, queue)
+
+
+class TestOverflow(unittest.TestCase):
+    def queued(self, client):
+        items = []
+
+        while True:
+            try:
+                items.append(client._q.get_nowait()[1][0])
+            except queue.Empty:
+                return items
+
+    def test_block(self):
+        client = ThreadedClient(9999, maxsize=2, overflow=OVERFLOW_BLOCK)
+        client.send('/foo', 1)
+        client.send('/foo', 2)
+        self.assertRaises(queue.Full, client.send, '/foo', 3, timeout=0.01)
+        self.assertEqual(self.queued(client), [1, 2])
+
+    def test_drop_newest(self):
+        client = ThreadedClient(9999, maxsize=2, overflow=OVERFLOW_DROP_NEWEST)
+        results = [client.send('/foo', i) for i in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(self.queued(client), [0, 1])
+        self.assertEqual(client.stats()['dropped'], 2)
+
+    def test_drop_oldest(self):
+        client = ThreadedClient(9999, maxsize=2, overflow=OVERFLOW_DROP_OLDEST)
+        results = [client.send('/foo', i) for i in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(client.stats()['depth'], 2)
+        self.assertEqual(self.queued(client), [2, 3])
+        self.assertEqual(client.stats()['dropped'], 2)
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, ThreadedClient, 9999, overflow='spill')
+
+
+class TestBatching(unittest.TestCase):
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(2)
+        self.port = self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+
+    def test_drain_into_bundle(self):
+        client = ThreadedClient('127.0.0.1', self.port, bundle=True)
+
+        # queued before the thread starts, so they are sent in one batch
+        for i in range(10):
+            client.send('/fader', i, 0.5)
+
+        client.start()
+        data, _ = self.sock.recvfrom(4096)
+        self.assertEqual([msg[2][0] for _, msg in parse_bundle(data)], list(range(10)))
+        client.close()
+        stats = client.stats()
+        self.assertEqual((stats['batches'], stats['messages'], stats['max_batch']), (1, 10, 10))
+
+    def test_burst(self):
+        client = ThreadedClient('127.0.0.1', self.port)
+
+        for i in range(3):
+            client.send('/fader', i)
+
+        client.start()
+        received = [parse_message(self.sock.recvfrom(4096)[0])[2] for _ in range(3)]
+        client.close()
+        self.assertEqual(received, [(0,), (1,), (2,)])
+        self.assertEqual(client.stats()['mean_batch'], 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
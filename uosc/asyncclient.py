@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""OSC client using asyncio datagram transports (CPython only).
+
+Provides the same message encoding as the blocking client, but sends
+without blocking the event loop and without a separate thread:
+
+    from uosc.asyncclient import AsyncClient
+
+    async def main():
+        async with AsyncClient('192.168.0.42', 9001) as osc:
+            # waits while the transport's write buffer is above its high-water mark
+            await osc.send('/pi', 3.14159)
+            # raises BlockingIOError instead of waiting
+            osc.send_nowait('/e', 2.71828)
+
+"""
+
+import asyncio
+import errno
+import logging
+
+from uosc.client import encode
+
+
+log = logging.getLogger(__name__)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client, dest):
+        self.client = client
+        self.dest = dest
+        self.transport = None
+        self.errors = 0
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self.writable.set()
+        self.client._endpoint_lost(self)
+
+    def error_received(self, exc):
+        self.errors += 1
+        log.warning("Error sending to %s:%s: %s", self.dest[0], self.dest[1], exc)
+
+    def pause_writing(self):
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+
+class AsyncClient:
+    """OSC UDP client for asyncio.
+
+    Keeps one connected datagram transport per destination. ``high_water``
+    and ``low_water`` set the write-buffer limits of each transport. When the
+    buffered data exceeds ``high_water`` bytes, ``send`` waits until it has
+    drained below ``low_water`` and ``send_nowait`` raises ``BlockingIOError``.
+
+    """
+
+    def __init__(self, host, port=None, high_water=64 * 1024, low_water=None):
+        if port is None:
+            if isinstance(host, (list, tuple)):
+                host, port = host
+            else:
+                port = host
+                host = '127.0.0.1'
+
+        self.dest = (host, port)
+        self.high_water = high_water
+        self.low_water = low_water
+        self._protocols = {}
+        self._pending = {}
+
+    async def connect(self, dest=None):
+        """Create the datagram transport for dest, unless it already exists.
+
+        Uses the default destination if ``dest`` is None. Returns the protocol
+        instance of the transport.
+
+        """
+        dest = tuple(dest or self.dest)
+        proto = self._protocols.get(dest)
+
+        if proto is not None:
+            return proto
+
+        task = self._pending.get(dest)
+
+        if task is None:
+            task = self._pending[dest] = asyncio.ensure_future(self._create_endpoint(dest))
+
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._pending.pop(dest, None)
+
+    async def _create_endpoint(self, dest):
+        loop = asyncio.get_running_loop()
+        transport, proto = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self, dest), remote_addr=dest)
+        transport.set_write_buffer_limits(self.high_water, self.low_water)
+        self._protocols[dest] = proto
+        return proto
+
+    def _endpoint_lost(self, proto):
+        if self._protocols.get(proto.dest) is proto:
+            del self._protocols[proto.dest]
+
+    async def send(self, msg, *args, **kw):
+        """Send OSC message or bundle, waiting while the write buffer is full.
+
+        Accepts the same arguments as ``uosc.client.Client.send``.
+
+        """
+        dest = kw.get('dest')
+        dest = tuple(dest) if dest else self.dest
+        proto = self._protocols.get(dest) or await self.connect(dest)
+
+        if not proto.writable.is_set():
+            await proto.writable.wait()
+
+        proto.transport.sendto(encode(msg, *args))
+
+    def send_nowait(self, msg, *args, **kw):
+        """Send OSC message or bundle without waiting.
+
+        The transport for the destination must have been created already by
+        ``connect`` or a previous call to ``send``. Raises ``BlockingIOError``
+        if the write buffer of the transport is full.
+
+        """
+        dest = kw.get('dest')
+        dest = tuple(dest) if dest else self.dest
+        proto = self._protocols.get(dest)
+
+        if proto is None:
+            raise RuntimeError("No transport for %s:%s, call connect() first." % dest)
+
+        if not proto.writable.is_set():
+            raise BlockingIOError(errno.EAGAIN, "Write buffer for %s:%s is full." % dest)
+
+        proto.transport.sendto(encode(msg, *args))
+
+    def close(self):
+        for proto in list(self._protocols.values()):
+            if proto.transport is not None:
+                proto.transport.close()
+
+        self._protocols.clear()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/batch.py
+#
+"""Columnar decoding of many OSC messages at once (CPython).
+
+Messages are grouped by address and typetags and the arguments of each group
+are decoded column by column:
+
+    from uosc.batch import decode_batch
+
+    for group in decode_batch(datagrams):
+        print(group.address, group.typetags, len(group))
+        faders = group.columns[1]
+
+For signatures with only fixed-size arguments, all messages of a group are
+decoded in one pass, into a NumPy structured array if NumPy is installed,
+or else with ``struct`` into ``array.array`` columns for numeric typetags.
+Other signatures are decoded message by message. Argument values are
+decoded with the same typetag semantics as ``uosc.server.parse_message``, and
+``MessageGroup.rows`` returns exactly the argument tuples it would.
+
+"""
+
+import sys
+
+from array import array
+from struct import Struct, unpack_from
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from uosc.common import ARRAY_TYPECODES, to_time
+from uosc.server import CONST_TAGS, FIXED_TAGS, get_decoder, intern_oscstr
+
+
+# NumPy dtypes for the struct format codes in uosc.server.FIXED_TAGS
+NUMPY_CODES = {'d': ('>f8',), 'f': ('>f4',), 'i': ('>i4',), 'q': ('>i8',), 'I': ('>u4',),
+               'Q': ('>u8',), '4s': ('u1', (4,))}
+
+
+def iter_messages(data, offsets=None):
+    """Yield ``(buffer, offset, end, timetag)`` for each message in data.
+
+    ``data`` is either a sequence of datagrams or, if ``offsets`` is given, a
+    single buffer containing concatenated datagrams starting at the given
+    offsets, each extending to the start of the next one. Bundles are
+    unpacked recursively. ``timetag`` is -1 for messages not in a bundle.
+
+    """
+    if offsets is None:
+        packets = ((dgram, 0, len(dgram)) for dgram in data)
+    else:
+        ends = list(offsets[1:]) + [len(data)]
+        packets = ((data, start, end) for start, end in zip(offsets, ends))
+
+    for buf, start, end in packets:
+        if buf[start] == 35:  # '#'
+            for item in _iter_bundle(buf, start, end):
+                yield item
+        else:
+            yield buf, start, end, -1
+
+
+def _iter_bundle(buf, offset, end):
+    if bytes(buf[offset:offset + 8]) != b'#bundle\0':
+        raise TypeError("Bundle must start with b'#bundle\\0'.")
+
+    timetag = to_time(*unpack_from('>II', buf, offset + 8))
+    ofs = offset + 16
+
+    while ofs < end:
+        size = unpack_from('>I', buf, ofs)[0]
+        ofs += 4
+
+        if buf[ofs] == 35:
+            for item in _iter_bundle(buf, ofs, ofs + size):
+                yield item
+        else:
+            yield buf, ofs, ofs + size, timetag
+
+        ofs += size
+
+
+class MessageGroup:
+    """Messages with the same address and typetags, decoded into columns.
+
+    ``index`` holds the position of each message in the decoded input,
+    counting messages in bundles individually, and ``timetags`` the timetag of
+    the bundle containing it or -1. ``columns`` has one column per typetag:
+    an ``array.array`` or a NumPy array for numeric typetags ('i', 'f', 'd',
+    'h'), if all arguments have a fixed size, a list otherwise. If NumPy is
+    used, ``data`` is the structured array of all fixed-size arguments, with
+    fields named ``a0``, ``a1``, etc. after the argument position.
+
+    """
+
+    def __init__(self, address, typetags):
+        self.address = address
+        self.typetags = typetags
+        self.index = []
+        self.timetags = []
+        self.columns = None
+        self.data = None
+        # (buffer, offset of first argument, end of message) for each message
+        self._args = []
+
+    def __len__(self):
+        return len(self.index)
+
+    def rows(self):
+        """Return a list of argument tuples, one per message."""
+        columns = [col.tolist() if hasattr(col, 'tolist') else col for col in self.columns]
+        return list(zip(*columns)) if columns else [()] * len(self)
+
+    def _decode(self, use_numpy):
+        tags = self.typetags
+
+        if all(tag in FIXED_TAGS or tag in CONST_TAGS for tag in tags):
+            self._decode_fixed(use_numpy)
+        else:
+            decoder = get_decoder(tags)
+            rows = [decoder.decode(memoryview(buf)[:end], ofs, True)[0]
+                    for buf, ofs, end in self._args]
+            self.columns = [list(col) for col in zip(*rows)] if rows else [[] for _ in tags]
+
+        self._args = None
+
+    def _decode_fixed(self, use_numpy):
+        tags = self.typetags
+        fixed = [tag for tag in tags if tag in FIXED_TAGS]
+        codes = [FIXED_TAGS[tag][0] for tag in fixed]
+        st = Struct('>' + ''.join(codes))
+        size = st.size
+        count = len(self._args)
+
+        for buf, ofs, end in self._args:
+            if ofs + size > end:
+                raise ValueError("Arguments of message to %s exceed message size." %
+                                 self.address)
+
+        raw = b''.join([buf[ofs:ofs + size] for buf, ofs, _ in self._args])
+
+        if use_numpy and fixed:
+            dtype = numpy.dtype([('a%i' % i,) + NUMPY_CODES[code]
+                                 for i, code in enumerate(codes)])
+            self.data = numpy.frombuffer(raw, dtype=dtype, count=count)
+            values = [self.data['a%i' % i] for i in range(len(fixed))]
+        elif len(fixed) == 1 and fixed[0] in ARRAY_TYPECODES:
+            # single numeric column: convert whole buffer at once
+            col = array(ARRAY_TYPECODES[fixed[0]])
+            col.frombytes(raw)
+
+            if sys.byteorder == 'little':
+                col.byteswap()
+
+            values = [col]
+        else:
+            rows = list(st.iter_unpack(raw)) if size else []
+            values = [list(col) for col in zip(*rows)] or [[] for _ in fixed]
+
+            for i, tag in enumerate(fixed):
+                if tag in ARRAY_TYPECODES:
+                    values[i] = array(ARRAY_TYPECODES[tag], values[i])
+
+        columns = []
+        i = 0
+
+        for tag in tags:
+            if tag in CONST_TAGS:
+                columns.append([CONST_TAGS[tag]] * count)
+                continue
+
+            col = values[i]
+            conv = FIXED_TAGS[tag][1]
+
+            if conv is not None:
+                col = [conv(val) for val in (col.tolist() if hasattr(col, 'tolist') else col)]
+
+            columns.append(col)
+            i += 1
+
+        self.columns = columns
+
+
+def decode_batch(data, offsets=None, use_numpy=None):
+    """Decode many OSC messages, grouped by address and typetags.
+
+    ``data`` and ``offsets`` are interpreted like in ``iter_messages``. NumPy
+    is used if it is installed, unless ``use_numpy`` is False.
+
+    Returns a list of ``MessageGroup`` instances in the order in which the
+    first message of each group appears in the input.
+
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError("NumPy is not installed.")
+
+    if offsets is not None and not hasattr(data, 'find'):
+        data = bytes(data)
+
+    groups = {}
+    # raw address and typetags -> group
+    headers = {}
+    i = 0
+
+    for buf, start, end, timetag in iter_messages(data, offsets):
+        if not hasattr(buf, 'find'):
+            buf = bytes(buf)
+
+        # find end of address and typetag strings without decoding them
+        pos = buf.find(b'\0', start, end)
+
+        if pos < 0:
+            raise ValueError("Unterminated OSC address in message %i." % i)
+
+        ofs = start + ((pos - start + 4) & ~0x03)
+
+        # type tag string must start with comma (ASCII 44)
+        if ofs < end and buf[ofs] == 44:
+            pos = buf.find(b'\0', ofs, end)
+
+            if pos < 0:
+                raise ValueError("Unterminated OSC type tag string in message %i." % i)
+
+            argofs = ofs + ((pos - ofs + 4) & ~0x03)
+        else:
+            argofs = ofs
+
+        header = buf[start:argofs]
+        group = headers.get(header)
+
+        if group is None:
+            addr = intern_oscstr(buf, start, end)[0]
+
+            if not addr.startswith('/'):
+                raise ValueError("OSC address pattern must start with a slash.")
+
+            tags = intern_oscstr(buf, ofs, end, 1)[0] if argofs > ofs else ''
+            group = groups.get((addr, tags))
+
+            if group is None:
+                group = groups[(addr, tags)] = MessageGroup(addr, tags)
+
+            headers[header] = group
+
+        group.index.append(i)
+        group.timetags.append(timetag)
+        group._args.append((buf, argofs, end))
+        i += 1
+
+    result = sorted(groups.values(), key=lambda group: group.index[0])
+
+    for group in result:
+        group._decode(use_numpy)
+
+    return result
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/capture.py
+#
+"""Capture file format for recorded OSC datagrams (CPython only).
+
+A capture consists of two append-only files:
+
+* the data file, which starts with the 8-byte magic ``b'UOSCCAP1'`` and
+  contains one record per datagram: a 32-byte record header (receive time as
+  a float64 UNIX timestamp, datagram size, source IP address as 16 bytes,
+  IPv4 addresses mapped to IPv6, source port, address family 4 or 6 and one
+  padding byte), followed by the datagram data;
+* the index file (the data file name plus ``.idx``), which contains one
+  16-byte entry per record (offset of the record in the data file and receive
+  timestamp), so record *n* can be found by seeking to ``16 * n``.
+
+All numbers are big-endian. If the index file is missing or shorter than the
+data file, the missing entries are rebuilt from the data file, in memory by
+the reader and in the index file by the writer before it appends.
+
+    from uosc.capture import CaptureReader, CaptureWriter
+
+    with CaptureWriter('traffic.cap') as writer:
+        run_server('0.0.0.0', 9001, handler=writer.wrap(handle_osc))
+
+    with CaptureReader('traffic.cap') as reader:
+        for timestamp, src, data in reader:
+            ...
+
+"""
+
+import mmap
+import os
+import socket
+import struct
+import time
+
+from bisect import bisect_left
+
+
+MAGIC = b'UOSCCAP1'
+INDEX_SUFFIX = '.idx'
+# receive time, size, source address, port, address family, padding
+RECORD = struct.Struct('>dI16sHBx')
+# record offset, receive time
+INDEX_ENTRY = struct.Struct('>Qd')
+_V4_PREFIX = b'\0' * 10 + b'\xff\xff'
+
+
+def pack_source(addr):
+    """Return 16-byte address, port and family (4 or 6) for a socket address."""
+    if addr is None:
+        return b'\0' * 16, 0, 4
+
+    host, port = addr[0], addr[1]
+
+    try:
+        return _V4_PREFIX + socket.inet_pton(socket.AF_INET, host), port, 4
+    except OSError:
+        return socket.inet_pton(socket.AF_INET6, host), port, 6
+
+
+def unpack_source(raw, port, family):
+    """Return ``(host, port)`` tuple for address data from a record header."""
+    if family == 4:
+        return socket.inet_ntop(socket.AF_INET, raw[12:]), port
+
+    return socket.inet_ntop(socket.AF_INET6, raw), port
+
+
+def _scan(data, offset, end):
+    # yield (offset, timestamp) of each complete record from offset to end
+    while offset + RECORD.size <= end:
+        timestamp, size = RECORD.unpack_from(data, offset)[:2]
+
+        if offset + RECORD.size + size > end:
+            break
+
+        yield offset, timestamp
+        offset += RECORD.size + size
+
+
+class CaptureWriter:
+    """Append datagrams to a capture file and its index."""
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.count = 0
+        self._data = open(path, 'ab')
+
+        if self._data.tell() == 0:
+            self._data.write(MAGIC)
+            self._data.flush()
+            index = open(path + INDEX_SUFFIX, 'wb')
+        else:
+            with open(path, 'rb') as fp:
+                if fp.read(len(MAGIC)) != MAGIC:
+                    self._data.close()
+                    raise ValueError("Not a uosc capture file: %s" % path)
+
+            # make sure the index covers all existing records before appending
+            # and discard an incomplete last record
+            reader = CaptureReader(path)
+            end = reader.end
+            indexed = reader._indexed
+            missing = [INDEX_ENTRY.pack(offset, timestamp) for offset, timestamp in
+                       zip(reader._offsets[indexed:], reader._timestamps[indexed:])]
+            reader.close()
+
+            if end < self._data.tell():
+                self._data.truncate(end)
+                # the position is not moved by truncate, but used as offset of the next record
+                self._data.seek(end)
+
+            index = open(path + INDEX_SUFFIX, 'ab')
+            # rebuild missing or invalid index entries
+            index.truncate(indexed * INDEX_ENTRY.size)
+            index.write(b''.join(missing))
+
+        self._index = index
+        self.count = self._index.tell() // INDEX_ENTRY.size
+
+    def write(self, data, src=None, timestamp=None):
+        """Append datagram received from src at timestamp (default: now)."""
+        if timestamp is None:
+            timestamp = self.clock()
+
+        addr, port, family = pack_source(src)
+        offset = self._data.tell()
+        self._data.write(RECORD.pack(timestamp, len(data), addr, port, family))
+        self._data.write(data)
+        self._index.write(INDEX_ENTRY.pack(offset, timestamp))
+        self.count += 1
+
+    def wrap(self, handler):
+        """Return handler for ``run_server``, which records each datagram first."""
+        def capture(data, caddr, **params):
+            self.write(data, caddr)
+            return handler(data, caddr, **params)
+
+        return capture
+
+    def flush(self):
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CaptureReader:
+    """Memory-mapped, random access reader for capture files.
+
+    Items are ``(timestamp, (host, port), data)`` tuples, where ``data`` is a
+    ``memoryview`` of the mapped file, which is only valid until ``close``
+    is called. The reader never writes to the capture or index file.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+
+        if size < len(MAGIC) or self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError("Not a uosc capture file: %s" % path)
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._offsets = []
+        self._timestamps = []
+        self._load_index(size)
+
+    def _load_index(self, size):
+        ipath = self.path + INDEX_SUFFIX
+        # offset after the last complete record
+        self.end = len(MAGIC)
+        entries = b''
+
+        if os.path.exists(ipath):
+            with open(ipath, 'rb') as fp:
+                entries = fp.read()
+
+        nentries = len(entries) // INDEX_ENTRY.size
+
+        for offset, timestamp in INDEX_ENTRY.iter_unpack(entries[:nentries * INDEX_ENTRY.size]):
+            if offset != self.end or offset + RECORD.size > size:
+                break
+
+            end = offset + RECORD.size + RECORD.unpack_from(self._map, offset)[1]
+
+            if end > size:
+                break
+
+            self._offsets.append(offset)
+            self._timestamps.append(timestamp)
+            self.end = end
+
+        # number of valid entries in the index file
+        self._indexed = len(self._offsets)
+
+        for offset, timestamp in _scan(self._map, self.end, size):
+            self._offsets.append(offset)
+            self._timestamps.append(timestamp)
+            self.end = offset + RECORD.size + RECORD.unpack_from(self._map, offset)[1]
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        offset = self._offsets[index]
+        timestamp, size, addr, port, family = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        return timestamp, unpack_source(addr, port, family), self._view[start:start + size]
+
+    def __iter__(self):
+        for index in range(len(self._offsets)):
+            yield self[index]
+
+    def data(self, index):
+        """Return datagram data of record at index as a ``memoryview``."""
+        offset = self._offsets[index]
+        start = offset + RECORD.size
+        return self._view[start:start + RECORD.unpack_from(self._map, offset)[1]]
+
+    def timestamp(self, index):
+        return self._timestamps[index]
+
+    def find_time(self, timestamp):
+        """Return index of the first record received at or after timestamp."""
+        return bisect_left(self._timestamps, timestamp)
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._view.release()
+                self._map.close()
+            except BufferError:
+                # memoryviews of records are still in use, the mapping is
+                # closed when they are garbage collected
+                pass
+
+            self._file.close()
+            self._map = self._view = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -11,7 +11,13 @@ try:
 except ImportError:
     from struct import pack
 
-from uosc.common import Bundle, Impulse, TimetagNow, to_frac
+try:
+    from struct import Struct
+except ImportError:
+    from uosc.compat.structutil import Struct
+
+from uosc.common import (MAX_DGRAM_SIZE, NUMERIC_TAGS, Bundle, Impulse, LRUCache, TimetagNow,
+                         array, pack_array, ticks_add, ticks_diff, ticks_ms, to_frac)
 
 
 if isinstance('', bytes):
@@ -40,15 +46,83 @@ def pack_addr(addr):
     if isinstance(addr, (bytes, bytearray)):
         return addr
 
-    if len(addr) != 2:
+    return resolve(addr)[1]
+
+
+# Seconds for which successful resp. failed address lookups are cached
+RESOLVE_TTL = 60.0
+NEGATIVE_TTL = 5.0
+# Maps (host, port) to (expiry time, address family, socket address, error)
+resolve_cache = LRUCache(256)
+
+
+def resolve(addr):
+    """Return address family and socket address for a (host, port) tuple.
+
+    Results of ``socket.getaddrinfo`` are cached for ``RESOLVE_TTL`` seconds.
+    Failed lookups are cached for ``NEGATIVE_TTL`` seconds, during which the
+    same error is raised again without another lookup.
+
+    ``addr`` may also be an IPv6 ``(host, port, flowinfo, scope_id)`` tuple,
+    whose flow info and scope id are kept in the returned address.
+
+    """
+    if isinstance(addr, (bytes, bytearray)):
+        return socket.AF_INET, addr
+
+    if len(addr) not in (2, 4):
         raise NotImplementedError("Only IPv4/v6 supported")
 
-    addrinfo = socket.getaddrinfo(addr[0], addr[1])
-    return addrinfo[0][4]
+    key = tuple(addr)
+    now = ticks_ms()
+    entry = resolve_cache.get(key)
+
+    if entry is None or ticks_diff(entry[0], now) <= 0:
+        try:
+            ai = socket.getaddrinfo(addr[0], addr[1])[0]
+        except OSError as exc:
+            entry = (ticks_add(now, int(NEGATIVE_TTL * 1000)), None, None, exc)
+        else:
+            sockaddr = ai[4]
+
+            if len(addr) == 4 and len(sockaddr) == 4:
+                sockaddr = sockaddr[:2] + key[2:]
+
+            entry = (ticks_add(now, int(RESOLVE_TTL * 1000)), ai[0], sockaddr, None)
+
+        resolve_cache[key] = entry
+
+    if entry[3] is not None:
+        raise entry[3].__class__(*entry[3].args)
+
+    return entry[1], entry[2]
+
+
+# Shared UDP sockets for sending, by address family
+socket_pool = {}
+
+
+def get_socket(family=socket.AF_INET):
+    """Return the shared UDP socket for the address family from the socket pool."""
+    sock = socket_pool.get(family)
+
+    if sock is None:
+        sock = socket_pool[family] = socket.socket(family, socket.SOCK_DGRAM)
+
+    return sock
+
+
+def close_sockets():
+    """Close all sockets in the socket pool."""
+    while socket_pool:
+        socket_pool.popitem()[1].close()
 
 
 def pack_timetag(t):
     """Pack an OSC timetag into 64-bit binary blob."""
+    if t is TimetagNow:
+        return pack('>II', 0, 1)
+
     return pack('>II', *to_frac(t))
 
 
@@ -77,16 +151,7 @@ def pack_blob(b, encoding='utf-8'):
 
 def pack_bundle(bundle):
     """Return bundle data packed into a binary string."""
-    data = []
-    for msg in bundle:
-        if isinstance(msg, Bundle):
-            msg = pack_bundle(msg)
-        elif isinstance(msg, tuple):
-            msg = create_message(*msg)
-
-        data.append(pack('>I', len(msg)) + msg)
-
-    return b'#bundle\0' + pack_timetag(bundle.timetag) + b''.join(data)
+    return BundleWriter(bundle).pack()
 
 
 def pack_midi(val):
@@ -99,6 +164,133 @@ def pack_midi(val):
     return pack('BBBB', *tuple(val))
 
 
+def pack_numeric_array(arr):
+    """Return OSC typetags and packed data of a homogeneous numeric array.
+
+    ``arr`` may be an ``array.array``, a NumPy array or a ``memoryview`` with
+    a numeric item format. Float arrays are mapped to typetag 'f' resp. 'd'
+    for double precision, integer arrays to 'i' or to 'h', if their values
+    may not fit into 32 bits. NumPy arrays are flattened.
+
+    """
+    dtype = getattr(arr, 'dtype', None)
+
+    if dtype is not None:
+        arr = arr.ravel()
+        kind = dtype.kind
+        size = dtype.itemsize
+
+        if kind == 'b':
+            return ''.join('T' if val else 'F' for val in arr), b''
+        elif kind == 'f':
+            typetag = 'd' if size == 8 else 'f'
+        elif kind in 'iu':
+            typetag = 'i' if size < 4 or (size == 4 and kind == 'i') else 'h'
+        else:
+            raise TypeError("NumPy arrays of dtype '%s' not supported." % dtype)
+    else:
+        if isinstance(arr, memoryview):
+            arr = array(arr.format, arr)
+
+        typecode = getattr(arr, 'typecode', None)
+
+        if typecode is None:
+            # MicroPython arrays have no typecode attribute
+            typetag = 'f' if len(arr) and isinstance(arr[0], float) else 'i'
+        elif typecode in 'fd':
+            typetag = typecode
+        elif typecode in 'bBhHiIlLqQ':
+            size = arr.itemsize
+            typetag = 'i' if size < 4 or (size == 4 and typecode.islower()) else 'h'
+        else:
+            raise TypeError("Arrays with typecode '%s' not supported." % typecode)
+
+    return typetag * len(arr), pack_array(typetag, arr)
+
+
+def _numpy_scalar(arg):
+    # NumPy scalars and 0-d arrays have a dtype, but are packed as single values
+    dtype = arg.dtype
+    kind = dtype.kind
+    size = dtype.itemsize
+    arg = arg.item()
+
+    if kind == 'b':
+        return 'T' if arg else 'F', arg
+    elif kind == 'f':
+        return 'd' if size == 8 else 'f', arg
+    elif kind in 'iu':
+        return 'i' if size < 4 or (size == 4 and kind == 'i') else 'h', arg
+
+    raise TypeError("NumPy scalars of dtype '%s' not supported." % dtype)
+
+
+def _is_numeric_array(arg):
+    if isinstance(arg, array):
+        return True
+    elif isinstance(arg, memoryview):
+        return arg.format not in 'Bbc'
+
+    # NumPy arrays, but not NumPy scalars or 0-d arrays
+    return hasattr(arg, 'dtype') and arg.ndim > 0
+
+
+def _pack_untagged(arg, types, data):
+    # Pack a list or numeric array argument as an OSC array and return None,
+    # or return typetag and value of an argument of a type not in TYPE_MAP.
+    if type(arg) is list:
+        types.append('[')
+        _pack_args(arg, types, data)
+        types.append(']')
+    elif _is_numeric_array(arg):
+        tags, values = pack_numeric_array(arg)
+        types.append('[' + tags + ']')
+        data.append(values)
+    elif isinstance(arg, memoryview):
+        return 'b', arg
+    elif hasattr(arg, 'dtype'):
+        return _numpy_scalar(arg)
+    else:
+        return TYPE_MAP.get(arg), arg
+
+
+def _pack_args(args, types, data):
+    for arg in args:
+        type_ = type(arg)
+
+        if isinstance(arg, tuple):
+            typetag, arg = arg
+        else:
+            typetag = TYPE_MAP.get(type_)
+
+            if typetag is None:
+                tagged = _pack_untagged(arg, types, data)
+
+                if tagged is None:
+                    continue
+
+                typetag, arg = tagged
+
+        if typetag in 'ifd':
+            data.append(pack('>' + typetag, arg))
+        elif typetag in 'sS':
+            data.append(pack_string(arg))
+        elif typetag == 'b':
+            data.append(pack_blob(arg))
+        elif typetag in 'rm':
+            data.append(pack_midi(arg))
+        elif typetag == 'c':
+            data.append(pack('>I', ord(arg)))
+        elif typetag == 'h':
+            data.append(pack('>q', arg))
+        elif typetag == 't':
+            data.append(pack_timetag(arg))
+        elif typetag not in 'IFNT':
+            raise TypeError("Argument of type '%s' not supported." % type_)
+
+        types.append(typetag)
+
+
 def create_message(address, *args):
     """Create an OSC message with given address pattern and arguments.
 
@@ -116,6 +308,9 @@ def create_message(address, *args):
     * ``False``: F
     * ``uosc.common.Impulse``: I
     * ``uosc.common.TimetagNow``: t
+    * ``list``: OSC array, i.e. its items enclosed by '[' and ']'
+    * ``array.array``, NumPy array, numeric ``memoryview``: OSC array of 'f',
+        'd', 'i' or 'h', packed as a whole (see ``pack_numeric_array``)
 
     If you want to encode a Python object to another OSC type, you have to pass
     a ``(typetag, data)`` tuple, where ``data`` must be of the appropriate type
@@ -136,42 +331,376 @@ def create_message(address, *args):
 
     data = []
     types = [',']
+    _pack_args(args, types, data)
+    return pack_string(address) + pack_string(''.join(types)) + b''.join(data)
 
-    for arg in args:
-        type_ = type(arg)
 
-        if isinstance(arg, tuple):
-            typetag, arg = arg
+def _timetag_int(t):
+    if t is TimetagNow:
+        return 1
+
+    sec, frac = to_frac(t)
+    return (sec << 32) | frac
+
+
+# Struct format code and argument conversion function for fixed-size typetags
+FIXED_TAGS = {
+    'c': ('I', ord),
+    'd': ('d', None),
+    'f': ('f', None),
+    'h': ('q', None),
+    'i': ('i', None),
+    'm': ('4s', pack_midi),
+    'r': ('4s', pack_midi),
+    't': ('Q', _timetag_int),
+}
+
+
+class MessageTemplate:
+    """Precompiled OSC message with a fixed address pattern and typetags.
+
+    The address and typetag string are packed and checked only once, when the
+    template is created. If all typetags have a fixed size, the whole message
+    is packed by a single ``struct.Struct`` call. Strings and blobs are packed
+    separately in between runs of fixed-size arguments.
+
+    Pass one argument per typetag to ``pack`` / ``pack_into``, except for the
+    typetags ``T``, ``F``, ``N`` and ``I``, which carry no data and take no
+    argument. Argument values must be of the types listed for the explicit
+    ``(typetag, data)`` tuples in the ``create_message`` docstring.
+
+    Arrays must contain a fixed number of values of a single numeric type,
+    e.g. ``'[ffff]'``, and take one sequence, ``array.array`` or NumPy array
+    argument, which is packed as a whole.
+
+    """
+
+    def __init__(self, address, typetags=''):
+        assert address.startswith('/'), "Address pattern must start with a slash."
+
+        if typetags.startswith(','):
+            typetags = typetags[1:]
+
+        self.address = address
+        self.typetags = typetags
+        self.header = pack_string(address) + pack_string(',' + typetags)
+        self.nargs = 0
+        self._segments = segments = []
+        fmt = '>'
+        convs = []
+
+        i = 0
+        while i < len(typetags):
+            typetag = typetags[i]
+            i += 1
+
+            if typetag in FIXED_TAGS:
+                code, conv = FIXED_TAGS[typetag]
+                fmt += code
+                convs.append(conv)
+            elif typetag in 'sSb[':
+                if convs:
+                    segments.append(self._compile_run(fmt, convs))
+                    fmt = '>'
+                    convs = []
+
+                if typetag == '[':
+                    end = typetags.find(']', i)
+                    items = typetags[i:end] if end > 0 else ''
+
+                    if not items or items[0] not in NUMERIC_TAGS or items.strip(items[0]):
+                        raise TypeError("Arrays in templates must contain a fixed number "
+                                        "of values of a single numeric type.")
+
+                    segments.append((None, 1, self._array_packer(items[0], len(items))))
+                    i = end + 1
+                else:
+                    segments.append((None, 1, pack_blob if typetag == 'b' else pack_string))
+            elif typetag not in 'IFNT':
+                raise TypeError("Typetag '%s' not supported." % typetag)
+
+        if segments:
+            if convs:
+                segments.append(self._compile_run(fmt, convs))
+
+            self._struct = None
+            self._convs = None
+            self.size = None
+            self.nargs = sum(seg[1] for seg in segments)
         else:
-            typetag = TYPE_MAP.get(type_) or TYPE_MAP.get(arg)
+            self._struct, _, self._convs = self._compile_run(
+                '>%is' % len(self.header) + fmt[1:], convs)
+            self.size = self._struct.size
+            self.nargs = len(convs)
 
-        if typetag in 'ifd':
-            data.append(pack('>' + typetag, arg))
-        elif typetag in 'sS':
-            data.append(pack_string(arg))
-        elif typetag == 'b':
-            data.append(pack_blob(arg))
-        elif typetag in 'rm':
-            data.append(pack_midi(arg))
-        elif typetag == 'c':
-            data.append(pack('>I', ord(arg)))
-        elif typetag == 'h':
-            data.append(pack('>q', arg))
-        elif typetag == 't':
-            if arg is TimetagNow:
-                data.append(pack('>Q', 1))
+    @staticmethod
+    def _array_packer(typetag, count):
+        def pack_values(values):
+            if len(values) != count:
+                raise ValueError("Expected array of %i values, got %i." % (count, len(values)))
+
+            return pack_array(typetag, values)
+
+        return pack_values
+
+    @staticmethod
+    def _compile_run(fmt, convs):
+        return (Struct(fmt), len(convs),
+                tuple(convs) if any(c is not None for c in convs) else None)
+
+    @staticmethod
+    def _convert(convs, args):
+        if len(args) != len(convs):
+            raise TypeError("Expected %i arguments, got %i." % (len(convs), len(args)))
+
+        return [arg if conv is None else conv(arg) for conv, arg in zip(convs, args)]
+
+    def pack(self, *args):
+        """Return OSC message with given arguments as binary data."""
+        if self._struct is not None:
+            if self._convs:
+                args = self._convert(self._convs, args)
+
+            return self._struct.pack(self.header, *args)
+
+        if len(args) != self.nargs:
+            raise TypeError("Expected %i arguments, got %i." % (self.nargs, len(args)))
+
+        data = [self.header]
+        i = 0
+        for st, n, conv in self._segments:
+            if st is None:
+                data.append(conv(args[i]))
             else:
-                data.append(pack_timetag(arg))
-        elif typetag not in 'IFNT':
-            raise TypeError("Argument of type '%s' not supported." % type_)
+                vals = args[i:i + n]
+                data.append(st.pack(*(self._convert(conv, vals) if conv else vals)))
 
-        types.append(typetag)
+            i += n
 
-    return pack_string(address) + pack_string(''.join(types)) + b''.join(data)
+        return b''.join(data)
+
+    def pack_into(self, buf, offset, *args):
+        """Pack OSC message into writable buffer ``buf`` at ``offset``.
+
+        Returns the offset of the first byte after the packed message.
+
+        """
+        if self._struct is not None:
+            if self._convs:
+                args = self._convert(self._convs, args)
+
+            self._struct.pack_into(buf, offset, self.header, *args)
+            return offset + self.size
+
+        data = self.pack(*args)
+        end = offset + len(data)
+        buf[offset:end] = data
+        return end
+
+
+def encode(msg, *args):
+    """Return binary OSC data for a message or bundle.
+
+    ``msg`` may be a ``Bundle``, a ``MessageTemplate`` followed by its
+    arguments, an OSC address pattern followed by the message arguments or
+    already encoded binary data, which is returned unchanged.
+
+    """
+    if isinstance(msg, Bundle):
+        return pack_bundle(msg)
+    elif isinstance(msg, MessageTemplate):
+        return msg.pack(*args)
+    elif args or isinstance(msg, unicodetype):
+        return create_message(msg, *args)
+
+    return msg
+
+
+class BundleWriter:
+    """Serializes a bundle and its nested bundles in one pass.
+
+    When created, all ``(address, *args)`` tuples in the bundle tree are
+    encoded once, the size prefixes and headers of all elements are computed
+    and the total size is available as ``size``. ``pack`` and ``pack_into``
+    then copy each message only once, instead of once per nesting level.
+    Tuples may also start with a ``MessageTemplate`` followed by its
+    arguments.
+
+    """
+
+    def __init__(self, bundle):
+        # bundle headers, size prefixes and message data in serialization order
+        self._chunks = []
+        self.size = self._layout(bundle, False)
+
+    def _layout(self, bundle, nested):
+        chunks = self._chunks
+        index = len(chunks)
+        chunks.append(None)
+        size = 16
+
+        for msg in bundle:
+            if isinstance(msg, Bundle):
+                size += self._layout(msg, True)
+                continue
+            elif isinstance(msg, tuple):
+                msg = encode(*msg)
+
+            chunks.append(pack('>I', len(msg)))
+            chunks.append(msg)
+            size += len(msg) + 4
+
+        timetag = pack_timetag(bundle.timetag)
+
+        if nested:
+            chunks[index] = pack('>I', size) + b'#bundle\0' + timetag
+            return size + 4
+
+        chunks[index] = b'#bundle\0' + timetag
+        return size
+
+    def pack(self):
+        """Return the packed bundle as a binary string."""
+        return b''.join(self._chunks)
+
+    def pack_into(self, buf, offset=0):
+        """Write bundle into writable buffer ``buf`` at ``offset``.
+
+        Returns the offset of the first byte after the bundle.
+
+        """
+        end = offset + self.size
+
+        if end > len(buf):
+            raise ValueError("Buffer too small for bundle of %i bytes." % self.size)
+
+        view = memoryview(buf)
+
+        for chunk in self._chunks:
+            size = len(chunk)
+            view[offset:offset + size] = chunk
+            offset += size
+
+        return end
+
+
+def _flatten(bundle, path, leaves):
+    # collect (bundle path, encoded message) for each message in the tree
+    path = path + (bundle,)
+
+    for msg in bundle:
+        if isinstance(msg, Bundle):
+            _flatten(msg, path, leaves)
+        else:
+            leaves.append((path, encode(*msg) if isinstance(msg, tuple) else msg))
+
+    return leaves
+
+
+def _build(leaves):
+    # rebuild bundle tree with the same timetags from consecutive leaves
+    stack = []
+
+    for path, msg in leaves:
+        depth = 0
+
+        while depth < len(stack) and depth < len(path) and stack[depth][0] is path[depth]:
+            depth += 1
+
+        del stack[depth:]
+
+        for orig in path[depth:]:
+            new = Bundle(orig.timetag)
+
+            if stack:
+                stack[-1][1].add(new)
+
+            stack.append((orig, new))
+
+        stack[-1][1].add(msg)
+
+    return stack[0][1]
+
+
+def split_bundle(bundle, max_size=MAX_DGRAM_SIZE):
+    """Pack bundle into as few datagrams of at most ``max_size`` bytes as possible.
+
+    Returns a list of packed bundles. If the bundle is too big for one
+    datagram, its messages are distributed over several bundles in their
+    original order. Each message stays in a bundle with the same timetag and
+    nesting as in the original bundle. Empty nested bundles are dropped.
+
+    Raises ``ValueError`` if a single message, including the headers of the
+    bundles it is nested in, is larger than ``max_size``.
+
+    """
+    writer = BundleWriter(bundle)
+
+    if writer.size <= max_size:
+        return [writer.pack()]
+
+    groups = []
+    group = None
+    size = 0
+    last = ()
+
+    for leaf in _flatten(bundle, (), []):
+        path, msg = leaf
+        common = 0
+
+        if group is not None:
+            while common < len(last) and common < len(path) and last[common] is path[common]:
+                common += 1
+
+        # size prefix and message, plus size prefix and header of newly opened
+        # nested bundles
+        cost = 4 + len(msg) + 20 * (len(path) - max(common, 1))
+
+        if group is None or size + cost > max_size:
+            cost = 4 + len(msg) + 20 * (len(path) - 1)
+
+            if 16 + cost > max_size:
+                raise ValueError("OSC message of %i bytes does not fit into a datagram of "
+                                 "%i bytes." % (len(msg), max_size))
+
+            group = []
+            groups.append(group)
+            size = 16
+
+        group.append(leaf)
+        size += cost
+        last = path
+
+    return [pack_bundle(_build(group)) for group in groups]
 
 
 class Client:
-    def __init__(self, host, port=None):
+    """OSC UDP client.
+
+    If ``buffered`` is true, messages sent to the default destination are
+    queued and sent together as a bundle with an immediate timetag as soon as
+    adding another message would make the datagram larger than ``max_size``
+    bytes, when ``flush`` or ``close`` is called or, if ``max_delay`` is set,
+    when a message is sent or ``poll`` is called after the first queued
+    message has waited for ``max_delay`` seconds or longer. A single queued
+    message is sent on its own, without a bundle.
+
+    There is no timer, which sends queued messages by itself. If no further
+    messages are sent, the caller must call ``poll`` regularly, e.g. in its
+    main loop, or ``flush``, for queued messages to go out.
+
+    If ``split`` is true, bundles larger than ``max_size`` bytes are split
+    into several datagrams with ``split_bundle``.
+
+    Destination addresses are resolved with ``resolve``, which caches lookups.
+    If ``pooled`` is true, datagrams are sent from the shared sockets returned
+    by ``get_socket``, which ``close`` leaves open. Otherwise the client
+    creates its own socket.
+
+    """
+
+    def __init__(self, host, port=None, buffered=False, max_size=MAX_DGRAM_SIZE,
+                 max_delay=None, split=False, pooled=False):
         if port is None:
             if isinstance(host, (list, tuple)):
                 host, port = host
@@ -179,23 +708,101 @@ class Client:
                 port = host
                 host = '127.0.0.1'
 
-        self.dest = pack_addr((host, port))
+        self.family, self.dest = resolve((host, port))
+        self.pooled = pooled
         self.sock = None
+        self.buffered = buffered
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.split = split
+        self._queue = []
+        self._qsize = 0
+        self._deadline = None
 
     def send(self, msg, *args, **kw):
-        dest = pack_addr(kw.get('dest', self.dest))
+        dest = kw.get('dest')
+
+        if self.split and isinstance(msg, Bundle):
+            for data in split_bundle(msg, self.max_size):
+                self.send(data, dest=dest)
+
+            return
+
+        msg = encode(msg, *args)
+
+        if dest is None:
+            if self.buffered:
+                self._enqueue(msg)
+            else:
+                self._sendto(msg)
+        else:
+            family, dest = resolve(dest)
+            self._socket(family).sendto(msg, dest)
+
+    def _socket(self, family):
+        if self.pooled or family != self.family:
+            return get_socket(family)
 
         if not self.sock:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock = socket.socket(family, socket.SOCK_DGRAM)
 
-        if isinstance(msg, Bundle):
-            msg = pack_bundle(msg)
-        elif args or isinstance(msg, unicodetype):
-            msg = create_message(msg, *args)
+        return self.sock
+
+    def _sendto(self, data):
+        # send to default destination
+        self._socket(self.family).sendto(data, self.dest)
+
+    def _enqueue(self, data):
+        size = len(data) + 4
+
+        if self._queue and self._qsize + size > self.max_size:
+            self.flush()
+
+        if not self._queue:
+            if size + 16 > self.max_size:
+                # too big to be bundled, send on its own
+                self._sendto(data)
+                return
+
+            self._qsize = 16
+            if self.max_delay is not None:
+                self._deadline = ticks_add(ticks_ms(), int(self.max_delay * 1000))
 
-        self.sock.sendto(msg, dest)
+        self._queue.append(data)
+        self._qsize += size
+        self.poll()
+
+    def poll(self):
+        """Flush queued messages if the oldest has waited for max_delay."""
+        if self._deadline is not None and ticks_diff(ticks_ms(), self._deadline) >= 0:
+            self.flush()
+
+    def flush(self):
+        """Send all queued messages."""
+        queue = self._queue
+
+        if not queue:
+            return
+
+        if len(queue) == 1:
+            data = queue[0]
+        else:
+            data = [b'#bundle\0', pack_timetag(TimetagNow)]
+
+            for msg in queue:
+                data.append(pack('>I', len(msg)))
+                data.append(msg)
+
+            data = b''.join(data)
+
+        self._queue = []
+        self._qsize = 0
+        self._deadline = None
+        self._sendto(data)
 
     def close(self):
+        self.flush()
+
         if self.sock:
             self.sock.close()
             self.sock = None
@@ -208,5 +815,14 @@ class Client:
 
 
 def send(dest, address, *args):
-    with Client(dest) as client:
-        client.send(address, *args)
+    """Send a message or bundle to dest from a shared socket of the socket pool.
+
+    ``dest`` is a ``(host, port)`` tuple or a port number on localhost. See
+    ``encode`` for the other arguments.
+
+    """
+    if not isinstance(dest, (list, tuple)):
+        dest = ('127.0.0.1', dest)
+
+    family, dest = resolve(dest)
+    get_socket(family).sendto(encode(address, *args), dest)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/coalesce.py
+#
+"""Coalescing and rate limiting of OSC messages.
+
+Wraps a ``uosc.client.Client`` or ``uosc.threadedclient.ThreadedClient`` and
+keeps only the latest arguments sent to each address until they can be sent
+without exceeding the configured rates:
+
+    from uosc.client import Client
+    from uosc.coalesce import CoalescingSender
+
+    # at most 20 messages per second per address and 200 in total
+    osc = CoalescingSender(Client('192.168.0.42', 9001), rate=200, address_rate=20)
+
+    while True:
+        osc.send('/fader/1', read_fader(1))
+        # send pending values, which are due
+        osc.poll()
+
+The latest value for each address is always sent eventually, as long as
+``poll`` (or ``send``) keeps being called, or when ``flush`` or ``close`` is
+called.
+
+"""
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+from uosc.common import LRUCache, ticks_diff, ticks_ms
+
+
+class TokenBucket:
+    """Token bucket rate limiter.
+
+    Allows ``rate`` operations per second on average and bursts of up to
+    ``burst`` operations. ``clock`` returns the time in milliseconds, which
+    may wrap around like ``time.ticks_ms`` on MicroPython.
+
+    """
+
+    def __init__(self, rate, burst=1, clock=ticks_ms):
+        self.rate = float(rate)
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.last = clock()
+
+    def _refill(self, now):
+        elapsed = ticks_diff(now, self.last)
+
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate / 1000.0)
+
+        self.last = now
+
+    def delay(self, now=None):
+        """Return seconds until a token is available (0.0 if one is available now)."""
+        self._refill(self.clock() if now is None else now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def consume(self, now=None):
+        """Take a token if one is available. Returns True if a token was taken."""
+        self._refill(self.clock() if now is None else now)
+
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+
+        return False
+
+
+class CoalescingSender:
+    """Last-value-wins sender with global and per-address rate limits.
+
+    ``rate`` limits the number of messages sent per second in total and
+    ``address_rate`` the number sent per second for each address (or key).
+    Either can be None for no limit. ``burst`` is the number of messages,
+    which may be sent at once before the limits apply.
+
+    Messages are coalesced by address, or by the ``key`` keyword argument to
+    ``send``, if given, e.g. to coalesce messages sent to the same address
+    separately by their first argument.
+
+    At most ``max_keys`` per-address rate limiters are kept. When more keys
+    are in use, the least recently used key loses its limiter and starts
+    over with a full burst the next time it is sent to.
+
+    """
+
+    def __init__(self, client, rate=None, address_rate=None, burst=1, clock=ticks_ms,
+                 max_keys=256):
+        self.client = client
+        self.rate = rate
+        self.address_rate = address_rate
+        self.burst = burst
+        self.clock = clock
+        self._global = TokenBucket(rate, burst, clock) if rate else None
+        self._buckets = LRUCache(max_keys)
+        # key -> (address, args) in the order the keys became pending
+        self._pending = OrderedDict()
+        self.received = 0
+        self.coalesced = 0
+        self.sent = 0
+
+    def send(self, address, *args, **kw):
+        """Replace pending value for address (or key) and send due values."""
+        key = kw.get('key', address)
+        self.received += 1
+
+        if key in self._pending:
+            self.coalesced += 1
+
+        self._pending[key] = (address, args)
+        self.poll()
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.address_rate, self.burst, self.clock)
+
+        return bucket
+
+    def poll(self):
+        """Send pending values allowed by the rate limits.
+
+        Returns the number of seconds until the next pending value can be
+        sent, or None if no values are pending.
+
+        """
+        pending = self._pending
+
+        if not pending:
+            return None
+
+        now = self.clock()
+        delay = None
+        glob = self._global
+
+        for key in list(pending):
+            wait = self._bucket(key).delay(now) if self.address_rate else 0.0
+
+            if glob is not None:
+                wait = max(wait, glob.delay(now))
+
+            if wait > 0.0:
+                if delay is None or wait < delay:
+                    delay = wait
+
+                if glob is not None and glob.tokens < 1.0:
+                    # no global tokens left, later keys need to wait as well
+                    break
+
+                continue
+
+            if self.address_rate:
+                self._bucket(key).consume(now)
+
+            if glob is not None:
+                glob.consume(now)
+
+            self._send(pending.pop(key))
+
+        return delay if pending else None
+
+    def _send(self, item):
+        address, args = item
+        self.client.send(address, *args)
+        self.sent += 1
+
+    def flush(self):
+        """Send all pending values now, regardless of the rate limits."""
+        pending = self._pending
+
+        while pending:
+            key = next(iter(pending))
+            self._send(pending.pop(key))
+
+        if hasattr(self.client, 'flush'):
+            self.client.flush()
+
+    def stats(self):
+        """Return dict with number of received, coalesced, sent and pending values."""
+        return {
+            'received': self.received,
+            'coalesced': self.coalesced,
+            'sent': self.sent,
+            'pending': len(self._pending),
+        }
+
+    def close(self):
+        self.flush()
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
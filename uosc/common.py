@@ -9,16 +9,80 @@ try:
 except ImportError:
     from utime import time
 
+try:
+    from time import monotonic
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(end, start):
+        return end - start
+except ImportError:
+    # MicroPython: time.time() only has a resolution of one second
+    from time import ticks_add, ticks_diff, ticks_ms  # noqa: F401
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+try:
+    from array import array
+except ImportError:
+    from uarray import array
+
+try:
+    from ustruct import pack, unpack_from
+except ImportError:
+    from struct import pack, unpack_from
+
+import sys
+
 
 # UNIX_EPOCH = datetime.datetime.utcfromtimestamp(0)
 # NTP_EPOCH = datetime.datetime(1900, 1, 1, 0, 0, 0)
 # NTP_DELTA = int((UNIX_EPOCH - NTP_EPOCH).total_seconds())
 NTP_DELTA = 2208988800
 ISIZE = 4294967296  # 2**32
+# Max. UDP payload size, which fits into an ethernet frame without fragmentation
+MAX_DGRAM_SIZE = 1472
+# array.array typecodes for the numeric OSC typetags, whose values can be
+# converted from and to big-endian binary data a whole array at a time
+ARRAY_TYPECODES = {
+    'd': 'd',
+    'f': 'f',
+    'h': 'q',
+    'i': 'i' if len(bytes(array('i', [0]))) == 4 else 'l',
+}
+# struct format code and item size for the numeric OSC typetags
+NUMERIC_TAGS = {'d': ('d', 8), 'f': ('f', 4), 'h': ('q', 8), 'i': ('i', 4)}
+# Big-endian NumPy dtypes for the numeric OSC typetags
+NUMPY_DTYPES = {'d': '>f8', 'f': '>f4', 'h': '>i8', 'i': '>i4'}
+# Without array.byteswap (MicroPython), arrays are converted with struct
+_NATIVE_ARRAYS = hasattr(array('b'), 'byteswap')
+_SWAP_ARRAYS = _NATIVE_ARRAYS and sys.byteorder == 'little'
+
+
+class _Sentinel:
+    """Unique constant, which is still the same object after unpickling."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+    def __reduce__(self):
+        # pickled as a reference to the module global of the same name
+        return self.name
+
 
-TimetagNow = object()
+TimetagNow = _Sentinel('TimetagNow')
 
-Impulse = object()
+Impulse = _Sentinel('Impulse')
 
 
 class Bundle:
@@ -48,10 +112,121 @@ class Bundle:
     def add(self, *items):
         self._items.extend(list(items))
 
+    def pack(self):
+        """Return bundle packed into a binary string."""
+        from uosc.client import pack_bundle
+        return pack_bundle(self)
+
+    def pack_into(self, buf, offset=0):
+        """Pack bundle into writable buffer ``buf`` at ``offset``.
+
+        Returns the offset of the first byte after the packed bundle. Use
+        ``uosc.client.BundleWriter`` to get the size of the packed bundle
+        first.
+
+        """
+        from uosc.client import BundleWriter
+        return BundleWriter(self).pack_into(buf, offset)
+
     def __iter__(self):
         return iter(self._items)
 
 
+class LRUCache:
+    """Bounded mapping, which discards the least recently used items first.
+
+    Counts cache hits and misses of ``get`` calls.
+
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        data = self._data
+
+        if key in data:
+            self.hits += 1
+            # move item to end, i.e. mark it as most recently used
+            value = data[key] = data.pop(key)
+            return value
+
+        self.misses += 1
+        return default
+
+    def __setitem__(self, key, value):
+        data = self._data
+
+        if key in data:
+            del data[key]
+        elif len(data) >= self.maxsize:
+            del data[next(iter(data))]
+
+        data[key] = value
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        """Return dict with cache hits, misses, current and maximum size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+
+def pack_array(typetag, values):
+    """Return numbers packed as big-endian binary data for the numeric typetag.
+
+    ``values`` may be an ``array.array``, a NumPy array or any sequence of
+    numbers. Arrays are converted and byte-swapped as a whole instead of item
+    by item.
+
+    """
+    if hasattr(values, 'astype'):
+        return values.astype(NUMPY_DTYPES[typetag]).tobytes()
+
+    if _NATIVE_ARRAYS:
+        code = ARRAY_TYPECODES[typetag]
+
+        if _SWAP_ARRAYS or getattr(values, 'typecode', None) != code:
+            values = array(code, values)
+
+        if _SWAP_ARRAYS:
+            values.byteswap()
+
+        return bytes(values)
+
+    return pack('>%i%s' % (len(values), NUMERIC_TAGS[typetag][0]), *values)
+
+
+def unpack_array(typetag, data, offset, count):
+    """Return count numbers of the numeric typetag from data at offset as an array."""
+    code = ARRAY_TYPECODES[typetag]
+
+    if _NATIVE_ARRAYS:
+        values = array(code)
+        values.frombytes(data[offset:offset + count * NUMERIC_TAGS[typetag][1]])
+
+        if _SWAP_ARRAYS:
+            values.byteswap()
+
+        return values
+
+    return array(code, unpack_from('>%i%s' % (count, NUMERIC_TAGS[typetag][0]), data, offset))
+
+
 def to_frac(t):
     """Return seconds and fractional part of NTP timestamp as 2-item tuple."""
     sec = int(t)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/compat/structutil.py
+#
+"""Minimal stand-in for ``struct.Struct`` on MicroPython."""
+
+try:
+    from ustruct import calcsize, pack, pack_into, unpack, unpack_from
+except ImportError:
+    from struct import calcsize, pack, pack_into, unpack, unpack_from
+
+
+class Struct:
+    def __init__(self, format):
+        self.format = format
+        self.size = calcsize(format)
+
+    def pack(self, *args):
+        return pack(self.format, *args)
+
+    def pack_into(self, buf, offset, *args):
+        pack_into(self.format, buf, offset, *args)
+
+    def unpack(self, data):
+        return unpack(self.format, data)
+
+    def unpack_from(self, data, offset=0):
+        return unpack_from(self.format, data, offset)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/dispatch.py
+#
+"""Dispatch OSC messages to handlers by address pattern.
+
+Example:
+
+    from uosc.dispatch import Dispatcher
+    from uosc.tools.minimal_server import run_server
+    from uosc.server import handle_osc
+
+    def volume(timetag, msg):
+        oscaddr, tags, args, src = msg
+        print("Set volume of %s to %r" % (oscaddr, args[0]))
+
+    dispatcher = Dispatcher()
+    dispatcher.add('/mixer/1/volume', volume)
+    dispatcher.add('/mixer/2/volume', volume)
+
+    run_server('0.0.0.0', 9001,
+               handler=lambda data, src: handle_osc(data, src, dispatch=dispatcher))
+
+"""
+
+try:
+    import re
+except ImportError:
+    import ure as re
+
+from uosc.common import LRUCache
+
+
+# Characters with special meaning in OSC address patterns
+PATTERN_CHARS = '*?[]{}'
+
+
+def _escape(s):
+    return ''.join('\\' + c if c in '.^$+()|\\' else c for c in s)
+
+
+def compile_pattern(part):
+    """Compile one part of an OSC address pattern into a regular expression.
+
+    ``part`` must not contain slashes.
+
+    """
+    regex = ['^']
+    i = 0
+
+    while i < len(part):
+        c = part[i]
+
+        if c == '*':
+            regex.append('.*')
+        elif c == '?':
+            regex.append('.')
+        elif c in '[{':
+            end = part.find(']' if c == '[' else '}', i)
+
+            if end == -1:
+                raise ValueError("Unterminated '%s' in OSC address pattern." % c)
+
+            chars = part[i + 1:end]
+
+            if c == '{':
+                regex.append('(' + '|'.join(_escape(s) for s in chars.split(',')) + ')')
+            elif chars.startswith('!'):
+                regex.append('[^' + _escape(chars[1:]) + ']')
+            else:
+                regex.append('[' + _escape(chars) + ']')
+
+            i = end
+        else:
+            regex.append(_escape(c))
+
+        i += 1
+
+    regex.append('$')
+    return re.compile(''.join(regex))
+
+
+class _Node:
+    __slots__ = ('children', 'handlers')
+
+    def __init__(self):
+        self.children = {}
+        self.handlers = []
+
+
+class Dispatcher:
+    """Dispatch OSC messages to handlers registered for OSC addresses.
+
+    Handlers are called with the same ``(timetag, msg)`` arguments as the
+    ``dispatch`` callable passed to ``uosc.server.handle_osc``, so a
+    ``Dispatcher`` instance can be used as that argument.
+
+    Handlers are stored in a trie of address parts. The address of an
+    incoming message is treated as an OSC address pattern and may use the
+    wildcards ``*``, ``?``, ``[a-z]``, ``[!a-z]`` and ``{foo,bar}`` within each
+    part. Literal parts are looked up directly, so the cost of routing depends
+    on the depth of the address, not on the number of registered handlers.
+    The handlers matching an address pattern are cached in an LRU cache of
+    ``cache_size`` entries.
+
+    If no handler matches, the message is passed to the ``default`` handler,
+    if one is given.
+
+    """
+
+    def __init__(self, default=None, cache_size=256):
+        self.default = default
+        self._root = _Node()
+        self._cache = LRUCache(cache_size)
+
+    def add(self, address, handler):
+        """Register handler for given OSC address."""
+        assert address.startswith('/'), "OSC address must start with a slash."
+        node = self._root
+
+        for part in address.split('/')[1:]:
+            child = node.children.get(part)
+
+            if child is None:
+                child = node.children[part] = _Node()
+
+            node = child
+
+        node.handlers.append(handler)
+        self._cache.clear()
+
+    def remove(self, address, handler=None):
+        """Unregister handler, or all handlers if None, for given OSC address.
+
+        Raises ``KeyError`` if no handler is registered for the address.
+
+        """
+        path = [self._root]
+
+        for part in address.split('/')[1:]:
+            path.append(path[-1].children[part])
+
+        node = path[-1]
+
+        if not node.handlers:
+            raise KeyError(address)
+
+        if handler is None:
+            del node.handlers[:]
+        else:
+            node.handlers.remove(handler)
+
+        # prune nodes without handlers and children
+        for part, parent in zip(reversed(address.split('/')[1:]), reversed(path[:-1])):
+            child = parent.children[part]
+
+            if child.handlers or child.children:
+                break
+
+            del parent.children[part]
+
+        self._cache.clear()
+
+    def match(self, pattern):
+        """Return tuple of handlers for all addresses matching OSC address pattern."""
+        handlers = self._cache.get(pattern)
+
+        if handlers is None:
+            handlers = []
+            self._match(self._root, pattern.split('/')[1:], 0, handlers)
+            handlers = self._cache[pattern] = tuple(handlers)
+
+        return handlers
+
+    def _match(self, node, parts, index, result):
+        if index == len(parts):
+            result.extend(node.handlers)
+            return
+
+        part = parts[index]
+
+        if any(c in PATTERN_CHARS for c in part):
+            regex = compile_pattern(part)
+
+            for name, child in node.children.items():
+                if regex.match(name):
+                    self._match(child, parts, index + 1, result)
+        else:
+            child = node.children.get(part)
+
+            if child is not None:
+                self._match(child, parts, index + 1, result)
+
+    def cache_stats(self):
+        """Return dict with hits, misses and size of the match cache."""
+        return self._cache.stats()
+
+    def __call__(self, timetag, msg):
+        handlers = self.match(msg[0])
+
+        if handlers:
+            for handler in handlers:
+                handler(timetag, msg)
+        elif self.default is not None:
+            self.default(timetag, msg)
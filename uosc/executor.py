@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/executor.py
+#
+"""Dispatch OSC messages to handlers running in a process pool (CPython).
+
+An ``ExecutorDispatch`` is passed as the ``dispatch`` argument to
+``uosc.server.handle_osc``. It hands each message to a handler running in a
+``concurrent.futures`` executor, so that slow handlers do not hold up the
+receive loop:
+
+    from uosc.executor import ExecutorDispatch
+
+    def analyze(timetag, msg):
+        oscaddr, tags, args, src = msg
+        ...
+
+    dispatch = ExecutorDispatch(analyze, max_workers=4)
+    run_server('0.0.0.0', 9001, handler=lambda data, src: handle_osc(
+        data, src, dispatch=dispatch))
+
+Messages with the same key, by default the OSC address, are handled one
+after the other in the order they were received. Messages with different keys
+are handled in parallel. With the default ``ProcessPoolExecutor``, the
+handler and the messages must be picklable, i.e. the handler must be a
+module-level function.
+
+"""
+
+import logging
+import os
+import threading
+
+from collections import deque
+
+
+log = logging.getLogger("uosc.executor")
+
+
+def address_key(timetag, msg):
+    """Return OSC address of msg as ordering key."""
+    return msg[0]
+
+
+class ExecutorDispatch:
+    """Dispatch callable, which runs handler in an executor, ordered by key.
+
+    ``key(timetag, msg)`` returns the key, by which messages are ordered. At
+    most ``max_in_flight`` messages are submitted to the executor at once.
+    Further messages wait in a queue, which holds at most ``max_queued``
+    messages. When it is full, new messages are dropped and counted.
+
+    If no ``executor`` is given, a ``ProcessPoolExecutor`` with
+    ``max_workers`` processes is created and shut down by ``close``.
+    ``max_in_flight`` defaults to twice the number of workers.
+
+    """
+
+    def __init__(self, handler, executor=None, key=address_key, max_in_flight=None,
+                 max_queued=1024, max_workers=None):
+        if executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers)
+            self._own_executor = True
+        else:
+            self._own_executor = False
+
+        self.handler = handler
+        self.executor = executor
+        self.key = key
+        self.max_in_flight = max_in_flight or 2 * (max_workers or os.cpu_count() or 1)
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # key -> queued messages, for all keys with a message in flight or queued
+        self._keys = {}
+        # keys with queued messages, but none in flight, waiting for a free slot
+        self._ready = deque()
+        self.in_flight = 0
+        self.queued = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __call__(self, timetag, msg):
+        """Queue message for the handler. Returns False if it was dropped."""
+        if not isinstance(msg, tuple):
+            # e.g. LazyMessage
+            msg = tuple(msg)
+
+        key = self.key(timetag, msg)
+        item = (timetag, msg)
+
+        with self._lock:
+            queue = self._keys.get(key)
+
+            if queue is None and self.in_flight < self.max_in_flight:
+                self._keys[key] = deque()
+                self.in_flight += 1
+                self.submitted += 1
+            elif self.queued >= self.max_queued:
+                self.dropped += 1
+                return False
+            else:
+                if queue is None:
+                    # no message for key in flight, wait for a free slot
+                    queue = self._keys[key] = deque()
+                    self._ready.append(key)
+
+                queue.append(item)
+                self.queued += 1
+
+                if self.queued > self.max_depth:
+                    self.max_depth = self.queued
+
+                return True
+
+        self._submit(key, item)
+        return True
+
+    def _submit(self, key, item):
+        try:
+            future = self.executor.submit(self.handler, *item)
+        except Exception as exc:
+            self._done(key, None, exc)
+        else:
+            future.add_done_callback(lambda future: self._done(key, future))
+
+    def _done(self, key, future, exc=None):
+        if future is not None:
+            exc = future.exception() if not future.cancelled() else None
+
+        if exc is not None:
+            log.error("Exception in OSC handler: %s", exc)
+
+        submit = []
+
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+            if exc is not None:
+                self.errors += 1
+
+            if self._keys[key]:
+                self._ready.append(key)
+            else:
+                del self._keys[key]
+
+            while self._ready and self.in_flight < self.max_in_flight:
+                next_key = self._ready.popleft()
+                submit.append((next_key, self._keys[next_key].popleft()))
+                self.queued -= 1
+                self.in_flight += 1
+                self.submitted += 1
+
+            if not self._keys:
+                self._idle.notify_all()
+
+        for next_key, item in submit:
+            self._submit(next_key, item)
+
+    def join(self, timeout=None):
+        """Wait until all messages are handled. Returns False on timeout."""
+        with self._idle:
+            if self._keys:
+                self._idle.wait_for(lambda: not self._keys, timeout)
+
+            return not self._keys
+
+    def stats(self):
+        """Return dict with message counters and queue depth.
+
+        ``in_flight`` is the number of messages submitted to the executor and
+        not yet handled, ``queued`` the number of messages waiting to be
+        submitted, ``max_depth`` the highest number of waiting messages so
+        far and ``keys`` the number of keys with messages in flight or queued.
+
+        """
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_depth': self.max_depth,
+                'keys': len(self._keys),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'errors': self.errors,
+                'dropped': self.dropped,
+            }
+
+    def close(self, wait=True):
+        """Wait for queued messages, if wait is true, and shut down own executor."""
+        if wait:
+            self.join()
+
+        if self._own_executor:
+            self.executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/fanout.py
+#
+"""OSC client sending the same messages to many destinations.
+
+Each message or bundle is encoded only once and the same data is then sent
+to every destination:
+
+    from uosc.fanout import FanoutClient
+
+    osc = FanoutClient(('192.168.0.42', 9001), ('192.168.0.43', 9001))
+    osc.add('192.168.0.44', 9001)
+    failed = osc.send('/mixer/fader', 3, 0.75)
+
+Every destination has its own connected UDP socket, so ICMP errors, like
+"port unreachable", are reported by the following send to that destination.
+Destinations, for which ``max_failures`` such errors are reported in a row,
+are skipped for ``quarantine`` seconds and then tried again. Datagrams, which
+are dropped because the local send buffer is full, do not count as failures.
+
+"""
+
+import socket
+
+try:
+    import errno
+except ImportError:
+    import uerrno as errno
+
+try:
+    import logging
+except ImportError:
+    import uosc.compat.fakelogging as logging
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+from uosc.client import encode, resolve
+from uosc.common import ticks_add, ticks_diff, ticks_ms
+
+
+log = logging.getLogger("uosc.fanout")
+# Errors reported by ICMP messages from the destination or a router on the way
+UNREACHABLE_ERRORS = set(getattr(errno, name) for name in (
+    'ECONNREFUSED', 'EHOSTUNREACH', 'ENETUNREACH', 'EHOSTDOWN', 'ENETDOWN')
+    if hasattr(errno, name))
+# Errors caused by a full local send buffer
+BUFFER_ERRORS = set(getattr(errno, name) for name in ('EAGAIN', 'EWOULDBLOCK', 'ENOBUFS')
+                    if hasattr(errno, name))
+
+
+class Destination:
+    """A destination of a ``FanoutClient`` with its socket and send counters."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.family, self.addr = resolve((host, port))
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.sock.connect(self.addr)
+        self.sock.setblocking(False)
+        self.sent = 0
+        self.errors = 0
+        # datagrams dropped because the local send buffer was full
+        self.dropped = 0
+        # consecutive failed sends
+        self.failures = 0
+        self.last_error = None
+        # time until which the destination is skipped
+        self.quarantined = None
+
+    def close(self):
+        self.sock.close()
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'quarantined': self.quarantined is not None,
+        }
+
+
+class FanoutClient:
+    """Sends each message or bundle, encoded once, to a set of destinations.
+
+    Destinations are ``(host, port)`` tuples and can be added and removed at
+    any time. After ``max_failures`` consecutive sends to a destination,
+    which report it as unreachable, e.g. because the destination host
+    reported the port as unreachable, it is quarantined, i.e. skipped, for
+    ``quarantine`` seconds.
+
+    """
+
+    def __init__(self, *dests, **kw):
+        self.max_failures = kw.get('max_failures', 3)
+        self.quarantine = kw.get('quarantine', 10.0)
+        self.clock = kw.get('clock', ticks_ms)
+        self._dests = OrderedDict()
+
+        for dest in dests:
+            self.add(*dest)
+
+    def add(self, host, port):
+        """Add destination, unless it has already been added."""
+        key = (host, port)
+
+        if key not in self._dests:
+            self._dests[key] = Destination(host, port)
+
+    def remove(self, host, port):
+        """Remove destination and close its socket."""
+        dest = self._dests.pop((host, port), None)
+
+        if dest is not None:
+            dest.close()
+
+    def destinations(self):
+        """Return list of ``(host, port)`` tuples of all destinations."""
+        return list(self._dests)
+
+    def send(self, msg, *args):
+        """Encode message or bundle once and send it to all destinations.
+
+        Takes the same arguments as ``uosc.client.encode``. Returns a list of
+        ``(host, port)`` tuples of the destinations, to which the data could
+        not be sent, including those, for which the local send buffer was
+        full. Quarantined destinations are skipped and not included.
+
+        A send, which reports an unreachable error caused by an earlier
+        datagram, is retried once. If the retry succeeds, the destination is
+        not included, but the error still counts as a failure.
+
+        """
+        data = encode(msg, *args)
+        now = None
+        failed = []
+
+        for key, dest in self._dests.items():
+            if dest.quarantined is not None:
+                if now is None:
+                    now = self.clock()
+
+                if ticks_diff(dest.quarantined, now) > 0:
+                    continue
+
+                dest.quarantined = None
+
+            try:
+                dest.sock.send(data)
+            except OSError as exc:
+                if not self._failed(key, dest, exc) or dest.quarantined is not None:
+                    failed.append(key)
+                    continue
+
+                # The error was caused by an earlier datagram, so this one was
+                # not sent yet. The next send reports an error again, if the
+                # destination is still unreachable.
+                try:
+                    dest.sock.send(data)
+                except OSError as exc:
+                    self._failed(key, dest, exc)
+                    failed.append(key)
+                else:
+                    dest.sent += 1
+            else:
+                dest.sent += 1
+                dest.failures = 0
+
+        return failed
+
+    def _failed(self, key, dest, exc):
+        # Returns True if the destination was reported as unreachable
+        code = exc.args[0] if exc.args else None
+
+        if code in BUFFER_ERRORS:
+            dest.dropped += 1
+            return False
+
+        dest.errors += 1
+        dest.last_error = exc
+
+        if code not in UNREACHABLE_ERRORS:
+            return False
+
+        dest.failures += 1
+
+        if dest.failures >= self.max_failures:
+            dest.quarantined = ticks_add(self.clock(), int(self.quarantine * 1000))
+            log.warning("Sending to %s:%s failed %i times (%s), skipping it for %.1f s.",
+                        key[0], key[1], dest.failures, exc, self.quarantine)
+
+        return True
+
+    def stats(self):
+        """Return dict mapping ``(host, port)`` tuples to send counters.
+
+        The counters are the number of datagrams ``sent``, the number of
+        ``errors``, the number of datagrams ``dropped`` because the local send
+        buffer was full, the number of consecutive ``failures``, i.e.
+        unreachable errors, the ``last_error`` exception and whether the
+        destination is currently ``quarantined``.
+
+        """
+        return dict((key, dest.stats()) for key, dest in self._dests.items())
+
+    def close(self):
+        while self._dests:
+            self._dests.popitem()[1].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/scheduler.py
+#
+"""Dispatch messages from OSC bundles at the time given by their timetag.
+
+A ``Scheduler`` wraps a dispatch callable and is itself passed as the
+``dispatch`` argument to ``uosc.server.handle_osc``. Messages, which are not
+part of a bundle, and bundle messages with an immediate or past timetag are
+dispatched right away. Bundle messages with a future timetag are kept in a
+heap until they are due.
+
+Due messages are dispatched by a driver. With asyncio, run the ``run``
+coroutine as a task next to the server task:
+
+    scheduler = Scheduler(dispatch)
+    asyncio.create_task(scheduler.run())
+    await server.serve(host, port, serve_request, dispatch=scheduler)
+
+With the blocking server from ``uosc.tools.minimal_server``, pass the
+scheduler to ``run_server``, which then calls ``run_pending`` and uses the
+delay until the next due message as the socket timeout:
+
+    run_server(host, port, handler=lambda data, src: handle_osc(
+        data, src, dispatch=scheduler), scheduler=scheduler)
+
+"""
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+try:
+    from time import time
+except ImportError:
+    from utime import time
+
+try:
+    import logging
+except ImportError:
+    import uosc.compat.fakelogging as logging
+
+from uosc.common import NTP_DELTA, TimetagNow
+
+
+log = logging.getLogger("uosc.scheduler")
+
+# Policies for bundle messages, which arrive after their timetag has passed
+LATE_DISPATCH = 'dispatch'  # dispatch immediately
+LATE_DROP = 'drop'  # discard and log a warning
+LATE_COUNT = 'count'  # discard silently, only count them
+
+
+def ntp_time():
+    """Return current time as seconds since the NTP epoch."""
+    return time() + NTP_DELTA
+
+
+class Scheduler:
+    """Heap-based scheduler for timetagged OSC bundle messages.
+
+    A message is late if it arrives more than ``tolerance`` seconds after
+    its timetag. Late messages are handled according to ``late_policy``, which
+    must be one of ``LATE_DISPATCH``, ``LATE_DROP`` or ``LATE_COUNT``.
+
+    The scheduling error, i.e. the difference between the time a scheduled
+    message is dispatched and its timetag, is tracked in microseconds and
+    reported by ``stats`` together with message counters.
+
+    """
+
+    def __init__(self, dispatch, late_policy=LATE_DISPATCH, tolerance=0.001, clock=ntp_time):
+        if late_policy not in (LATE_DISPATCH, LATE_DROP, LATE_COUNT):
+            raise ValueError("Invalid late message policy: %r" % late_policy)
+
+        self.dispatch = dispatch
+        self.late_policy = late_policy
+        self.tolerance = tolerance
+        self.clock = clock
+        self._heap = []
+        self._seq = 0
+        self._event = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.immediate = 0
+        self.scheduled = 0
+        self.late = 0
+        self.dropped = 0
+        self._errors = 0
+        self._error_sum = 0.0
+        self._error_min = None
+        self._error_max = None
+
+    def __call__(self, timetag, msg):
+        # -1 is passed for messages outside of bundles and the timetag of
+        # immediate bundles is parsed as a tiny float.
+        if timetag is TimetagNow or timetag < 1.0:
+            self.immediate += 1
+            self.dispatch(timetag, msg)
+            return
+
+        delta = self.clock() - timetag
+
+        if delta < 0:
+            heapq.heappush(self._heap, (timetag, self._seq, msg))
+            self._seq += 1
+            self.scheduled += 1
+
+            if self._event is not None:
+                self._event.set()
+        elif delta <= self.tolerance:
+            self.immediate += 1
+            self.dispatch(timetag, msg)
+        else:
+            self.late += 1
+
+            if self.late_policy == LATE_DISPATCH:
+                self.dispatch(timetag, msg)
+            else:
+                self.dropped += 1
+
+                if self.late_policy == LATE_DROP:
+                    log.warning("Dropped OSC message %s, %.6f s late.", msg[0], delta)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def timeout(self):
+        """Return seconds until the next scheduled message is due or None."""
+        if self._heap:
+            return max(0.0, self._heap[0][0] - self.clock())
+
+    def run_pending(self):
+        """Dispatch all due messages.
+
+        Returns seconds until the next scheduled message is due or None, if
+        no messages are scheduled.
+
+        """
+        heap = self._heap
+        clock = self.clock
+
+        while heap:
+            now = clock()
+            timetag = heap[0][0]
+
+            if timetag > now:
+                return timetag - now
+
+            _, _, msg = heapq.heappop(heap)
+            error = (now - timetag) * 1e6
+            self._errors += 1
+            self._error_sum += error
+
+            if self._error_min is None or error < self._error_min:
+                self._error_min = error
+
+            if self._error_max is None or error > self._error_max:
+                self._error_max = error
+
+            try:
+                self.dispatch(timetag, msg)
+            except Exception as exc:
+                log.error("Exception in OSC handler: %s", exc)
+
+    async def run(self):
+        """Dispatch scheduled messages when they are due until cancelled."""
+        try:
+            import asyncio
+        except ImportError:
+            import uasyncio as asyncio
+
+        self._event = event = asyncio.Event()
+
+        try:
+            while True:
+                delay = self.run_pending()
+                event.clear()
+
+                if delay is None:
+                    await event.wait()
+                else:
+                    try:
+                        await asyncio.wait_for(event.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._event = None
+
+    def stats(self):
+        """Return dict with message counters and scheduling error in microseconds."""
+        return {
+            'immediate': self.immediate,
+            'scheduled': self.scheduled,
+            'pending': len(self._heap),
+            'late': self.late,
+            'dropped': self.dropped,
+            'error_us': {
+                'count': self._errors,
+                'min': self._error_min,
+                'max': self._error_max,
+                'mean': self._error_sum / self._errors if self._errors else None,
+            },
+        }
@@ -5,29 +5,135 @@
 """A minimal OSC UDP server."""
 
 try:
-    from ustruct import unpack
+    from ustruct import unpack_from
 except ImportError:
-    from struct import unpack
+    from struct import unpack_from
+
+try:
+    from struct import Struct
+except ImportError:
+    from uosc.compat.structutil import Struct
 
 try:
     import logging
 except ImportError:
     import uosc.compat.fakelogging as logging
 
-from uosc.common import Impulse, TimetagNow, to_time
+from uosc.common import (MAX_DGRAM_SIZE, NUMERIC_TAGS, Impulse, LRUCache, TimetagNow, to_time,
+                         unpack_array)
+from uosc.stats import REASON_UNKNOWN
 
 
 log = logging.getLogger("uosc.server")
+# Maximum length of typetag strings, for which decoders are cached
+MAX_CACHED_TYPETAGS = 256
+# Maximum number of address and typetag strings in the intern table and
+# maximum length of interned strings
+MAX_INTERNED = 1024
+MAX_INTERNED_LENGTH = 128
+
+
+def _scan_oscstr(msg, offset, end=None):
+    """Find the end of the OSC string in msg at offset.
+
+    Returns the offset of its terminating zero byte and the offset after its
+    padding. Raises ``ValueError`` if the string is not terminated before
+    ``end``.
+
+    """
+    if end is None:
+        end = len(msg)
+
+    # OSC strings are zero-padded to a multiple of four bytes, so only the last
+    # byte of each 4-byte block needs to be checked for the end of the string.
+    pos = offset + 3
+    while pos < end and msg[pos]:
+        pos += 4
+
+    if pos >= end:
+        raise ValueError("Unterminated OSC string at offset %i." % offset)
+
+    next_ = pos + 1
+    pos -= 3
+    while msg[pos]:
+        pos += 1
+
+    return pos, next_
+
 
+def split_oscstr(msg, offset, end=None):
+    """Split OSC string from msg at offset.
+
+    Returns the decoded string and the offset after its padding. Raises
+    ``ValueError`` if the string is not terminated before ``end``.
+
+    """
+    pos, next_ = _scan_oscstr(msg, offset, end)
+    return str(msg[offset:pos], 'utf-8'), next_
+
+
+# Maps raw address and typetag bytes to decoded strings. Typetag strings are
+# stored without the leading comma, which can't clash with addresses, since
+# those start with a slash. A plain dict is used, since lookups on every
+# message must be as cheap as possible. When it is full, the oldest entry is
+# discarded for each new one.
+intern_table = {}
+
+
+# Slices of bytes and, with CPython, of memoryviews of bytes are hashable, so
+# they can be looked up in the intern table without copying them first.
+_VIEW_OBJ = hasattr(memoryview, 'obj')
+
+
+def intern_oscstr(msg, offset, end=None, strip=0):
+    """Split OSC string from msg at offset like ``split_oscstr``.
+
+    Returns the same ``str`` object for the same raw bytes as long as they are
+    in the intern table, without decoding them again. ``strip`` leading
+    characters are removed from the decoded string before it is cached.
+    Strings longer than ``MAX_INTERNED_LENGTH`` bytes are not cached. Strings
+    from mutable buffers, e.g. ``bytearray`` or the buffers of a
+    ``BufferPool``, are copied for the lookup.
+
+    """
+    pos, next_ = _scan_oscstr(msg, offset, end)
+    raw = msg[offset:pos]
 
-def split_oscstr(msg, offset):
-    end = msg.find(b'\0', offset)
-    return msg[offset:end].decode('utf-8'), (end + 4) & ~0x03
+    if pos - offset > MAX_INTERNED_LENGTH:
+        return str(raw[strip:], 'utf-8'), next_
 
+    if type(raw) is not bytes and not (
+            _VIEW_OBJ and type(raw) is memoryview and type(raw.obj) is bytes):
+        raw = bytes(raw)
+
+    try:
+        value = intern_table[raw]
+    except KeyError:
+        value = str(raw[strip:], 'utf-8')
+
+        if len(intern_table) >= MAX_INTERNED:
+            del intern_table[next(iter(intern_table))]
+
+        # copy only on insert, so the key doesn't reference msg
+        intern_table[bytes(raw)] = value
+
+    return value, next_
+
+
+def split_oscblob(msg, offset, end=None):
+    if end is None:
+        end = len(msg)
 
-def split_oscblob(msg, offset):
     start = offset + 4
-    size = unpack('>I', msg[offset:start])[0]
+
+    if start > end:
+        raise ValueError("Truncated OSC blob at offset %i." % offset)
+
+    size = unpack_from('>I', msg, offset)[0]
+
+    if start + size > end:
+        raise ValueError("OSC blob at offset %i exceeds message size." % offset)
+
     return msg[start:start + size], (start + size + 4) & ~0x03
 
 
@@ -36,20 +142,396 @@ def parse_timetag(msg, offset):
     if msg[offset + 7] == 1:
         return TimetagNow
     else:
-        return to_time(*unpack('>II', msg[offset:offset + 8]))
+        return to_time(*unpack_from('>II', msg, offset))
+
+
+def _timetag(value):
+    # compatible with parse_timetag
+    if value & 0xFF == 1:
+        return TimetagNow
+    else:
+        return to_time(value >> 32, value & 0xFFFFFFFF)
+
+
+# Struct format code and conversion function for fixed-size typetags
+FIXED_TAGS = {
+    'c': ('I', chr),
+    'd': ('d', None),
+    'f': ('f', None),
+    'h': ('q', None),
+    'i': ('i', None),
+    'm': ('4s', tuple),
+    'r': ('4s', tuple),
+    't': ('Q', _timetag),
+}
+# Argument values of typetags without data
+CONST_TAGS = {'F': False, 'I': Impulse, 'N': None, 'T': True}
+# Size in bytes of the data of fixed-size typetags
+FIXED_SIZES = dict((tag, Struct('>' + code).size) for tag, (code, _) in FIXED_TAGS.items())
+
+
+def _numeric_array(typetags, i):
+    # Return typetag and length of the OSC array starting at typetags[i], if
+    # it is homogeneous and numeric, else None.
+    end = typetags.find(']', i)
+    items = typetags[i:end] if end > 0 else ''
+
+    if items and items[0] in NUMERIC_TAGS and not items.strip(items[0]):
+        return (items[0], len(items))
+
+
+def _decode_variable(msg, offset, op, copy, end):
+    # Decode a string (op is False), blob (op is True) or numeric array (op is
+    # a (typetag, length) tuple) argument. Returns value and next offset.
+    if op.__class__ is tuple:
+        stop = offset + op[1] * NUMERIC_TAGS[op[0]][1]
+
+        if stop > end:
+            raise ValueError("Array data exceeds message size.")
+
+        return unpack_array(op[0], msg, offset, op[1]), stop
+    elif op:
+        val, offset = split_oscblob(msg, offset, end)
 
+        if copy and isinstance(val, memoryview):
+            val = bytes(val)
 
-def parse_message(msg, strict=False):
-    args = []
-    addr, ofs = split_oscstr(msg, 0)
+        return val, offset
+
+    return split_oscstr(msg, offset, end)
+
+
+def _compile_shape(shape):
+    # Return nesting of arguments as a string or None, if there are no arrays
+    if '[' not in shape:
+        return None
+
+    shape = ''.join(shape)
+
+    if shape.count('[') != shape.count(']'):
+        raise ValueError("Unbalanced array brackets in type tags.")
+
+    return shape
+
+
+class SignatureDecoder:
+    """Decoder for the arguments of OSC messages with a given typetag string.
+
+    Each run of consecutive fixed-size arguments is decoded by a single
+    precompiled ``struct.Struct``. Strings and blobs are decoded in between.
+    OSC arrays are returned as lists, or, if ``arrays`` is true and they
+    contain only values of one numeric type, as ``array.array`` objects.
+
+    """
+
+    def __init__(self, typetags, arrays=False):
+        self.typetags = typetags
+        self.arrays = arrays
+        self._segments = segments = []
+        # argument nesting: '.' for each decoded value, '[' and ']' for arrays
+        shape = []
+        fmt = '>'
+        ops = []
+        i = 0
+
+        while i < len(typetags):
+            typetag = typetags[i]
+            i += 1
+
+            if typetag in FIXED_TAGS:
+                code, conv = FIXED_TAGS[typetag]
+                fmt += code
+                ops.append(conv)
+            elif typetag in CONST_TAGS:
+                ops.append((CONST_TAGS[typetag],))
+            elif typetag in 'sSb[':
+                if typetag == '[':
+                    array_op = _numeric_array(typetags, i) if arrays else None
+
+                    if array_op is None:
+                        shape.append(typetag)
+                        continue
+
+                if ops:
+                    segments.append(self._compile_run(fmt, ops))
+                    fmt = '>'
+                    ops = []
+
+                if typetag == '[':
+                    # homogeneous numeric array, decoded at once into an array.array
+                    segments.append((None, array_op))
+                    i += array_op[1] + 1
+                else:
+                    segments.append((None, typetag == 'b'))
+            elif typetag == ']':
+                shape.append(typetag)
+                continue
+            else:
+                raise ValueError("Type tag '%s' not supported." % typetag)
+
+            shape.append('.')
+
+        if ops:
+            segments.append(self._compile_run(fmt, ops))
+
+        self._shape = _compile_shape(shape)
+        first = segments[0] if len(segments) == 1 else (None, None)
+        # all arguments are decoded by one struct without conversion, if possible
+        self._struct = first[0] if first[1] is None and self._shape is None else None
+
+    @staticmethod
+    def _compile_run(fmt, ops):
+        return (Struct(fmt), None if all(op is None for op in ops) else tuple(ops))
+
+    def decode(self, msg, offset, copy=False, end=None):
+        """Decode arguments from msg at offset.
+
+        Returns a 2-item tuple with the tuple of arguments and the offset
+        after the last argument. Raises ``ValueError`` if the arguments
+        exceed ``end`` (default: the end of ``msg``).
+
+        """
+        if end is None:
+            end = len(msg)
+
+        st = self._struct
+
+        if st is not None:
+            if offset + st.size > end:
+                raise ValueError("Argument data exceeds message size.")
+
+            return st.unpack_from(msg, offset), offset + st.size
+
+        args = []
+        for st, ops in self._segments:
+            if st is None:
+                val, offset = _decode_variable(msg, offset, ops, copy, end)
+                args.append(val)
+            else:
+                if offset + st.size > end:
+                    raise ValueError("Argument data exceeds message size.")
+
+                vals = st.unpack_from(msg, offset)
+                offset += st.size
+
+                if ops is None:
+                    args.extend(vals)
+                    continue
+
+                i = 0
+                for op in ops:
+                    if op is None:
+                        args.append(vals[i])
+                    elif isinstance(op, tuple):
+                        args.append(op[0])
+                        continue
+                    else:
+                        args.append(op(vals[i]))
+
+                    i += 1
+
+        if self._shape is not None:
+            return self._nest(args), offset
+
+        return tuple(args), offset
+
+    def _nest(self, args):
+        stack = [[]]
+        i = 0
+
+        for c in self._shape:
+            if c == '.':
+                stack[-1].append(args[i])
+                i += 1
+            elif c == '[':
+                stack.append([])
+            else:
+                items = stack.pop()
+                stack[-1].append(items)
+
+        return tuple(stack[0])
+
+
+decoder_cache = LRUCache(64)
+
+
+def get_decoder(typetags, arrays=False):
+    """Return SignatureDecoder for given typetags from cache or compile it.
+
+    Decoders for typetag strings longer than ``MAX_CACHED_TYPETAGS`` are not
+    cached.
+
+    """
+    key = (typetags, True) if arrays else typetags
+    decoder = decoder_cache.get(key)
+
+    if decoder is None:
+        decoder = SignatureDecoder(typetags, arrays)
+
+        if len(typetags) <= MAX_CACHED_TYPETAGS:
+            decoder_cache[key] = decoder
+
+    return decoder
+
+
+def decode_message(msg, offset=0, end=None, strict=False, copy=False, arrays=False):
+    """Decode the OSC message in ``msg[offset:end]`` without slicing ``msg``.
+
+    ``msg`` may be any buffer object, e.g. ``bytes``, ``bytearray`` or
+    ``memoryview``. Unless ``copy`` is true, blob arguments are returned as
+    ``memoryview`` objects referencing ``msg``, which are only valid as long as
+    the contents of ``msg`` do not change.
+
+    OSC arrays are returned as lists. If ``arrays`` is true, arrays of a
+    single numeric type ('f', 'd', 'i' or 'h') are returned as
+    ``array.array`` objects instead, which are decoded as a whole.
+
+    Returns an ``(address, typetags, args)`` tuple like ``parse_message``.
+
+    """
+    if end is None:
+        end = len(msg)
+
+    if not copy and not isinstance(msg, memoryview):
+        msg = memoryview(msg)
+
+    addr, ofs = intern_oscstr(msg, offset, end)
 
     if not addr.startswith('/'):
         raise ValueError("OSC address pattern must start with a slash.")
 
     # type tag string must start with comma (ASCII 44)
-    if ofs < len(msg) and msg[ofs:ofs + 1] == b',':
-        tags, ofs = split_oscstr(msg, ofs)
-        tags = tags[1:]
+    if ofs < end and msg[ofs] == 44:
+        tags, ofs = intern_oscstr(msg, ofs, end, 1)
+    else:
+        errmsg = "Missing/invalid OSC type tag string."
+        if strict:
+            raise ValueError(errmsg)
+        else:
+            log.warning(errmsg + ' Ignoring arguments.')
+            tags = ''
+
+    args, _ = get_decoder(tags, arrays).decode(msg, ofs, copy, end)
+    return (addr, tags, args)
+
+
+def parse_message(msg, strict=False, arrays=False):
+    return decode_message(msg, 0, None, strict, True, arrays)
+
+
+def _skip_arg(msg, offset, typetag, end):
+    # return offset after the argument with given typetag at offset
+    if typetag in FIXED_SIZES:
+        return offset + FIXED_SIZES[typetag]
+    elif typetag in 'sS':
+        return _scan_oscstr(msg, offset, end)[1]
+    elif typetag == 'b':
+        return split_oscblob(msg, offset, end)[1]
+
+    return offset
+
+
+class LazyMessage:
+    """OSC message, which decodes its arguments only when they are accessed.
+
+    Only the address and typetags are decoded when the message is created.
+    ``args`` decodes all arguments on first access and ``arg(index)`` only
+    the one at the given index. Like the tuples passed to dispatch by
+    ``handle_osc``, lazy messages can be indexed and unpacked into
+    ``(address, typetags, args, src)``.
+
+    The message keeps a reference to the packet data until its arguments are
+    decoded, so arguments must be accessed before the data changes, e.g. before
+    the handler returns, when a ``BufferPool`` is used. Errors in the argument
+    data are only raised on access.
+
+    """
+
+    __slots__ = ('address', 'typetags', 'src', '_msg', '_offset', '_end', '_copy', '_arrays',
+                 '_args')
+
+    def __init__(self, address, typetags, msg, offset, src=None, copy=True, arrays=False,
+                 end=None):
+        self.address = address
+        self.typetags = typetags
+        self.src = src
+        self._msg = msg
+        self._offset = offset
+        self._end = end
+        self._copy = copy
+        self._arrays = arrays
+        self._args = None
+
+    @property
+    def args(self):
+        if self._args is None:
+            self._args = get_decoder(self.typetags, self._arrays).decode(
+                self._msg, self._offset, self._copy, self._end)[0]
+            self._msg = None
+
+        return self._args
+
+    def arg(self, index):
+        """Return argument at index, decoding only this argument if possible."""
+        tags = self.typetags
+
+        if self._args is not None or '[' in tags:
+            return self.args[index]
+
+        if index < 0:
+            index += len(tags)
+
+        if not 0 <= index < len(tags):
+            raise IndexError("Argument index out of range.")
+
+        msg = self._msg
+        offset = self._offset
+
+        for typetag in tags[:index]:
+            offset = _skip_arg(msg, offset, typetag, self._end)
+
+        return get_decoder(tags[index]).decode(msg, offset, self._copy, self._end)[0][0]
+
+    def __getitem__(self, index):
+        if index == 0:
+            return self.address
+        elif index == 1:
+            return self.typetags
+        elif index == 3:
+            return self.src
+
+        return (self.address, self.typetags, self.args, self.src)[index]
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        return iter((self.address, self.typetags, self.args, self.src))
+
+    def __repr__(self):
+        return "<LazyMessage %s ,%s>" % (self.address, self.typetags)
+
+
+def decode_lazy(msg, offset=0, end=None, strict=False, copy=False, arrays=False, src=None):
+    """Decode address and typetags of the OSC message in ``msg[offset:end]``.
+
+    Returns a ``LazyMessage``, which decodes the arguments on access. See
+    ``decode_message`` for the other arguments.
+
+    """
+    if end is None:
+        end = len(msg)
+
+    if not copy and not isinstance(msg, memoryview):
+        msg = memoryview(msg)
+
+    addr, ofs = intern_oscstr(msg, offset, end)
+
+    if not addr.startswith('/'):
+        raise ValueError("OSC address pattern must start with a slash.")
+
+    if ofs < end and msg[ofs] == 44:
+        tags, ofs = intern_oscstr(msg, ofs, end, 1)
     else:
         errmsg = "Missing/invalid OSC type tag string."
         if strict:
@@ -58,90 +540,238 @@ def parse_message(msg, strict=False):
             log.warning(errmsg + ' Ignoring arguments.')
             tags = ''
 
-    for typetag in tags:
-        size = 0
-
-        if typetag in 'ifd':
-            size = 8 if typetag == 'd' else 4
-            args.append(unpack('>' + typetag, msg[ofs:ofs + size])[0])
-        elif typetag in 'sS':
-            s, ofs = split_oscstr(msg, ofs)
-            args.append(s)
-        elif typetag == 'b':
-            s, ofs = split_oscblob(msg, ofs)
-            args.append(s)
-        elif typetag in 'rm':
-            size = 4
-            args.append(unpack('BBBB', msg[ofs:ofs + size]))
-        elif typetag == 'c':
-            size = 4
-            args.append(chr(unpack('>I', msg[ofs:ofs + size])[0]))
-        elif typetag == 'h':
-            size = 8
-            args.append(unpack('>q', msg[ofs:ofs + size])[0])
-        elif typetag == 't':
-            size = 8
-            args.append(parse_timetag(msg, ofs))
-        elif typetag in 'TFNI':
-            args.append({'T': True, 'F': False, 'I': Impulse}.get(typetag))
+    return LazyMessage(addr, tags, msg, ofs, src, copy, arrays, end)
+
+
+def decode_bundle(bundle, offset=0, end=None, strict=False, copy=False, arrays=False,
+                  lazy=False, src=None):
+    """Decode the OSC bundle in ``bundle[offset:end]`` without slicing it.
+
+    Works like ``parse_bundle``, but contained messages are decoded with
+    ``decode_message``, i.e. blob arguments are returned as ``memoryview``
+    objects referencing ``bundle``, unless ``copy`` is true. If ``lazy`` is
+    true, messages are returned as ``LazyMessage`` objects with the given
+    ``src`` instead.
+
+    """
+    if end is None:
+        end = len(bundle)
+
+    if not copy and not isinstance(bundle, memoryview):
+        bundle = memoryview(bundle)
+
+    if bytes(bundle[offset:offset + 8]) != b'#bundle\0':
+        raise TypeError("Bundle must start with b'#bundle\\0'.")
+
+    timetag = to_time(*unpack_from('>II', bundle, offset + 8))
+    ofs = offset + 16
+
+    while ofs < end:
+        size = unpack_from('>I', bundle, ofs)[0]
+        ofs += 4
+
+        # nested bundles start with '#' (ASCII 35)
+        if bundle[ofs] == 35:
+            for el in decode_bundle(bundle, ofs, ofs + size, strict, copy, arrays, lazy, src):
+                yield el
+        elif lazy:
+            yield timetag, decode_lazy(bundle, ofs, ofs + size, strict, copy, arrays, src)
         else:
-            raise ValueError("Type tag '%s' not supported." % typetag)
+            yield timetag, decode_message(bundle, ofs, ofs + size, strict, copy, arrays)
 
         ofs += size
 
-    return (addr, tags, tuple(args))
-
 
-def parse_bundle(bundle, strict=False):
+def parse_bundle(bundle, strict=False, arrays=False):
     """Parse a binary OSC bundle.
 
     Returns a generator which walks over all contained messages and bundles
     recursively, depth-first. Each item yielded is a (timetag, message) tuple.
 
     """
-    if not bundle.startswith(b'#bundle\0'):
-        raise TypeError("Bundle must start with b'#bundle\\0'.")
+    return decode_bundle(bundle, 0, None, strict, True, arrays)
 
-    ofs = 16
-    timetag = to_time(*unpack('>II', bundle[8:ofs]))
 
-    while True:
-        if ofs >= len(bundle):
-            break
+class BufferPool:
+    """Pool of preallocated receive buffers.
 
-        size = unpack('>I', bundle[ofs:ofs + 4])[0]
-        element = bundle[ofs + 4:ofs + 4 + size]
-        ofs += size + 4
+    ``receive`` reads a datagram into a free buffer from the pool with
+    ``sock.recvfrom_into``, so receiving does not allocate a new ``bytes``
+    object per datagram. Up to ``count`` free buffers of ``size`` bytes are
+    kept. If all buffers are in use, a new one is allocated and counted in
+    ``misses``.
 
-        if element.startswith(b'#bundle'):
-            for el in parse_bundle(element):
-                yield el
-        else:
-            yield timetag, parse_message(element, strict)
+    """
+
+    def __init__(self, count=4, size=MAX_DGRAM_SIZE):
+        self.count = count
+        self.size = size
+        self.misses = 0
+        self.current = None
+        # buffers detached by handlers, which may still be running
+        self._detached = []
+        self._free = [bytearray(size) for _ in range(count)]
+
+    def get(self):
+        """Return a free buffer from the pool."""
+        if self._free:
+            return self._free.pop()
+
+        self.misses += 1
+        return bytearray(self.size)
 
+    def put(self, buf):
+        """Return a buffer to the pool."""
+        if len(self._free) < self.count:
+            self._free.append(buf)
+
+    def detach(self):
+        """Keep the buffer of the datagram, which is currently handled.
+
+        Call this from a handler, which needs the data passed to it after it
+        has returned. Returns the buffer, which the handler must give back with
+        ``put`` once it is done with the data. Raises ``RuntimeError`` if no
+        datagram is currently handled.
+
+        """
+        buf = self.current
+
+        if buf is None:
+            raise RuntimeError("BufferPool.detach() called outside of a handler.")
+
+        self._detached.append(buf)
+        return buf
+
+    def release(self, buf):
+        """Return the buffer of a handled datagram to the pool, unless it was detached."""
+        if self.current is buf:
+            self.current = None
+
+        for i, detached in enumerate(self._detached):
+            if detached is buf:
+                del self._detached[i]
+                return
+
+        self.put(buf)
+
+    def receive(self, sock, handler):
+        """Receive a datagram from sock into a buffer from the pool and handle it.
+
+        Calls ``handler(data, addr)`` with a ``memoryview`` of the received
+        data, which is only valid until the handler returns, unless it calls
+        ``detach``. Otherwise the buffer goes back into the pool afterwards.
+
+        """
+        buf = self.get()
+
+        try:
+            size, addr = sock.recvfrom_into(buf)
+        except Exception:
+            self.put(buf)
+            raise
+
+        self.current = buf
+
+        try:
+            handler(memoryview(buf)[:size], addr)
+        finally:
+            self.release(buf)
+
+
+def _count_message(stats, oscaddr, src):
+    # Count message in stats. Returns True if it was a stats request, which
+    # has been answered and must not be dispatched.
+    stats.message(oscaddr)
+
+    if oscaddr != stats.address:
+        return False
 
-def handle_osc(data, src, dispatch=None, strict=False):
     try:
-        head, _ = split_oscstr(data, 0)
+        stats.reply(src)
+    except Exception as exc:
+        stats.reply_errors += 1
+        log.error("Could not send statistics to %r: %s", src, exc)
+
+    return True
+
+
+def _decode_packet(data, src, strict, copy, arrays, lazy, stats):
+    # Return iterable of (timetag, message) tuples with src added to each
+    # message, or None if data is not an OSC packet.
+    if data[0] == 47:  # '/'
+        if lazy:
+            return ((-1, decode_lazy(data, 0, None, strict, copy, arrays, src)),)
+
+        return ((-1, decode_message(data, 0, None, strict, copy, arrays) + (src,)),)
+    elif bytes(data[:8]) == b'#bundle\0':
+        if stats is not None:
+            stats.bundles += 1
+
+        messages = decode_bundle(data, 0, None, strict, copy, arrays, lazy, src)
+
+        if lazy:
+            return messages
+
+        return ((timetag, msg + (src,)) for timetag, msg in messages)
 
-        if head.startswith('/'):
-            messages = [(-1, parse_message(data, strict))]
-        elif head == '#bundle':
-            messages = parse_bundle(data, strict)
+
+def _log_message(msg, lazy):
+    log.debug("OSC address: %s" % msg[0])
+    log.debug("OSC type tags: %r" % msg[1])
+
+    if not lazy:
+        log.debug("OSC arguments: %r" % (msg[2],))
+
+
+def _dispatch(dispatch, timetag, msg, stats):
+    try:
+        if stats is not None:
+            stats.call(dispatch, timetag, msg)
+        else:
+            dispatch(timetag, msg)
     except Exception as exc:
-        if __debug__:
-            log.debug("Could not parse message from %r: %s", src, exc)
-            log.debug("Data: %r", data)
-        return
+        log.error("Exception in OSC handler: %s", exc)
+
+
+def handle_osc(data, src, dispatch=None, strict=False, copy=True, stats=None, arrays=False,
+               lazy=False):
+    """Parse OSC packet and pass each contained message to dispatch.
+
+    dispatch is called with the message timetag (-1 for messages not in a
+    bundle) and an ``(address, typetags, args, src)`` tuple, or, if ``lazy``
+    is true, a ``LazyMessage``, which decodes the arguments only when they are
+    accessed. Parse errors and exceptions raised by dispatch are logged. If a
+    ``uosc.stats.ServerStats`` instance is given as ``stats``, they are counted
+    there as well. See ``decode_message`` for the ``copy`` and ``arrays``
+    options.
+
+    """
+    if stats is not None:
+        stats.datagram(len(data))
 
     try:
-        for timetag, (oscaddr, tags, args) in messages:
-            if __debug__:
-                log.debug("OSC address: %s" % oscaddr)
-                log.debug("OSC type tags: %r" % tags)
-                log.debug("OSC arguments: %r" % (args,))
+        messages = _decode_packet(data, src, strict, copy, arrays, lazy, stats)
+
+        if messages is None:
+            if stats is not None:
+                stats.parse_error(REASON_UNKNOWN)
+
+            if __debug__: log.debug("Not an OSC packet from %r: %r", src, data)
+            return
+
+        for timetag, msg in messages:
+            oscaddr = msg[0]
+            if __debug__: _log_message(msg, lazy)
+
+            if stats is not None and _count_message(stats, oscaddr, src):
+                continue
 
             if dispatch:
-                dispatch(timetag, (oscaddr, tags, args, src))
+                _dispatch(dispatch, timetag, msg, stats)
     except Exception as exc:
-        log.error("Exception in OSC handler: %s", exc)
+        if stats is not None:
+            stats.parse_error(type(exc).__name__)
+
+        if __debug__:
+            log.debug("Could not parse message from %r: %s", src, exc)
+            log.debug("Data: %r", data)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/stats.py
+#
+"""Runtime statistics for the OSC server.
+
+Pass a ``ServerStats`` instance to ``uosc.server.handle_osc`` to count
+received datagrams, bytes, bundles, messages per address, parse failures by
+reason and exceptions raised by the dispatch handler, and to record a
+histogram of handler run times:
+
+    from uosc.server import handle_osc
+    from uosc.stats import ServerStats
+
+    stats = ServerStats()
+    handle_osc(data, src, dispatch=dispatch, stats=stats)
+    print(stats.snapshot())
+
+If ``address`` is set, e.g. to ``STATS_ADDRESS`` (``/uosc/stats``), a
+message sent to it is not dispatched, but answered with a bundle containing
+the current statistics, which is sent to the address the message came from.
+Only enable this on trusted networks, since anyone who can reach the server
+can request the statistics and the reply is much larger than the request.
+
+"""
+
+try:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+except ImportError:
+    from time import ticks_diff, ticks_us
+
+from uosc.common import Bundle, TimetagNow
+
+
+STATS_ADDRESS = '/uosc/stats'
+# Number of buckets of the handler latency histogram. Bucket n counts handler
+# calls taking less than 2**n µs (and at least 2**(n-1) µs, for n > 0).
+HISTOGRAM_SIZE = 24
+# Parse failure reason for data, which is neither an OSC message nor a bundle
+REASON_UNKNOWN = 'unknown_packet'
+# Key under which messages for addresses beyond max_addresses are counted
+OTHER_ADDRESSES = '<other>'
+
+
+def _bucket(us):
+    bucket = 0
+
+    while us > 0:
+        us >>= 1
+        bucket += 1
+
+    return min(bucket, HISTOGRAM_SIZE - 1)
+
+
+class ServerStats:
+    """Counters for the server path.
+
+    Messages are counted per address for up to ``max_addresses`` distinct
+    addresses, further addresses are counted under ``'<other>'``. Messages
+    to ``address``, if it is not None, are answered with the statistics,
+    which are sent with ``sock`` or with the shared UDP socket of
+    ``uosc.client``, if ``sock`` is None.
+
+    """
+
+    def __init__(self, max_addresses=256, address=None, sock=None):
+        self.max_addresses = max_addresses
+        self.address = address
+        self.sock = sock
+        self.reset()
+
+    def reset(self):
+        self.datagrams = 0
+        self.bytes = 0
+        self.bundles = 0
+        self.messages = 0
+        self.handler_errors = 0
+        self.reply_errors = 0
+        self.addresses = {}
+        self.parse_errors = {}
+        self.latency = [0] * HISTOGRAM_SIZE
+
+    def datagram(self, size):
+        self.datagrams += 1
+        self.bytes += size
+
+    def message(self, address):
+        self.messages += 1
+        counts = self.addresses
+
+        if address not in counts and len(counts) >= self.max_addresses:
+            address = OTHER_ADDRESSES
+
+        counts[address] = counts.get(address, 0) + 1
+
+    def parse_error(self, reason):
+        self.parse_errors[reason] = self.parse_errors.get(reason, 0) + 1
+
+    def call(self, dispatch, timetag, msg):
+        """Call dispatch handler, counting exceptions and recording its run time."""
+        start = ticks_us()
+
+        try:
+            dispatch(timetag, msg)
+        except Exception:
+            self.handler_errors += 1
+            raise
+        finally:
+            self.latency[_bucket(ticks_diff(ticks_us(), start))] += 1
+
+    def snapshot(self):
+        """Return a dict with a copy of all counters."""
+        return {
+            'datagrams': self.datagrams,
+            'bytes': self.bytes,
+            'bundles': self.bundles,
+            'messages': self.messages,
+            'handler_errors': self.handler_errors,
+            'reply_errors': self.reply_errors,
+            'addresses': dict(self.addresses),
+            'parse_errors': dict(self.parse_errors),
+            'latency': list(self.latency),
+        }
+
+    def to_bundle(self, max_addresses=32):
+        """Return statistics as an OSC bundle.
+
+        The bundle contains the messages ``/uosc/stats/counters``,
+        ``/uosc/stats/parse_errors`` and ``/uosc/stats/addresses`` with
+        alternating name and count arguments, and ``/uosc/stats/latency`` with
+        the histogram buckets up to the last non-empty one. Only the
+        ``max_addresses`` addresses with the most messages are included.
+
+        """
+        prefix = STATS_ADDRESS
+        counters = []
+
+        for name in ('datagrams', 'bytes', 'bundles', 'messages', 'handler_errors',
+                     'reply_errors'):
+            counters.extend((name, ('h', getattr(self, name))))
+
+        errors = []
+
+        for reason, count in self.parse_errors.items():
+            errors.extend((reason, ('h', count)))
+
+        addresses = []
+        top = sorted(self.addresses.items(), key=lambda item: item[1], reverse=True)
+
+        for address, count in top[:max_addresses]:
+            addresses.extend((address, ('h', count)))
+
+        latency = list(self.latency)
+
+        while latency and not latency[-1]:
+            latency.pop()
+
+        return Bundle(
+            TimetagNow,
+            (prefix + '/counters',) + tuple(counters),
+            (prefix + '/parse_errors',) + tuple(errors),
+            (prefix + '/addresses',) + tuple(addresses),
+            (prefix + '/latency',) + tuple(('h', n) for n in latency))
+
+    def reply(self, dest):
+        """Send statistics bundle to dest."""
+        from uosc.client import get_socket, pack_bundle, resolve
+
+        data = pack_bundle(self.to_bundle())
+
+        if self.sock is not None:
+            self.sock.sendto(data, dest)
+        else:
+            # dest may be a packed address on MicroPython
+            family, addr = resolve(dest)
+            get_socket(family).sendto(data, addr)
@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+#
+#  uosc/tcp.py
+#
+"""OSC over TCP with OSC 1.0 length-prefix or OSC 1.1 SLIP framing.
+
+Blocking client and server:
+
+    from uosc.tcp import FRAMING_SLIP, TCPClient, run_tcp_server
+
+    with TCPClient('192.168.0.42', 9001, framing=FRAMING_SLIP) as osc:
+        osc.send('/pi', 3.14159)
+
+    run_tcp_server('0.0.0.0', 9001, framing=FRAMING_SLIP)
+
+asyncio client and server:
+
+    from uosc.tcp import AsyncTCPClient, serve_tcp
+
+    async with AsyncTCPClient('192.168.0.42', 9001) as osc:
+        await osc.send('/pi', 3.14159)
+
+    await serve_tcp('0.0.0.0', 9001, dispatch=dispatcher)
+
+Received packets are passed to the handler (``uosc.server.handle_osc`` by
+default) as ``memoryview`` objects, which are only valid until the handler
+returns.
+
+"""
+
+try:
+    import socket
+except ImportError:
+    import usocket as socket
+
+try:
+    import select
+except ImportError:
+    import uselect as select
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+try:
+    from ustruct import pack, unpack_from
+except ImportError:
+    from struct import pack, unpack_from
+
+try:
+    import logging
+except ImportError:
+    import uosc.compat.fakelogging as logging
+
+from uosc.client import encode
+from uosc.server import handle_osc
+
+
+log = logging.getLogger("uosc.tcp")
+FRAMING_LENGTH = 'length'  # OSC 1.0: packets are prefixed with their size as int32
+FRAMING_SLIP = 'slip'  # OSC 1.1: packets are SLIP-encoded (RFC 1055) with double END
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+SLIP_ESC_END = 0xDC
+SLIP_ESC_ESC = 0xDD
+# uasyncio has no protocols, serve_tcp falls back to streams there
+_HAVE_BUFFERED_PROTOCOL = hasattr(asyncio, 'BufferedProtocol')
+
+
+if hasattr(bytearray, 'find'):
+    def _find(buf, byte, start, end):
+        return buf.find(byte, start, end)
+else:
+    def _find(buf, byte, start, end):
+        byte = byte[0]
+        for i in range(start, end):
+            if buf[i] == byte:
+                return i
+        return -1
+
+
+def _check_framing(framing):
+    if framing not in (FRAMING_LENGTH, FRAMING_SLIP):
+        raise ValueError("Unknown framing: %r" % framing)
+
+
+def slip_encode(data):
+    """Return data as a SLIP-encoded packet with an END byte at both ends."""
+    data = bytes(data).replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc')
+    return b'\xc0' + data + b'\xc0'
+
+
+def frame(data, framing=FRAMING_SLIP):
+    """Return an OSC packet framed for sending over a stream."""
+    if framing == FRAMING_SLIP:
+        return slip_encode(data)
+    elif framing == FRAMING_LENGTH:
+        return pack('>I', len(data)) + data
+
+    raise ValueError("Unknown framing: %r" % framing)
+
+
+class StreamDecoder:
+    """Incremental decoder, which splits a stream of framed OSC packets.
+
+    Received data is written directly into the decoder's internal buffer:
+
+        size = sock.recv_into(decoder.buffer())
+        decoder.commit(size)
+
+        for packet in decoder.packets():
+            handle_osc(packet, addr)
+
+    or passed to ``feed``. ``packets`` yields complete packets as
+    ``memoryview`` objects of the internal buffer, which are only valid until
+    the next call to ``buffer`` or ``feed``.
+
+    Scanning continues where it stopped at the previous call, so no byte is
+    scanned twice, and SLIP escape sequences are decoded in place. The buffer
+    is reused for all packets. Data of an incomplete packet is only moved to
+    the start of the buffer when there is no free space left, and the buffer
+    grows up to ``max_size`` bytes if a single packet does not fit.
+
+    """
+
+    def __init__(self, framing=FRAMING_SLIP, size=4096, max_size=65536):
+        _check_framing(framing)
+        self.framing = framing
+        self.max_size = max_size
+        self._buf = bytearray(size)
+        # start of the first incomplete packet
+        self._start = 0
+        # end of received data
+        self._end = 0
+        # SLIP: end of scanned data and of decoded data of current packet
+        self._scan = 0
+        self._out = 0
+        self._esc = False
+        # length framing: number of bytes needed for the current packet
+        self._need = 0
+
+    def _make_room(self):
+        buf = self._buf
+        start = self._start
+        pending = self._end - start
+        needed = max(pending + 1, self._need)
+
+        if needed > len(buf):
+            if needed > self.max_size:
+                raise ValueError("Packet exceeds maximum size of %i bytes." % self.max_size)
+
+            self._buf = bytearray(min(self.max_size, max(len(buf) * 2, needed)))
+            self._buf[:pending] = memoryview(buf)[start:self._end]
+        elif start:
+            # move data of incomplete packet to start of buffer
+            mv = memoryview(buf)
+            mv[:pending] = mv[start:self._end]
+        else:
+            return
+
+        self._start = 0
+        self._end = pending
+        self._scan -= start
+        self._out -= start
+
+    def buffer(self):
+        """Return writable memoryview of the free space in the internal buffer."""
+        if self._end == len(self._buf) or self._need > len(self._buf) or (
+                self._start and self._start == self._end):
+            self._make_room()
+
+        return memoryview(self._buf)[self._end:]
+
+    def commit(self, size):
+        """Mark size bytes written to the view returned by ``buffer`` as received."""
+        self._end += size
+
+    def feed(self, data):
+        """Copy received data into the internal buffer."""
+        size = len(data)
+        ofs = 0
+
+        while ofs < size:
+            view = self.buffer()
+            n = min(len(view), size - ofs)
+            view[:n] = data[ofs:ofs + n]
+            self.commit(n)
+            ofs += n
+
+    def packets(self):
+        """Return an iterator over all complete packets received so far."""
+        if self.framing == FRAMING_SLIP:
+            return self._slip_packets()
+        else:
+            return self._length_packets()
+
+    def _length_packets(self):
+        buf = self._buf
+        mv = memoryview(buf)
+
+        while self._end - self._start >= 4:
+            start = self._start
+            size = unpack_from('>I', buf, start)[0]
+
+            if size + 4 > self.max_size:
+                raise ValueError("Packet exceeds maximum size of %i bytes." % self.max_size)
+
+            if start + 4 + size > self._end:
+                self._need = size + 4
+                return
+
+            self._start = start + 4 + size
+            self._need = 0
+            yield mv[start + 4:self._start]
+
+    def _slip_packets(self):
+        buf = self._buf
+        mv = memoryview(buf)
+        i = self._scan
+        out = self._out
+        end = self._end
+
+        while i < end:
+            if self._esc:
+                c = buf[i]
+                buf[out] = (SLIP_END if c == SLIP_ESC_END else
+                            SLIP_ESC if c == SLIP_ESC_ESC else c)
+                self._esc = False
+                out += 1
+                i += 1
+                continue
+
+            pos = _find(buf, b'\xc0', i, end)
+            stop = end if pos < 0 else pos
+
+            # copy data up to next END byte towards start, decoding escapes
+            while i < stop:
+                esc = _find(buf, b'\xdb', i, stop)
+                seg = stop if esc < 0 else esc
+
+                if out != i:
+                    mv[out:out + seg - i] = mv[i:seg]
+
+                out += seg - i
+                i = seg
+
+                if esc >= 0:
+                    i += 1
+
+                    if i < stop:
+                        c = buf[i]
+                        buf[out] = (SLIP_END if c == SLIP_ESC_END else
+                                    SLIP_ESC if c == SLIP_ESC_ESC else c)
+                        out += 1
+                        i += 1
+                    else:
+                        self._esc = True
+
+            if pos < 0:
+                break
+
+            # END byte found
+            start = self._start
+            self._esc = False
+            i = pos + 1
+            self._start = self._scan = self._out = i
+
+            if out > start:
+                yield mv[start:out]
+
+            out = i
+
+        self._scan = i
+        self._out = out
+
+
+class TCPClient:
+    """Blocking OSC TCP client."""
+
+    def __init__(self, host, port=None, framing=FRAMING_SLIP):
+        if port is None:
+            if isinstance(host, (list, tuple)):
+                host, port = host
+            else:
+                port = host
+                host = '127.0.0.1'
+
+        _check_framing(framing)
+        self.dest = socket.getaddrinfo(host, port)[0][-1]
+        self.framing = framing
+        self.sock = None
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.connect(self.dest)
+
+        if hasattr(socket, 'TCP_NODELAY'):
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, msg, *args):
+        if not self.sock:
+            self.connect()
+
+        self.sock.sendall(frame(encode(msg, *args), self.framing))
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _call_handler(handler, packet, caddr, params):
+    # an error in the handler must not close the connection or stop the server
+    try:
+        handler(packet, caddr, **params)
+    except Exception as exc:
+        log.error("Exception in request handler: %s", exc)
+
+
+def run_tcp_server(saddr, port, handler=handle_osc, framing=FRAMING_SLIP, **params):
+    """Accept TCP connections and pass each received OSC packet to handler.
+
+    The handler is called with the packet data, the client address and any
+    extra keyword arguments, e.g. ``dispatch`` for ``handle_osc``.
+
+    """
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(socket.getaddrinfo(saddr, port)[0][-1])
+    srv.listen(5)
+    log.info("Listening for OSC connections on %s:%i.", saddr, port)
+
+    poll = select.poll()
+    poll.register(srv, select.POLLIN)
+
+    # CPython's poll returns file descriptors, MicroPython's the socket objects
+    def _key(sock):
+        return sock if isinstance(sock, int) else sock.fileno()
+
+    srv_key = _key(srv)
+    # map of file descriptor -> (socket, client address, decoder)
+    conns = {}
+
+    try:
+        while True:
+            for obj, event in poll.poll():
+                key = _key(obj)
+
+                if key == srv_key:
+                    conn, caddr = srv.accept()
+                    conns[_key(conn)] = (conn, caddr, StreamDecoder(framing))
+                    poll.register(conn, select.POLLIN)
+                    if __debug__: log.debug("Connection from %r", caddr)
+                    continue
+
+                conn, caddr, decoder = conns[key]
+                recv_into = getattr(conn, 'recv_into', None) or conn.readinto
+
+                try:
+                    size = 0 if event & (select.POLLERR | select.POLLHUP) else recv_into(
+                        decoder.buffer())
+
+                    if size:
+                        decoder.commit(size)
+
+                        for packet in decoder.packets():
+                            _call_handler(handler, packet, caddr, params)
+                except (OSError, ValueError) as exc:
+                    # only drop the offending connection
+                    log.warning("Closing connection from %r: %s", caddr, exc)
+                    size = 0
+
+                if not size:
+                    if __debug__: log.debug("Connection from %r closed.", caddr)
+                    poll.unregister(conn)
+                    del conns[key]
+                    conn.close()
+    finally:
+        for conn, _, _ in conns.values():
+            conn.close()
+
+        srv.close()
+        log.info("Bye!")
+
+
+class AsyncTCPClient:
+    """OSC TCP client for asyncio."""
+
+    def __init__(self, host, port=None, framing=FRAMING_SLIP):
+        if port is None:
+            if isinstance(host, (list, tuple)):
+                host, port = host
+            else:
+                port = host
+                host = '127.0.0.1'
+
+        _check_framing(framing)
+        self.host = host
+        self.port = port
+        self.framing = framing
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def send(self, msg, *args):
+        if self.writer is None:
+            await self.connect()
+
+        self.writer.write(frame(encode(msg, *args), self.framing))
+        await self.writer.drain()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.reader = self.writer = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class _StreamProtocol(getattr(asyncio, 'BufferedProtocol', object)):
+    # The transport receives directly into the decoder's buffer.
+    def __init__(self, handler, framing, params):
+        self.handler = handler
+        self.params = params
+        self.decoder = StreamDecoder(framing)
+        self.transport = self.caddr = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.caddr = transport.get_extra_info('peername')
+        if __debug__: log.debug("Connection from %r", self.caddr)
+
+    def get_buffer(self, sizehint):
+        if self.decoder is not None:
+            try:
+                return self.decoder.buffer()
+            except ValueError as exc:
+                self._error(exc)
+
+        # discard data received until the connection is closed
+        return bytearray(256)
+
+    def buffer_updated(self, nbytes):
+        if self.decoder is None:
+            return
+
+        self.decoder.commit(nbytes)
+
+        try:
+            for packet in self.decoder.packets():
+                _call_handler(self.handler, packet, self.caddr, self.params)
+        except ValueError as exc:
+            self._error(exc)
+
+    def _error(self, exc):
+        log.warning("Closing connection from %r: %s", self.caddr, exc)
+        self.decoder = None
+        self.transport.abort()
+
+    def connection_lost(self, exc):
+        if __debug__: log.debug("Connection from %r closed.", self.caddr)
+
+
+async def serve_tcp(host, port, handler=handle_osc, framing=FRAMING_SLIP, **params):
+    """Serve OSC over TCP with asyncio until cancelled.
+
+    The handler is called like with ``run_tcp_server``. With CPython's
+    asyncio, data is received directly into the decoder's buffer.
+
+    """
+    _check_framing(framing)
+
+    async def handle_connection(reader, writer):
+        caddr = writer.get_extra_info('peername')
+        decoder = StreamDecoder(framing)
+        if __debug__: log.debug("Connection from %r", caddr)
+
+        try:
+            while True:
+                data = await reader.read(4096)
+
+                if not data:
+                    break
+
+                decoder.feed(data)
+
+                for packet in decoder.packets():
+                    _call_handler(handler, packet, caddr, params)
+        except ValueError as exc:
+            log.warning("Closing connection from %r: %s", caddr, exc)
+        finally:
+            if __debug__: log.debug("Connection from %r closed.", caddr)
+            writer.close()
+
+    if _HAVE_BUFFERED_PROTOCOL:
+        server = await asyncio.get_running_loop().create_server(
+            lambda: _StreamProtocol(handler, framing, params), host, port)
+    else:
+        server = await asyncio.start_server(handle_connection, host, port)
+
+    log.info("Listening for OSC connections on %s:%i.", host, port)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        log.info("Bye!")
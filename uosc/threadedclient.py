@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 """OSC client running in a separate thread.
 
-Communicates with the main thread via a queue. Provides the same API as the
-non-threaded client, with a few threading-related extensions:
+Communicates with the main thread via a bounded queue. Provides the same API
+as the non-threaded client, with a few threading-related extensions:
 
-    from uosc.threadedclient import ThreadedClient
+    from uosc.threadedclient import OVERFLOW_DROP_OLDEST, ThreadedClient
 
     # start=True starts the thread immediately
     osc = ThreadedClient('192.168.0.42', 9001, start=True)
@@ -15,6 +15,13 @@ non-threaded client, with a few threading-related extensions:
     # Stops and joins the thread and closes the client socket
     osc.close()
 
+    # discard the oldest queued message instead of blocking when the queue is full
+    osc = ThreadedClient('192.168.0.42', 9001, maxsize=256, overflow=OVERFLOW_DROP_OLDEST)
+
+The thread takes all messages waiting in the queue at once and sends them
+as separate datagrams in one burst, or, if ``bundle`` is true, packed into as
+few bundles as possible. Only enable bundling if the receiver handles bundles.
+
 """
 
 import logging
@@ -29,35 +36,138 @@ from uosc.client import Client
 
 
 log = logging.getLogger(__name__)
+# Policies for send() when the queue is full
+OVERFLOW_BLOCK = 'block'  # wait for free space for up to timeout seconds
+OVERFLOW_DROP_NEWEST = 'drop-newest'  # discard the message being sent
+OVERFLOW_DROP_OLDEST = 'drop-oldest'  # discard the oldest queued message
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST)
 
 
 class ThreadedClient(threading.Thread):
-    def __init__(self, host, port=None, start=False, timeout=3.0):
+    def __init__(self, host, port=None, start=False, timeout=3.0, maxsize=1024,
+                 overflow=OVERFLOW_BLOCK, bundle=False):
         super(ThreadedClient, self).__init__()
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Invalid overflow policy: %r" % overflow)
+
         self.host = host
         self.port = port
         self.timeout = timeout
-        self._q = queue.Queue()
+        self.overflow = overflow
+        self.bundle = bundle
+        self._q = queue.Queue(maxsize)
+        self.reset_stats()
 
         if start:
             self.start()
 
+    def reset_stats(self):
+        self.dropped = 0
+        self.batches = 0
+        self.messages = 0
+        self.max_batch = 0
+
+    def stats(self):
+        """Return dict with queue depth, drop and send batch counters.
+
+        ``depth`` is the current number of queued messages, ``max_batch`` the
+        largest and ``mean_batch`` the average number of messages taken from
+        the queue and sent at once.
+
+        """
+        return {
+            'depth': self._q.qsize(),
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'messages': self.messages,
+            'max_batch': self.max_batch,
+            'mean_batch': self.messages / self.batches if self.batches else 0.0,
+        }
+
     def run(self, *args, **kw):
-        self.client = Client((self.host, self.port))
+        self.client = Client((self.host, self.port), buffered=self.bundle)
+        q = self._q
+        running = True
 
-        while True:
-            msg = self._q.get()
-            if msg is None:
-                break
+        while running:
+            batch = [q.get()]
 
-            addr, msg = msg
-            log.debug("Sending OSC msg %s, %r", addr, msg)
-            self.client.send(addr, *msg)
+            # drain everything else waiting in the queue
+            while True:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+
+            if batch:
+                self._send_batch(batch)
 
         self.client.close()
 
+    def _send_batch(self, batch):
+        client = self.client
+        size = len(batch)
+        log.debug("Sending batch of %i OSC messages", size)
+
+        for addr, msg in batch:
+            try:
+                client.send(addr, *msg)
+            except Exception as exc:
+                log.error("Could not send OSC msg %s, %r: %s", addr, msg, exc)
+
+        try:
+            client.flush()
+        except Exception as exc:
+            log.error("Could not send OSC bundle: %s", exc)
+
+        self.batches += 1
+        self.messages += size
+
+        if size > self.max_batch:
+            self.max_batch = size
+
     def send(self, addr, *args, **kw):
-        self._q.put((addr, args), timeout=kw.get('timeout', self.timeout))
+        """Queue OSC message for sending.
+
+        Returns False if the message or another queued message was dropped,
+        because the queue was full, True otherwise.
+
+        """
+        item = (addr, args)
+
+        if self.overflow == OVERFLOW_BLOCK:
+            self._q.put(item, timeout=kw.get('timeout', self.timeout))
+            return True
+
+        try:
+            self._q.put_nowait(item)
+            return True
+        except queue.Full:
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                self.dropped += 1
+                return False
+
+        dropped = False
+
+        while True:
+            try:
+                self._q.get_nowait()
+                self.dropped += 1
+                dropped = True
+            except queue.Empty:
+                pass
+
+            try:
+                self._q.put_nowait(item)
+                return not dropped
+            except queue.Full:
+                # another thread filled the queue again
+                pass
 
     def close(self, **kw):
         timeout = kw.get('timeout', self.timeout)
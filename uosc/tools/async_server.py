@@ -12,6 +12,9 @@ With CPython (or PyPy etc.)
 
     PYTHONPATH="$(pwd)" python -m uosc.tools.async_server.py -v
 
+Under CPython, the event-driven ``DatagramServer`` is used, unless the
+``--poll`` option is given.
+
 Then send OSC messages to localhost port 9001, for example with oscsend::
 
     oscsend localhost 9001 /foo ifs $i 3.141 "hello world!"
@@ -33,6 +36,7 @@ try:
 except ImportError:
     import uasyncio as asyncio
 
+from uosc.common import MAX_DGRAM_SIZE
 from uosc.server import handle_osc
 
 if __debug__:
@@ -47,14 +51,28 @@ except ImportError:
 log = logging.getLogger("uosc.async_server")
 DEFAULT_ADDRESS = '0.0.0.0'
 DEFAULT_PORT = 9001
-MAX_DGRAM_SIZE = 1472
+# uasyncio has no datagram transports, so DatagramServer only works on CPython
+HAVE_DATAGRAM_PROTOCOL = hasattr(asyncio, 'DatagramProtocol')
 
 
 class UDPServer:
-    def __init__(self, poll_timeout=1, max_packet_size=MAX_DGRAM_SIZE, poll_interval=0.0):
+    """Polling UDP server for asyncio and uasyncio.
+
+    If a ``uosc.server.BufferPool`` is given as ``pool``, datagrams are
+    received into its buffers with ``recvfrom_into`` and the request handler
+    coroutine gets a ``memoryview`` of the data. The buffer goes back into the
+    pool when the handler coroutine has finished, unless the handler called
+    ``pool.detach()``. Since handlers run concurrently, ``detach`` must be
+    called before the handler's first ``await``.
+
+    """
+
+    def __init__(self, poll_timeout=1, max_packet_size=MAX_DGRAM_SIZE, poll_interval=0.0,
+                 pool=None):
         self.poll_timeout = poll_timeout
         self.max_packet_size = max_packet_size
         self.poll_interval = poll_interval
+        self.pool = pool
 
     def close(self):
         self.sock.close()
@@ -62,8 +80,8 @@ class UDPServer:
     async def serve(self, host, port, cb, **params):
         # bind instance attributes to local vars
         interval = self.poll_interval
-        maxsize = self.max_packet_size
         timeout = self.poll_timeout
+        recv = self._recv if self.pool is None else self._recv_pooled
 
         if __debug__: log.debug("Starting UDP server @ (%s, %s)", host, port)
         ai = socket.getaddrinfo(host, port)[0]  # blocking!
@@ -84,10 +102,7 @@ class UDPServer:
                         break
                     elif res[1] & select.POLLIN:
                         if __debug__: log.debug("UDPServer.serve: Before recvfrom")
-                        buf, addr = s.recvfrom(maxsize)
-                        if __debug__: log.debug("RECV %i bytes from %s:%s", len(buf),
-                                                *get_hostport(addr))
-                        asyncio.create_task(cb(res[0], buf, addr, **params))
+                        asyncio.create_task(recv(res[0], cb, params))
 
                 await asyncio.sleep(interval)
             except asyncio.CancelledError:
@@ -98,6 +113,96 @@ class UDPServer:
         s.close()
         log.info("Bye!")
 
+    def _recv(self, sock, cb, params):
+        data, addr = self.sock.recvfrom(self.max_packet_size)
+        if __debug__: log.debug("RECV %i bytes from %s:%s", len(data), *get_hostport(addr))
+        return cb(sock, data, addr, **params)
+
+    def _recv_pooled(self, sock, cb, params):
+        buf = self.pool.get()
+        size, addr = self.sock.recvfrom_into(buf)
+        if __debug__: log.debug("RECV %i bytes from %s:%s", size, *get_hostport(addr))
+        return self._handle_pooled(cb(sock, memoryview(buf)[:size], addr, **params), buf)
+
+    async def _handle_pooled(self, coro, buf):
+        pool = self.pool
+        # the handler runs up to its first await right away
+        pool.current = buf
+
+        try:
+            await coro
+        finally:
+            pool.release(buf)
+
+
+class _ServerProtocol(getattr(asyncio, 'DatagramProtocol', object)):
+    def __init__(self, cb, params):
+        self.cb = cb
+        self.params = params
+        self.is_coro = asyncio.iscoroutinefunction(cb)
+        self.tasks = set()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if __debug__: log.debug("RECV %i bytes from %s:%s", len(data), *get_hostport(addr))
+
+        if self.is_coro:
+            # keep a reference to the task until it is done
+            task = asyncio.ensure_future(self.cb(self.transport, data, addr, **self.params))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        else:
+            try:
+                self.cb(self.transport, data, addr, **self.params)
+            except Exception as exc:
+                log.error("Exception in request handler: %s", exc)
+
+    def error_received(self, exc):
+        if __debug__: log.debug("DatagramServer: socket error: %s", exc)
+
+
+class DatagramServer:
+    """Event-driven UDP server based on asyncio datagram transports (CPython only).
+
+    Unlike ``UDPServer``, this does not poll the socket, but is woken up by
+    the event loop when a datagram arrives. The request handler is called
+    inline with the datagram transport as its first argument, unless it is
+    a coroutine function, in which case a task is created for each request.
+
+    Only usable if ``HAVE_DATAGRAM_PROTOCOL`` is true.
+
+    """
+
+    def __init__(self):
+        self.transport = None
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    async def serve(self, host, port, cb, **params):
+        if __debug__: log.debug("Starting UDP server @ (%s, %s)", host, port)
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ServerProtocol(cb, params), local_addr=(host, port))
+
+        try:
+            # run until cancelled
+            await loop.create_future()
+        except asyncio.CancelledError:
+            if __debug__: log.debug("DatagramServer.serve task cancelled.")
+        finally:
+            self.close()
+            log.info("Bye!")
+
+
+def handle_request(sock, data, caddr, **params):
+    handle_osc(data, caddr, **params)
+
 
 async def serve_request(sock, data, caddr, **params):
     if __debug__: log.debug("Client request handler coroutine called.")
@@ -131,14 +236,20 @@ def main():
     logging.basicConfig(
         level=logging.DEBUG if debug else logging.INFO)
 
-    server = UDPServer(poll_timeout=50)
+    if '--poll' in sys.argv[1:] or not HAVE_DATAGRAM_PROTOCOL:
+        server = UDPServer(poll_timeout=50)
+        handler = serve_request
+    else:
+        server = DatagramServer()
+        handler = handle_request
+
     counter = Counter(debug=debug)
 
     if __debug__: log.debug("Starting asyncio event loop")
     start = time.time()
 
     try:
-        asyncio.run(server.serve(DEFAULT_ADDRESS, DEFAULT_PORT, serve_request, dispatch=counter))
+        asyncio.run(server.serve(DEFAULT_ADDRESS, DEFAULT_PORT, handler, dispatch=counter))
     except KeyboardInterrupt:
         pass
     finally:
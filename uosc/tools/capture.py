@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Record OSC UDP datagrams to a capture file (CPython).
+
+Received datagrams are appended to the capture file with their receive time
+and source address and are also handled like by ``minimal_server``. Replay a
+capture with ``uosc.tools.replay``.
+
+Example:
+
+    PYTHONPATH="$(pwd)" python -m uosc.tools.capture -p 9001 traffic.cap
+
+"""
+
+import logging
+
+from uosc.capture import CaptureWriter
+from uosc.server import handle_osc
+from uosc.tools.minimal_server import DEFAULT_ADDRESS, DEFAULT_PORT, run_server
+
+
+log = logging.getLogger("uosc.capture")
+
+
+def main(args=None):
+    import argparse
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-v', '--verbose', action="store_true",
+                    help="Enable debug logging")
+    ap.add_argument('-a', '--address', default=DEFAULT_ADDRESS,
+                    help="OSC server address (default: %s)" % DEFAULT_ADDRESS)
+    ap.add_argument('-p', '--port', type=int, default=DEFAULT_PORT,
+                    help="OSC server port (default: %s)" % DEFAULT_PORT)
+    ap.add_argument('-n', '--no-handle', action="store_true",
+                    help="Only record datagrams, do not parse them")
+    ap.add_argument('output', help="Capture file (appended to, if it exists)")
+
+    args = ap.parse_args(args)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    with CaptureWriter(args.output) as writer:
+        start = writer.count
+        handler = writer.wrap((lambda data, caddr: None) if args.no_handle else handle_osc)
+
+        try:
+            run_server(args.address, int(args.port), handler=handler)
+        except KeyboardInterrupt:
+            pass
+
+        log.info("Recorded %i datagrams to '%s'.", writer.count - start, args.output)
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main() or 0)
@@ -14,28 +14,57 @@ except ImportError:
 if __debug__:
     from uosc.compat.socketutil import get_hostport
 
+from uosc.common import MAX_DGRAM_SIZE
 from uosc.server import handle_osc
 
 
 log = logging.getLogger("uosc.minimal_server")
 DEFAULT_ADDRESS = '0.0.0.0'
 DEFAULT_PORT = 9001
-MAX_DGRAM_SIZE = 1472
+# MicroPython raises a plain OSError on socket timeouts
+SocketTimeout = getattr(socket, 'timeout', OSError)
 
 
-def run_server(saddr, port, handler=handle_osc):
+def run_server(saddr, port, handler=handle_osc, scheduler=None, pool=None):
+    """Receive OSC datagrams on (saddr, port) and pass them to handler.
+
+    If a ``uosc.server.BufferPool`` is given as ``pool``, datagrams are
+    received into its buffers and the handler gets a ``memoryview`` of the
+    data instead of a ``bytes`` object. This needs ``socket.recvfrom_into``,
+    which MicroPython does not provide.
+
+    If a ``uosc.scheduler.Scheduler`` is given, due scheduled messages are
+    dispatched between receiving datagrams.
+
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     ai = socket.getaddrinfo(saddr, port)[0]
     sock.bind(ai[-1])
     log.info("Listening for OSC messages on %s:%i.", saddr, port)
 
+    if __debug__:
+        _handler = handler
+
+        def handler(data, caddr):
+            log.debug("RECV %i bytes from %s:%s", len(data), *get_hostport(caddr))
+            _handler(data, caddr)
+
     try:
         while True:
-            data, caddr = sock.recvfrom(MAX_DGRAM_SIZE)
-            if __debug__: log.debug("RECV %i bytes from %s:%s",
-                                    len(data), *get_hostport(caddr))
-            handler(data, caddr)
+            if scheduler is not None:
+                # wait for data only until the next scheduled message is due
+                sock.settimeout(scheduler.run_pending())
+
+            try:
+                if pool is not None:
+                    pool.receive(sock, handler)
+                else:
+                    data, caddr = sock.recvfrom(MAX_DGRAM_SIZE)
+                    handler(data, caddr)
+            except SocketTimeout:
+                if scheduler is None:
+                    raise
     finally:
         sock.close()
         log.info("Bye!")
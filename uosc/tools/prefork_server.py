@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""A multi-process OSC UDP server using SO_REUSEPORT (CPython on Linux/BSD).
+
+Starts a number of worker processes, which each bind their own socket to the
+same address and port with the ``SO_REUSEPORT`` socket option, so that the
+kernel distributes incoming datagrams between them. The supervisor process
+restarts workers, which have exited, and merges the statistics counters of
+all workers.
+
+Example:
+
+    PYTHONPATH="$(pwd)" python -m uosc.tools.prefork_server -w 4 -v
+
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import time
+
+from uosc.common import MAX_DGRAM_SIZE
+from uosc.server import handle_osc
+
+
+log = logging.getLogger("uosc.prefork_server")
+DEFAULT_ADDRESS = '0.0.0.0'
+DEFAULT_PORT = 9001
+# Names of the per-worker statistics counters in the shared counter array
+STAT_NAMES = ('datagrams', 'bytes', 'messages', 'restarts')
+STAT_DATAGRAMS, STAT_BYTES, STAT_MESSAGES, STAT_RESTARTS = range(len(STAT_NAMES))
+
+
+def bind_reuseport(saddr, port):
+    """Return UDP socket bound to (saddr, port) with SO_REUSEPORT set."""
+    ai = socket.getaddrinfo(saddr, port, 0, socket.SOCK_DGRAM)[0]
+    sock = socket.socket(ai[0], socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(ai[-1])
+    return sock
+
+
+def run_worker(saddr, port, index, counters, dispatch=None):
+    """Receive and handle OSC datagrams, counting them in shared counters.
+
+    The counters of the worker with the given index start at
+    ``index * len(STAT_NAMES)`` in the ``counters`` array.
+
+    """
+    sock = bind_reuseport(saddr, port)
+    base = index * len(STAT_NAMES)
+    datagrams = base + STAT_DATAGRAMS
+    nbytes = base + STAT_BYTES
+    messages = base + STAT_MESSAGES
+
+    def counting_dispatch(timetag, msg):
+        counters[messages] += 1
+
+        if dispatch is not None:
+            dispatch(timetag, msg)
+
+    if __debug__: log.debug("Worker %i (pid %i) listening on %s:%i.",
+                            index, os.getpid(), saddr, port)
+    try:
+        while True:
+            data, caddr = sock.recvfrom(MAX_DGRAM_SIZE)
+            counters[datagrams] += 1
+            counters[nbytes] += len(data)
+            handle_osc(data, caddr, dispatch=counting_dispatch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+class PreforkServer:
+    """Supervisor for a number of SO_REUSEPORT server worker processes.
+
+    ``dispatch`` is passed to ``handle_osc`` in each worker. Workers are forked,
+    where supported, so ``dispatch`` does not need to be picklable.
+
+    """
+
+    def __init__(self, saddr, port, workers=None, dispatch=None):
+        self.saddr = saddr
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.dispatch = dispatch
+        self.counters = multiprocessing.RawArray('Q', self.workers * len(STAT_NAMES))
+        self.procs = [None] * self.workers
+
+        try:
+            self._mp = multiprocessing.get_context('fork')
+        except ValueError:
+            self._mp = multiprocessing
+
+    def _spawn(self, index):
+        proc = self._mp.Process(
+            target=run_worker, name="uosc-worker-%i" % index,
+            args=(self.saddr, self.port, index, self.counters, self.dispatch))
+        proc.daemon = True
+        proc.start()
+        self.procs[index] = proc
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+
+        log.info("Started %i workers listening on %s:%i.", self.workers, self.saddr, self.port)
+
+    def check(self):
+        """Restart workers, which have exited. Returns number of restarted workers."""
+        restarted = 0
+
+        for index, proc in enumerate(self.procs):
+            if proc is not None and not proc.is_alive():
+                log.warning("Worker %i (pid %i) exited with code %s, restarting.",
+                            index, proc.pid, proc.exitcode)
+                proc.join()
+                self.counters[index * len(STAT_NAMES) + STAT_RESTARTS] += 1
+                self._spawn(index)
+                restarted += 1
+
+        return restarted
+
+    def worker_stats(self, index):
+        base = index * len(STAT_NAMES)
+        return dict(zip(STAT_NAMES, self.counters[base:base + len(STAT_NAMES)]))
+
+    def stats(self):
+        """Return dict with counters summed over all workers and per worker."""
+        workers = [self.worker_stats(index) for index in range(self.workers)]
+        total = dict((name, sum(w[name] for w in workers)) for name in STAT_NAMES)
+        total['workers'] = workers
+        return total
+
+    def run(self, interval=1.0):
+        """Start workers and restart them when they exit until interrupted."""
+        self.start()
+
+        try:
+            while True:
+                time.sleep(interval)
+                self.check()
+        finally:
+            self.stop()
+
+    def stop(self, timeout=1.0):
+        for proc in self.procs:
+            if proc is not None and proc.is_alive():
+                proc.terminate()
+
+        for index, proc in enumerate(self.procs):
+            if proc is not None:
+                proc.join(timeout)
+                self.procs[index] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main(args=None):
+    import argparse
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-v', '--verbose', action="store_true",
+                    help="Enable debug logging")
+    ap.add_argument('-a', '--address', default=DEFAULT_ADDRESS,
+                    help="OSC server address (default: %s)" % DEFAULT_ADDRESS)
+    ap.add_argument('-p', '--port', type=int, default=DEFAULT_PORT,
+                    help="OSC server port (default: %s)" % DEFAULT_PORT)
+    ap.add_argument('-w', '--workers', type=int,
+                    help="Number of worker processes (default: number of CPUs)")
+
+    args = ap.parse_args(args)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    server = PreforkServer(args.address, args.port, workers=args.workers)
+    start = time.time()
+
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats = server.stats()
+        elapsed = time.time() - start
+        print("Messages/second: %.2f" % (stats['messages'] / elapsed))
+        print("Messages total: %i" % stats['messages'])
+
+        for index, worker in enumerate(stats['workers']):
+            print("Worker %i: %i messages, %i restarts" %
+                  (index, worker['messages'], worker['restarts']))
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main() or 0)
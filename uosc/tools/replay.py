@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""Replay OSC UDP datagrams from a capture file (CPython).
+
+Datagrams recorded with ``uosc.tools.capture`` are sent to the given
+destination with their original timing, N times faster or slower, or as fast
+as possible. The replay timing error and the achieved rate are reported
+afterwards.
+
+Example:
+
+    PYTHONPATH="$(pwd)" python -m uosc.tools.replay -s 2 traffic.cap localhost:9001
+
+"""
+
+import logging
+import socket
+import time
+
+from uosc.capture import CaptureReader
+
+
+log = logging.getLogger("uosc.replay")
+DEFAULT_PORT = 9001
+# Sleep until this many seconds before a datagram is due, then busy-wait
+SPIN_TIME = 0.001
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def replay(reader, dest, speed=1.0, start=0, count=None, sock=None, clock=time.perf_counter,
+           sleep=time.sleep):
+    """Send datagrams from a ``CaptureReader`` to ``dest`` (a (host, port) tuple).
+
+    Datagram ``i`` is sent at ``(timestamp(i) - timestamp(start)) / speed``
+    seconds after the start of the replay. If ``speed`` is 0 or None, datagrams
+    are sent as fast as possible.
+
+    Returns a dict with the number of sent ``messages`` and ``bytes``,
+    ``elapsed`` seconds, achieved ``rate`` (datagrams/s) and ``byte_rate``
+    (bytes/s) and the timing error of the send calls in microseconds
+    (``error_mean``, ``error_p50``, ``error_p99`` and ``error_max``).
+
+    """
+    end = len(reader) if count is None else min(len(reader), start + count)
+    close = sock is None
+
+    if sock is None:
+        ai = socket.getaddrinfo(dest[0], dest[1], 0, socket.SOCK_DGRAM)[0]
+        sock = socket.socket(ai[0], socket.SOCK_DGRAM)
+        dest = ai[-1]
+
+    sendto = sock.sendto
+    errors = []
+    nbytes = 0
+
+    try:
+        if start < end:
+            ts0 = reader.timestamp(start)
+            t0 = clock()
+
+            for i in range(start, end):
+                data = reader.data(i)
+
+                if speed:
+                    due = t0 + (reader.timestamp(i) - ts0) / speed
+                    wait = due - clock()
+
+                    if wait > SPIN_TIME:
+                        sleep(wait - SPIN_TIME)
+
+                    while clock() < due:
+                        pass
+
+                    errors.append((clock() - due) * 1e6)
+
+                sendto(data, dest)
+                nbytes += len(data)
+
+            elapsed = clock() - t0
+        else:
+            elapsed = 0.0
+    finally:
+        if close:
+            sock.close()
+
+    messages = max(0, end - start)
+    errors.sort()
+    return {
+        'messages': messages,
+        'bytes': nbytes,
+        'elapsed': elapsed,
+        'rate': messages / elapsed if elapsed > 0 else 0.0,
+        'byte_rate': nbytes / elapsed if elapsed > 0 else 0.0,
+        'error_mean': sum(errors) / len(errors) if errors else 0.0,
+        'error_p50': _percentile(errors, 50),
+        'error_p99': _percentile(errors, 99),
+        'error_max': errors[-1] if errors else 0.0,
+    }
+
+
+def main(args=None):
+    import argparse
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-v', '--verbose', action="store_true",
+                    help="Enable debug logging")
+    ap.add_argument('-s', '--speed', type=float, default=1.0,
+                    help="Replay speed factor (default: 1.0)")
+    ap.add_argument('-f', '--fast', action="store_true",
+                    help="Send datagrams as fast as possible")
+    ap.add_argument('--start', type=float, default=None,
+                    help="Start at first datagram received at or after this UNIX timestamp")
+    ap.add_argument('-c', '--count', type=int, default=None,
+                    help="Number of datagrams to send (default: all)")
+    ap.add_argument('capture', help="Capture file")
+    ap.add_argument('dest', help="Destination address (host:port or port)")
+
+    args = ap.parse_args(args)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    host, _, port = args.dest.rpartition(':')
+    dest = (host.strip('[]') or 'localhost', int(port or DEFAULT_PORT))
+
+    with CaptureReader(args.capture) as reader:
+        start = 0 if args.start is None else reader.find_time(args.start)
+        log.info("Replaying %i datagrams to %s:%i.", len(reader) - start, *dest)
+
+        try:
+            stats = replay(reader, dest, speed=0 if args.fast else args.speed, start=start,
+                           count=args.count)
+        except KeyboardInterrupt:
+            return 1
+
+    print("Sent %(messages)i datagrams (%(bytes)i bytes) in %(elapsed).3f s "
+          "(%(rate).1f datagrams/s, %(byte_rate).1f bytes/s)" % stats)
+
+    if not args.fast:
+        print("Timing error (us): mean %(error_mean).1f, p50 %(error_p50).1f, "
+              "p99 %(error_p99).1f, max %(error_max).1f" % stats)
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main() or 0)